@@ -0,0 +1,120 @@
+import os
+import threading
+from typing import Dict
+
+from boto3 import client as boto3_client
+from botocore.client import BaseClient
+from botocore.config import Config
+from pynamodb.connection import Connection
+
+
+class AWSClients:
+    """
+    A process-wide registry of AWS clients and the DynamoDB connection.
+
+    Creating a botocore client is slow and starts a new connection pool, so each client is created once per
+    container, on first use, and then shared by every usecase and repository of the following warm invocations.
+    Usecases and repositories accept their clients as constructor arguments and fall back to this registry.
+
+    The shared settings are read from the environment:
+        AWS_MAX_POOL_CONNECTIONS: The size of the connection pool of each client.
+        AWS_CONNECT_TIMEOUT_SECONDS: The timeout for opening a connection.
+        AWS_READ_TIMEOUT_SECONDS: The timeout for reading a response.
+        AWS_MAX_ATTEMPTS: The total number of attempts of a request, with adaptive retries.
+    """
+
+    MAX_POOL_CONNECTIONS = int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '20'))
+    CONNECT_TIMEOUT_SECONDS = float(os.getenv('AWS_CONNECT_TIMEOUT_SECONDS', '3'))
+    READ_TIMEOUT_SECONDS = float(os.getenv('AWS_READ_TIMEOUT_SECONDS', '15'))
+    MAX_ATTEMPTS = int(os.getenv('AWS_MAX_ATTEMPTS', '5'))
+
+    # S3 pre-signed URLs must be signed with SigV4
+    SERVICE_CONFIGS = {
+        's3': Config(signature_version='s3v4'),
+    }
+
+    __clients: Dict[str, BaseClient] = {}
+    __connection: Connection = None
+    __lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls, service_name: str) -> BaseClient:
+        """Get the shared client of an AWS service, creating it on first use.
+
+        :param service_name: The name of the AWS service, e.g. sqs or s3.
+        :type service_name: str
+
+        :return: The shared client.
+        :rtype: BaseClient
+
+        """
+        client = cls.__clients.get(service_name)
+        if client is not None:
+            return client
+
+        with cls.__lock:
+            if service_name not in cls.__clients:
+                config = cls.__base_config()
+                if service_name in cls.SERVICE_CONFIGS:
+                    config = config.merge(cls.SERVICE_CONFIGS[service_name])
+
+                cls.__clients[service_name] = boto3_client(
+                    service_name, region_name=os.getenv('REGION', 'ap-southeast-1'), config=config
+                )
+
+            return cls.__clients[service_name]
+
+    @classmethod
+    def get_connection(cls) -> Connection:
+        """Get the shared PynamoDB connection used for transactions, creating it on first use.
+
+        :return: The shared connection.
+        :rtype: Connection
+
+        """
+        if cls.__connection is not None:
+            return cls.__connection
+
+        with cls.__lock:
+            if cls.__connection is None:
+                cls.__connection = Connection(
+                    region=os.getenv('REGION'),
+                    connect_timeout_seconds=cls.CONNECT_TIMEOUT_SECONDS,
+                    read_timeout_seconds=cls.READ_TIMEOUT_SECONDS,
+                    retry_configuration={'mode': 'adaptive', 'max_attempts': cls.MAX_ATTEMPTS},
+                    max_pool_connections=cls.MAX_POOL_CONNECTIONS,
+                )
+
+            return cls.__connection
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop every shared client, so that the next lookups create new ones."""
+        with cls.__lock:
+            cls.__clients.clear()
+            cls.__connection = None
+
+    @classmethod
+    def __base_config(cls) -> Config:
+        return Config(
+            max_pool_connections=cls.MAX_POOL_CONNECTIONS,
+            connect_timeout=cls.CONNECT_TIMEOUT_SECONDS,
+            read_timeout=cls.READ_TIMEOUT_SECONDS,
+            tcp_keepalive=True,
+            retries={'mode': 'adaptive', 'max_attempts': cls.MAX_ATTEMPTS},
+        )
+
+
+class DynamoDBModelMeta:
+    """
+    The base of the Meta of every PynamoDB model, so that its queries, reads and batch writes use the same timeouts,
+    attempts and pool size as the shared connection instead of the PynamoDB defaults.
+
+    PynamoDB gives each model a connection of its own and only takes these settings from its Meta. Its retries
+    stay in the legacy mode, max_retry_attempts counts the retries after the first attempt.
+    """
+
+    connect_timeout_seconds = AWSClients.CONNECT_TIMEOUT_SECONDS
+    read_timeout_seconds = AWSClients.READ_TIMEOUT_SECONDS
+    max_retry_attempts = AWSClients.MAX_ATTEMPTS - 1
+    max_pool_connections = AWSClients.MAX_POOL_CONNECTIONS
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from fastapi_cloudauth.base import ScopedAuth
+from fastapi_cloudauth.cognito import JWKS, Cognito, CognitoExtraVerifier
+from jose.backends.base import Key
+from starlette.concurrency import run_in_threadpool
+from utils.logger import logger
+
+
+class CachedJWKS(JWKS):
+    """
+    The JSON Web Key Set of a Cognito user pool, cached for the life of the container.
+
+    Keys are fetched on first use and kept for JWKS_CACHE_TTL_SECONDS. Within the last
+    JWKS_REFRESH_AHEAD_SECONDS of that window they are refreshed in the background while the cached keys keep
+    being served, so requests only wait on the network when there are no usable keys at all. A token signed
+    with an unknown key ID triggers one refresh, at most once every JWKS_UNKNOWN_KID_REFRESH_SECONDS, to pick
+    up rotated keys.
+    """
+
+    TTL_SECONDS = float(os.getenv('JWKS_CACHE_TTL_SECONDS', '3600'))
+    REFRESH_AHEAD_SECONDS = float(os.getenv('JWKS_REFRESH_AHEAD_SECONDS', '300'))
+    UNKNOWN_KID_REFRESH_SECONDS = float(os.getenv('JWKS_UNKNOWN_KID_REFRESH_SECONDS', '60'))
+    REQUEST_TIMEOUT_SECONDS = float(os.getenv('JWKS_REQUEST_TIMEOUT_SECONDS', '5'))
+
+    def __init__(self, url: str) -> None:
+        # fixed keys keep the base class from fetching the keys on construction, they are managed here instead
+        super().__init__(url='', fixed_keys={})
+        self.__url = url
+        self.__keys: Dict[str, Key] = {}
+        self.__expires_at = 0.0
+        self.__last_refresh_at: Optional[float] = None
+        self.__refresh_lock = threading.Lock()
+        self.__background_refresh: Optional[threading.Thread] = None
+
+    def load(self) -> bool:
+        """Fetch the keys unless the cached keys are still fresh, e.g. when pre-warming a container.
+
+        :return: True if fresh keys are available, otherwise False
+        :rtype: bool
+
+        """
+        if self.__keys and time.monotonic() < self.__expires_at - self.REFRESH_AHEAD_SECONDS:
+            return True
+
+        return self.refresh()
+
+    def refresh(self) -> bool:
+        """Fetch the keys from the user pool. The cached keys are kept if the request fails.
+
+        :return: True if the keys were fetched, otherwise False
+        :rtype: bool
+
+        """
+        with self.__refresh_lock:
+            self.__last_refresh_at = time.monotonic()
+            try:
+                response = requests.get(self.__url, timeout=self.REQUEST_TIMEOUT_SECONDS)
+                response.raise_for_status()
+                keys = self._construct(response.json())
+            except (requests.RequestException, ValueError, KeyError) as e:
+                logger.error(f'Failed to fetch the JWKS of the user pool: {e}')
+                return False
+
+            self.__keys = keys
+            self.__expires_at = time.monotonic() + self.TTL_SECONDS
+            return True
+
+    async def refresh_keys(self) -> bool:
+        return await run_in_threadpool(self.refresh)
+
+    async def get_publickey(self, kid: str) -> Optional[Key]:
+        now = time.monotonic()
+        if not self.__keys or now >= self.__expires_at:
+            await self.refresh_keys()
+        elif now >= self.__expires_at - self.REFRESH_AHEAD_SECONDS:
+            self.__start_background_refresh()
+
+        key = self.__keys.get(kid)
+        if key is None and self.__can_refresh_for_unknown_kid():
+            logger.info(f'Unknown JWKS key ID {kid}, refreshing the keys')
+            await self.refresh_keys()
+            key = self.__keys.get(kid)
+
+        return key
+
+    def __can_refresh_for_unknown_kid(self) -> bool:
+        return (
+            self.__last_refresh_at is None
+            or time.monotonic() - self.__last_refresh_at >= self.UNKNOWN_KID_REFRESH_SECONDS
+        )
+
+    def __start_background_refresh(self) -> None:
+        if self.__background_refresh is not None and self.__background_refresh.is_alive():
+            return
+
+        self.__background_refresh = threading.Thread(target=self.refresh, daemon=True)
+        self.__background_refresh.start()
+
+
+class CachedCognito(Cognito):
+    """Verifies Cognito access tokens with a CachedJWKS instead of fetching the keys on construction."""
+
+    def __init__(self, region: str, userPoolId: str, client_id: str, jwks: CachedJWKS) -> None:
+        issuer = f'https://cognito-idp.{region}.amazonaws.com/{userPoolId}'
+        ScopedAuth.__init__(
+            self,
+            jwks,
+            audience=client_id,
+            issuer=issuer,
+            scope_key='cognito:groups',
+            auto_error=True,
+            extra=CognitoExtraVerifier(client_id=client_id, issuer=issuer, token_use={'access'}),
+        )
+
+    @staticmethod
+    def jwks_url(region: str, userPoolId: str) -> str:
+        return f'https://cognito-idp.{region}.amazonaws.com/{userPoolId}/.well-known/jwks.json'
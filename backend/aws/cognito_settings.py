@@ -1,9 +1,17 @@
+import hashlib
 import os  # from the computer, it finds a .env file
+import threading
+import time
+from typing import Optional
 
+from aws.cognito_jwks import CachedCognito, CachedJWKS
 from constants.common_constants import UserRoles
 from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi_cloudauth import Cognito
+from jose import jwt
 from pydantic import BaseModel, Field
+from utils.cache import TTLCache
 
 
 class AccessUser(BaseModel):
@@ -12,15 +20,79 @@ class AccessUser(BaseModel):
     username: str = None
 
 
-__auth = Cognito(
-    region=os.environ['REGION'],
-    userPoolId=os.environ['USER_POOL_ID'],
-    client_id=os.environ['USER_POOL_CLIENT_ID'],
+__bearer = HTTPBearer(auto_error=False)
+__auth = None
+__jwks = None
+__auth_lock = threading.Lock()
+
+# Verified claims per token, so repeated calls with the same token skip the signature check until it expires
+__claims_cache = TTLCache(
+    maxsize=int(os.getenv('AUTH_CLAIMS_CACHE_MAX_SIZE', '256')),
+    ttl=float(os.getenv('AUTH_CLAIMS_CACHE_TTL_SECONDS', '300')),
 )
 
 
+def __get_auth() -> Cognito:
+    """Get the Cognito verifier, building it on first use.
+
+    The verifier is deferred until the first authenticated request, or the first warmer ping, instead of
+    slowing down the cold start of every container.
+
+    :return: The Cognito verifier of AccessUser claims
+    :rtype: Cognito
+
+    """
+    global __auth, __jwks
+    with __auth_lock:
+        if __auth is None:
+            region = os.environ['REGION']
+            user_pool_id = os.environ['USER_POOL_ID']
+            __jwks = CachedJWKS(url=CachedCognito.jwks_url(region=region, userPoolId=user_pool_id))
+            __auth = CachedCognito(
+                region=region,
+                userPoolId=user_pool_id,
+                client_id=os.environ['USER_POOL_CLIENT_ID'],
+                jwks=__jwks,
+            ).claim(AccessUser)
+
+        return __auth
+
+
+def preload_auth_keys() -> bool:
+    """Build the Cognito verifier and fetch its keys, so that a warmed container has no auth network I/O.
+
+    :return: True if fresh keys are available, otherwise False
+    :rtype: bool
+
+    """
+    __get_auth()
+    return __jwks.load()
+
+
+async def __verify_access_token(
+    http_auth: Optional[HTTPAuthorizationCredentials] = Depends(__bearer),
+) -> AccessUser:
+    token_key = hashlib.sha256(http_auth.credentials.encode()).hexdigest() if http_auth else None
+    cached_claims = __claims_cache.get(token_key) if token_key else None
+    if cached_claims:
+        expires_at, current_user = cached_claims
+        if time.time() < expires_at:
+            return current_user
+
+        __claims_cache.invalidate(token_key)
+
+    auth = __auth or __get_auth()
+    current_user = await auth(http_auth)
+
+    expires_at = jwt.get_unverified_claims(http_auth.credentials).get('exp')
+    if expires_at:
+        __claims_cache.set(token_key, (float(expires_at), current_user))
+
+    return current_user
+
+
 def get_current_user(
-    current_user: AccessUser = Depends(__auth.claim(AccessUser)),
+    current_user: AccessUser = Depends(__verify_access_token),
 ) -> AccessUser:
     """Get the current user
 
@@ -32,6 +32,15 @@ class CommonConstants:
 
     OBJECT_KEY = 'objectKey'
 
+    # Pagination Constants
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    EXPORT_PAGE_SIZE = 200
+    JOB_PAGE_SIZE = 500
+
+    # DynamoDB Limits
+    TRANSACT_WRITE_MAX_ITEMS = 100
+
     # Exclude to Comparison Keys
     EXCLUDE_COMPARISON_KEYS = [
         CLS,
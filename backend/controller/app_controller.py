@@ -1,20 +1,103 @@
-def api_controller(app):
-    from controller.certificate_router import certificate_router
-    from controller.discount_router import discount_router
-    from controller.evaluation_router import evaluation_router
-    from controller.event_router import event_router
-    from controller.faqs_controller import faqs_router
-    from controller.payment_controller import payment_router
-    from controller.preregistration_router import preregistration_router
-    from controller.pycon_registration_controller import pycon_registration_router
-    from controller.registration_router import registration_router
-
-    app.include_router(event_router, prefix='/events', tags=['Events'])
-    app.include_router(registration_router, prefix='/registrations', tags=['Registrations'])
-    app.include_router(pycon_registration_router, prefix='/pycon/registrations', tags=['PyCon Registrations'])
-    app.include_router(preregistration_router, prefix='/preregistrations', tags=['PreRegistrations'])
-    app.include_router(certificate_router, prefix='/certificates', tags=['Certificates'])
-    app.include_router(evaluation_router, prefix='/evaluations', tags=['Evaluations'])
-    app.include_router(discount_router, prefix='/discounts', tags=['Discounts'])
-    app.include_router(faqs_router, prefix='/faqs', tags=['FAQs'])
-    app.include_router(payment_router, prefix='/payments', tags=['Payments'])
+import threading
+from importlib import import_module
+from typing import List, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# (prefix, module, router attribute, tags) of every route family
+ROUTER_FAMILIES: List[Tuple[str, str, str, List[str]]] = [
+    ('/events', 'controller.event_router', 'event_router', ['Events']),
+    ('/registrations', 'controller.registration_router', 'registration_router', ['Registrations']),
+    (
+        '/pycon/registrations',
+        'controller.pycon_registration_controller',
+        'pycon_registration_router',
+        ['PyCon Registrations'],
+    ),
+    ('/preregistrations', 'controller.preregistration_router', 'preregistration_router', ['PreRegistrations']),
+    ('/certificates', 'controller.certificate_router', 'certificate_router', ['Certificates']),
+    ('/evaluations', 'controller.evaluation_router', 'evaluation_router', ['Evaluations']),
+    ('/discounts', 'controller.discount_router', 'discount_router', ['Discounts']),
+    ('/faqs', 'controller.faqs_controller', 'faqs_router', ['FAQs']),
+    ('/payments', 'controller.payment_controller', 'payment_router', ['Payments']),
+]
+
+
+class LazyRouterLoader:
+    """
+    Includes the routers of an app one route family at a time, on the first request for each family.
+
+    Importing a router imports its usecases, repositories and their dependencies, so a container that only
+    serves a few route families never pays the import time of the others.
+    """
+
+    def __init__(self, app) -> None:
+        self.__app = app
+        self.__pending = list(ROUTER_FAMILIES)
+        self.__lock = threading.Lock()
+
+    def load_for_path(self, path: str) -> None:
+        """Include the router that serves a path, if it was not included yet.
+
+        Requests for the OpenAPI schema or the docs include every router, since the schema covers them all.
+
+        :param path: The path of the request
+        :type path: str
+
+        """
+        if not self.__pending:
+            return
+
+        load_all = path in (self.__app.openapi_url, self.__app.docs_url, self.__app.redoc_url)
+        with self.__lock:
+            for family in list(self.__pending):
+                prefix = family[0]
+                if load_all or path == prefix or path.startswith(f'{prefix}/'):
+                    include_router(self.__app, *family)
+                    self.__pending.remove(family)
+
+
+class LazyRouterMiddleware:
+    """ASGI middleware that lets a LazyRouterLoader include the router of each request before it is routed."""
+
+    def __init__(self, app: ASGIApp, loader: LazyRouterLoader) -> None:
+        self.app = app
+        self.loader = loader
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] == 'http':
+            self.loader.load_for_path(scope['path'])
+
+        await self.app(scope, receive, send)
+
+
+def include_router(app, prefix: str, module_name: str, router_name: str, tags: List[str]) -> None:
+    """Import a router and include it in the app
+
+    :param app: The FastAPI app
+    :type app: FastAPI
+
+    :param prefix: The path prefix of the router
+    :type prefix: str
+
+    :param module_name: The module of the router
+    :type module_name: str
+
+    :param router_name: The name of the router in its module
+    :type router_name: str
+
+    :param tags: The OpenAPI tags of the router
+    :type tags: List[str]
+
+    """
+    router = getattr(import_module(module_name), router_name)
+    app.include_router(router, prefix=prefix, tags=tags)
+
+
+def api_controller(app, lazy: bool = False):
+    if lazy:
+        app.add_middleware(LazyRouterMiddleware, loader=LazyRouterLoader(app))
+        return
+
+    for family in ROUTER_FAMILIES:
+        include_router(app, *family)
@@ -5,6 +5,7 @@ from constants.common_constants import CommonConstants
 from fastapi import APIRouter, Depends, Path, Query
 from model.common import Message
 from model.discount.discount import DiscountIn, DiscountOrganization, DiscountOut
+from model.discount.discount_constants import DiscountCodesFormat
 from usecase.discount_usecase import DiscountUsecase
 
 discount_router = APIRouter()
@@ -14,6 +15,10 @@ discount_router = APIRouter()
     '',
     response_model=List[DiscountOut],
     responses={
+        200: {
+            'content': {'text/csv': {}, 'application/json': {}},
+            'description': 'Created discounts, or a download of them when a format is given',
+        },
         400: {'model': Message, 'description': 'Bad request'},
         500: {'model': Message, 'description': 'Internal server error'},
     },
@@ -28,6 +33,9 @@ discount_router = APIRouter()
 )
 def create_discounts(
     discount_in: DiscountIn,
+    output_format: DiscountCodesFormat = Query(
+        None, title='Stream the created discounts as a CSV or JSON download', alias='format'
+    ),
     current_user: AccessUser = Depends(get_current_user),
 ):
     """Create discounts.
@@ -35,6 +43,9 @@ def create_discounts(
     :param discount_in: DiscountIn object containing the new discount data.
     :type discount_in: DiscountIn
 
+    :param output_format: If set, the created discounts are streamed as a CSV or JSON download.
+    :type output_format: DiscountCodesFormat
+
     :param current_user: The current user, defaults to Depends(get_current_user).
     :type current_user: AccessUser, optional
 
@@ -44,7 +55,7 @@ def create_discounts(
     """
     _ = current_user
     discount_uc = DiscountUsecase()
-    return discount_uc.create_discounts(discount_in=discount_in)
+    return discount_uc.create_discounts(discount_in=discount_in, output_format=output_format)
 
 
 @discount_router.get(
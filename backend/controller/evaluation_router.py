@@ -9,6 +9,7 @@ from model.evaluations.evaluation import (
     EvaluationOut,
     EvaluationPatch,
 )
+from model.evaluations.evaluation_summary import EvaluationSummaryOut
 from model.evaluations.evaluations_constants import EvaluationQuestionType
 from usecase.evaluation_usecase import EvaluationUsecase
 
@@ -87,6 +88,38 @@ def get_evaluations_by_question(
     return evaluations_uc.get_evaluations_by_question(event_id, question)
 
 
+@evaluation_router.get(
+    '/{eventId}/summary',
+    response_model=EvaluationSummaryOut,
+    responses={
+        404: {'model': Message, 'description': 'Event not found'},
+        500: {'model': Message, 'description': 'Internal server error'},
+    },
+    summary='Get evaluation summary',
+)
+@evaluation_router.get(
+    '/{eventId}/summary/',
+    response_model=EvaluationSummaryOut,
+    response_model_exclude_none=True,
+    response_model_exclude_unset=True,
+    include_in_schema=False,
+)
+def get_evaluation_summary(
+    event_id: str = Path(..., title='Event Id', alias=CommonConstants.EVENT_ID),
+):
+    """Get the response count, answer scale average and count per answer of each question of an event
+
+    :param event_id: The event ID.
+    :type event_id: str
+
+    :return: EvaluationSummaryOut object.
+    :rtype: EvaluationSummaryOut
+
+    """
+    evaluations_uc = EvaluationUsecase()
+    return evaluations_uc.get_evaluation_summary(event_id)
+
+
 @evaluation_router.get(
     '/{eventId}/registration/{registrationId}',
     response_model=EvaluationOut,
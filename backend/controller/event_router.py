@@ -9,8 +9,11 @@ from model.events.event import EventAdminOut, EventIn, EventOut
 from model.events.events_constants import EventUploadType
 from model.file_uploads.file_upload import FileDownloadOut, FileUploadIn, FileUploadOut
 from model.file_uploads.file_upload_constants import FileUploadConstants
+from model.jobs.job import JobOut
+from model.jobs.jobs_constants import JobType
 from usecase.event_usecase import EventUsecase
 from usecase.file_s3_usecase import FileS3Usecase
+from usecase.job_usecase import JobUsecase
 
 event_router = APIRouter()
 
@@ -327,3 +330,85 @@ def get_download_url(
     """
     file_s3_uc = FileS3Usecase()
     return file_s3_uc.create_download_url(object_key=object_key)
+
+
+@event_router.get(
+    '/{entryId}/jobs/{jobType}',
+    response_model=JobOut,
+    responses={
+        404: {'model': Message, 'description': 'Job not found'},
+        500: {'model': Message, 'description': 'Internal server error'},
+    },
+    summary='Get job status',
+)
+@event_router.get(
+    '/{entryId}/jobs/{jobType}/',
+    response_model=JobOut,
+    response_model_exclude_none=True,
+    response_model_exclude_unset=True,
+    include_in_schema=False,
+)
+def get_job(
+    entry_id: str = Path(..., title='Event Id', alias=CommonConstants.ENTRY_ID),
+    job_type: JobType = Path(..., title='Job Type', alias='jobType'),
+    current_user: AccessUser = Depends(get_current_user),
+):
+    """Get the status of the latest run of an event job, such as the emails sent when an event is completed
+
+    :param entry_id: The event ID. Defaults to Path(..., title='Event Id', alias=CommonConstants.ENTRY_ID).
+    :type entry_id: str
+
+    :param job_type: The type of the job. Defaults to Path(..., title='Job Type', alias='jobType').
+    :type job_type: JobType
+
+    :param current_user: The current user, defaults to Depends(get_current_user).
+    :type current_user: AccessUser, optional
+
+    :return: JobOut object.
+    :rtype: JobOut
+
+    """
+    _ = current_user
+    job_uc = JobUsecase()
+    return job_uc.get_job(event_id=entry_id, job_type=job_type)
+
+
+@event_router.post(
+    '/{entryId}/jobs/{jobType}',
+    response_model=JobOut,
+    responses={
+        404: {'model': Message, 'description': 'Event not found'},
+        500: {'model': Message, 'description': 'Internal server error'},
+    },
+    summary='Run job',
+)
+@event_router.post(
+    '/{entryId}/jobs/{jobType}/',
+    response_model=JobOut,
+    response_model_exclude_none=True,
+    response_model_exclude_unset=True,
+    include_in_schema=False,
+)
+def run_job(
+    entry_id: str = Path(..., title='Event Id', alias=CommonConstants.ENTRY_ID),
+    job_type: JobType = Path(..., title='Job Type', alias='jobType'),
+    current_user: AccessUser = Depends(get_current_user),
+):
+    """Enqueue a new run of an event job, e.g. when the emails of a status change failed to be sent or queued
+
+    :param entry_id: The event ID. Defaults to Path(..., title='Event Id', alias=CommonConstants.ENTRY_ID).
+    :type entry_id: str
+
+    :param job_type: The type of the job. Defaults to Path(..., title='Job Type', alias='jobType').
+    :type job_type: JobType
+
+    :param current_user: The current user, defaults to Depends(get_current_user).
+    :type current_user: AccessUser, optional
+
+    :return: JobOut object.
+    :rtype: JobOut
+
+    """
+    _ = current_user
+    job_uc = JobUsecase()
+    return job_uc.rerun_job(event_id=entry_id, job_type=job_type)
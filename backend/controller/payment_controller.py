@@ -1,7 +1,14 @@
+from typing import Union
+
+from constants.common_constants import CommonConstants
 from fastapi import APIRouter, Body, Path, Query
 from fastapi.responses import JSONResponse
 from model.common import Message
-from model.payments.payments import PaymentTransactionIn, PaymentTransactionOut
+from model.payments.payments import (
+    PaymentTransactionIn,
+    PaymentTransactionOut,
+    PaymentTransactionPageOut,
+)
 from usecase.payment_usecase import PaymentUsecase
 
 payment_router = APIRouter()
@@ -41,19 +48,34 @@ def create_payment_transaction(
 
 @payment_router.get(
     '/pending',
-    response_model=list[PaymentTransactionOut],
+    response_model=Union[PaymentTransactionPageOut, list[PaymentTransactionOut]],
     responses={
+        400: {'model': Message, 'description': 'Bad request'},
         404: {'model': Message, 'description': 'Bad request'},
         500: {'model': Message, 'description': 'Internal server error'},
     },
     summary='Get pending payment transactions',
 )
-def get_pending_payment_transactions():
+def get_pending_payment_transactions(
+    older_than_minutes: int = Query(
+        None,
+        ge=0,
+        description='Only include transactions created at least this many minutes ago',
+        alias='olderThanMinutes',
+    ),
+    limit: int = Query(None, title='Page Size', ge=1, le=CommonConstants.MAX_PAGE_SIZE),
+    cursor: str = Query(None, title='Page Cursor'),
+):
     """
-    Get Payment Transaction with pending Status
+    Get Payment Transaction with pending Status, oldest first.
+
+    When `limit` is provided, a single page is returned together with the `nextCursor`
+    to pass as `cursor` for the following page.
     """
     payment_uc = PaymentUsecase()
-    return payment_uc.query_pending_payment_transactions()
+    return payment_uc.query_pending_payment_transactions(
+        older_than_minutes=older_than_minutes, limit=limit, cursor=cursor
+    )
 
 
 @payment_router.put(
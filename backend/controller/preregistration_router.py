@@ -246,6 +246,7 @@ def delete_preregistration(
     '/{eventId}/csv_download',
     response_model=FileDownloadOut,
     responses={
+        200: {'content': {'text/csv': {}}, 'description': 'Download link, or the CSV itself when streamed'},
         404: {'model': Message, 'description': 'Pre-registration not found'},
         500: {'model': Message, 'description': 'Internal server error'},
     },
@@ -260,15 +261,19 @@ def delete_preregistration(
 )
 def get_preregistration_csv(
     event_id: str = Path(..., title='Event Id', alias=CommonConstants.EVENT_ID),
+    stream: bool = Query(False, title='Stream the CSV in the response instead of returning a download link'),
 ):
     """Get the CSV for a specific event
 
     :param event_id: The event ID.
     :type event_id: str
 
+    :param stream: If True, the CSV is streamed in the response body.
+    :type stream: bool
+
     :return: The csv for the corresponding event
     :rtype: FileDownloadOut
 
     """
     preregistrations_uc = PreRegistrationUsecase()
-    return preregistrations_uc.get_preregistration_csv(event_id=event_id)
+    return preregistrations_uc.get_preregistration_csv(event_id=event_id, stream=stream)
@@ -1,5 +1,5 @@
 from http import HTTPStatus
-from typing import List
+from typing import List, Union
 
 from aws.cognito_settings import AccessUser, get_current_user
 from constants.common_constants import CommonConstants
@@ -9,6 +9,7 @@ from model.file_uploads.file_upload import FileDownloadOut
 from model.registrations.registration import (
     RegistrationIn,
     RegistrationOut,
+    RegistrationPageOut,
     RegistrationPatch,
 )
 from pydantic import EmailStr
@@ -19,8 +20,9 @@ registration_router = APIRouter()
 
 @registration_router.get(
     '',
-    response_model=List[RegistrationOut],
+    response_model=Union[RegistrationPageOut, List[RegistrationOut]],
     responses={
+        400: {'model': Message, 'description': 'Invalid cursor'},
         404: {'model': Message, 'description': 'Registration not found'},
         500: {'model': Message, 'description': 'Internal server error'},
     },
@@ -28,19 +30,29 @@ registration_router = APIRouter()
 )
 @registration_router.get(
     '/',
-    response_model=List[RegistrationOut],
+    response_model=Union[RegistrationPageOut, List[RegistrationOut]],
     response_model_exclude_none=True,
     response_model_exclude_unset=True,
     include_in_schema=False,
 )
 def get_registrations(
     event_id: str = Query(None, title='Event Id', alias=CommonConstants.EVENT_ID),
+    limit: int = Query(None, title='Page Size', ge=1, le=CommonConstants.MAX_PAGE_SIZE),
+    cursor: str = Query(None, title='Page Cursor'),
 ):
     """
     Get a list of registration entries.
+
+    When `limit` is provided, a single page is returned together with the `nextCursor`
+    to pass as `cursor` for the following page.
     """
     registrations_uc = RegistrationUsecase()
-    return registrations_uc.get_registrations(event_id=event_id)
+    if limit is None and cursor is None:
+        return registrations_uc.get_registrations(event_id=event_id)
+
+    return registrations_uc.get_registrations_page(
+        event_id=event_id, limit=limit or CommonConstants.DEFAULT_PAGE_SIZE, cursor=cursor
+    )
 
 
 @registration_router.get(
@@ -190,6 +202,7 @@ def delete_registration(
     '/{eventId}/csv_download',
     response_model=FileDownloadOut,
     responses={
+        200: {'content': {'text/csv': {}}, 'description': 'Download link, or the CSV itself when streamed'},
         404: {'model': Message, 'description': 'Registration not found'},
         500: {'model': Message, 'description': 'Internal server error'},
     },
@@ -204,15 +217,19 @@ def delete_registration(
 )
 def get_registration_csv(
     event_id: str = Path(..., title='Event Id', alias=CommonConstants.EVENT_ID),
+    stream: bool = Query(False, title='Stream the CSV in the response instead of returning a download link'),
 ):
     """Get the CSV for a specific event
 
     :param event_id: The event ID.
     :type event_id: str
 
+    :param stream: If True, the CSV is streamed in the response body.
+    :type stream: bool
+
     :return: The csv for the corresponding event
     :rtype: FileDownloadOut
 
     """
     registrations_uc = RegistrationUsecase()
-    return registrations_uc.get_registration_csv(event_id=event_id)
+    return registrations_uc.get_registration_csv(event_id=event_id, stream=stream)
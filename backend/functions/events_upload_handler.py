@@ -1,6 +1,10 @@
 from usecase.event_usecase import EventUsecase
+from utils.metrics import track_invocation
+from utils.tracing import trace_invocation
 
 
+@track_invocation
+@trace_invocation
 def handler(event, context):
     """Handles an event triggered by an S3 upload
 
@@ -0,0 +1,19 @@
+from usecase.job_usecase import JobUsecase
+from utils.logger import logger
+from utils.metrics import track_invocation
+from utils.tracing import trace_invocation
+
+
+@track_invocation
+@trace_invocation
+def handler(event, context):
+    """
+    Lambda handler for running the jobs sent to the job queue.
+
+    Failed jobs are reported through batchItemFailures so that SQS redelivers them.
+    """
+    _ = context
+    job_usecase = JobUsecase()
+    response = job_usecase.process_job_messages(event)
+    logger.info('Finished processing all records in the event.')
+    return response
@@ -1,15 +1,20 @@
 from usecase.payment_tracking_sqs_usecase import PaymentTrackingSQSUsecase
 from utils.logger import logger
+from utils.metrics import track_invocation
+from utils.tracing import trace_invocation
 
 
+@track_invocation
+@trace_invocation
 def handler(event, context):
     """
     Lambda handler for processing payment tracking messages from an SQS queue.
+
+    Failures of individual records are reported through batchItemFailures so that only those records are
+    redelivered. Any other error is raised so that the whole batch is retried.
     """
     _ = context
-    try:
-        payment_sqs_usecase = PaymentTrackingSQSUsecase()
-        payment_sqs_usecase.process_payment_message(event)
-        logger.info('Finished processing all records in the event.')
-    except Exception as e:
-        logger.error(f'An error occurred in the handler: {e}')
+    payment_sqs_usecase = PaymentTrackingSQSUsecase()
+    response = payment_sqs_usecase.process_payment_message(event)
+    logger.info('Finished processing all records in the event.')
+    return response
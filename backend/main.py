@@ -1,3 +1,4 @@
+import functools
 import os
 
 import lambdawarmer
@@ -6,6 +7,8 @@ from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
 from lambda_decorators import cors_headers
 from mangum import Mangum
+from utils.metrics import RequestMetricsMiddleware, consume_cold_start
+from utils.tracing import TracingMiddleware
 
 STAGE = os.environ.get('STAGE')
 root_path = f'/{STAGE}' if STAGE else '/'
@@ -35,11 +38,36 @@ def welcome():
     return HTMLResponse(content=html_content, status_code=200)
 
 
-api_controller(app)
+# Routers are imported on the first request of their route family when LAZY_ROUTERS is enabled
+api_controller(app, lazy=os.getenv('LAZY_ROUTERS', 'false').lower() == 'true')
+app.add_middleware(TracingMiddleware)
+# added last so that it is the outermost middleware and its timing includes the lazy router import
+app.add_middleware(RequestMetricsMiddleware)
 mangum_handler = Mangum(app, lifespan='off')
 
 
+def preload_on_warmer(func):
+    """Pre-load the Cognito keys on warmer pings, which lambdawarmer answers without calling the handler
+
+    A warmer ping also takes the cold start of the container, so that the metrics of the first request after it
+    are not reported as a cold start.
+    """
+
+    @functools.wraps(func)
+    def wrapped_func(event, context):
+        if isinstance(event, dict) and event.get('warmer'):
+            from aws.cognito_settings import preload_auth_keys
+
+            preload_auth_keys()
+            consume_cold_start()
+
+        return func(event, context)
+
+    return wrapped_func
+
+
 @cors_headers
+@preload_on_warmer
 @lambdawarmer.warmer
 def handler(event, context):
     return mangum_handler(event, context)
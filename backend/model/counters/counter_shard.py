@@ -0,0 +1,13 @@
+from model.entities import Entities
+from pynamodb.attributes import NumberAttribute, UnicodeAttribute
+
+
+class CounterShard(Entities, discriminator='CounterShard'):
+    # hk: CounterShard#<eventId>
+    # rk: <counterName>#<shardIndex>
+
+    # unset, nothing looks the shards up by entryId
+    entryId = UnicodeAttribute(null=True)
+    eventId = UnicodeAttribute(null=True)
+    counterName = UnicodeAttribute(null=True)
+    count = NumberAttribute(default=0)
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class DiscountCodesFormat(str, Enum):
+    CSV = 'csv'
+    JSON = 'json'
@@ -1,13 +1,10 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from constants.common_constants import EmailType
 from pydantic import BaseModel, EmailStr, Field
 
 
-class EmailIn(BaseModel):
-    to: Optional[List[EmailStr]] = Field(None, title='Email address of the recipient')
-    cc: Optional[List[EmailStr]] = Field(None, title='CC Email addresses')
-    bcc: Optional[List[EmailStr]] = Field(None, title='BCC Email address')
+class EmailContent(BaseModel):
     subject: str = Field(..., title='Subject of the email')
     salutation: str = Field(..., title='Salutation of the email')
     body: List[str] = Field(..., title='Body of the email')
@@ -15,3 +12,61 @@ class EmailIn(BaseModel):
     emailType: EmailType = Field(..., title='Type of the email')
     eventId: str = Field(..., title='Event ID of the email')
     isDurianPy: bool = Field(default=True, title='Is this a DURIANPY sent email?')
+
+
+class EmailIn(EmailContent):
+    to: Optional[List[EmailStr]] = Field(None, title='Email address of the recipient')
+    cc: Optional[List[EmailStr]] = Field(None, title='CC Email addresses')
+    bcc: Optional[List[EmailStr]] = Field(None, title='BCC Email address')
+
+
+class EmailRecipient(BaseModel):
+    to: List[EmailStr] = Field(..., title='Email address of the recipient')
+    substitutions: Dict[str, str] = Field(default_factory=dict, title='Values of the template placeholders')
+
+
+class EmailTemplateIn(EmailContent):
+    """
+    An email whose content is shared by every recipient.
+
+    The subject, salutation, body and regards may contain `{name}` placeholders that are replaced
+    with the substitutions of each recipient when the email is rendered.
+    """
+
+    recipients: List[EmailRecipient] = Field(..., title='Recipients of the email')
+
+    def render(self, recipient: EmailRecipient) -> EmailIn:
+        """Render the email of a single recipient
+
+        :param recipient: The recipient of the email
+        :type recipient: EmailRecipient
+
+        :return: The email with the placeholders replaced
+        :rtype: EmailIn
+
+        """
+
+        def substitute(text: str) -> str:
+            for key, value in recipient.substitutions.items():
+                text = text.replace(f'{{{key}}}', value)
+            return text
+
+        return EmailIn(
+            to=recipient.to,
+            subject=substitute(self.subject),
+            salutation=substitute(self.salutation),
+            body=[substitute(paragraph) for paragraph in self.body],
+            regards=[substitute(regard) for regard in self.regards],
+            emailType=self.emailType,
+            eventId=self.eventId,
+            isDurianPy=self.isDurianPy,
+        )
+
+    def to_email_in_list(self) -> List[EmailIn]:
+        """Expand the template into one email per recipient, for consumers of the list message format
+
+        :return: The rendered emails
+        :rtype: List[EmailIn]
+
+        """
+        return [self.render(recipient) for recipient in self.recipients]
@@ -1,5 +1,6 @@
 import os
 
+from aws.aws_clients import DynamoDBModelMeta
 from pynamodb.attributes import (
     DiscriminatorAttribute,
     NumberAttribute,
@@ -9,7 +10,7 @@ from pynamodb.models import Model
 
 
 class Entities(Model):
-    class Meta:
+    class Meta(DynamoDBModelMeta):
         table_name = os.getenv('ENTITIES_TABLE')
         region = os.getenv('REGION')
         billing_mode = 'PAY_PER_REQUEST'
@@ -2,6 +2,7 @@ import os
 from datetime import datetime
 from typing import List
 
+from aws.aws_clients import DynamoDBModelMeta
 from model.evaluations.evaluations_constants import EvaluationQuestionType, QuestionType
 from model.registrations.registration import RegistrationPreviewOut
 from pydantic import BaseModel, Extra, Field
@@ -32,7 +33,7 @@ class QuestionLSI(LocalSecondaryIndex):
 
 
 class Evaluation(Model):
-    class Meta:
+    class Meta(DynamoDBModelMeta):
         table_name = os.getenv('EVALUATIONS_TABLE')
         region = os.getenv('REGION')
         billing_mode = 'PAY_PER_REQUEST'
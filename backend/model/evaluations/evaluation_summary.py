@@ -0,0 +1,52 @@
+from typing import Dict, List
+
+from model.entities import Entities
+from model.evaluations.evaluations_constants import EvaluationQuestionType, QuestionType
+from pydantic import BaseModel, Extra, Field
+from pynamodb.attributes import NumberAttribute, UnicodeAttribute
+
+
+class EvaluationSummary(Entities, discriminator='EvaluationSummary'):
+    # hk: EvaluationSummary#<eventId>
+    # rk: <question>
+
+    # unset, nothing looks the summaries up by entryId
+    entryId = UnicodeAttribute(null=True)
+    eventId = UnicodeAttribute(null=True)
+    question = UnicodeAttribute(null=True)
+    questionType = UnicodeAttribute(null=True)
+    responseCount = NumberAttribute(default=0)
+    answerScaleCount = NumberAttribute(default=0)
+    answerScaleSum = NumberAttribute(default=0)
+
+
+class EvaluationAnswerCount(Entities, discriminator='EvaluationAnswerCount'):
+    # hk: EvaluationSummary#<eventId>
+    # rk: <question>#<answer>
+
+    entryId = UnicodeAttribute(null=True)
+    eventId = UnicodeAttribute(null=True)
+    question = UnicodeAttribute(null=True)
+    answer = UnicodeAttribute(null=True)
+    count = NumberAttribute(default=0)
+
+
+class EvaluationQuestionSummaryOut(BaseModel):
+    class Config:
+        extra = Extra.ignore
+
+    question: EvaluationQuestionType = Field(None, title='Question')
+    questionType: QuestionType = Field(None, title='Question Type')
+    responseCount: int = Field(0, title='Response Count')
+    answerScaleCount: int = Field(0, title='Answer Scale Count')
+    answerScaleSum: int = Field(0, title='Answer Scale Sum')
+    answerScaleAverage: float = Field(None, title='Answer Scale Average')
+    answerCounts: Dict[str, int] = Field({}, title='Count per Answer')
+
+
+class EvaluationSummaryOut(BaseModel):
+    class Config:
+        extra = Extra.ignore
+
+    eventId: str = Field(None, title='Event ID')
+    questions: List[EvaluationQuestionSummaryOut] = Field([], title='Summary per Question')
@@ -20,3 +20,11 @@ class QuestionType(str, Enum):
     BOOLEAN = 'boolean'
     MULTIPLE_CHOICE_WITH_OTHER = 'multiple_choice_with_other'
     MULTIPLE_ANSWERS = 'multiple_answers'
+
+
+# the options of the choice questions, the evaluation summary counts every other answer as OTHER_ANSWER
+QUESTION_OPTIONS = {
+    EvaluationQuestionType.NOTIFIED_OF_FUTURE_EVENTS.value: ('Yes', 'No'),
+}
+ANSWER_SCALES = range(1, 6)
+OTHER_ANSWER = 'other'
@@ -2,6 +2,7 @@ import os
 from datetime import datetime
 from typing import List, Optional
 
+from aws.aws_clients import DynamoDBModelMeta
 from model.events.events_constants import EventStatus
 from model.ticket_types.ticket_types import TicketTypeIn, TicketTypeOut
 from pydantic import BaseModel, EmailStr, Extra, Field, root_validator
@@ -24,7 +25,7 @@ class EventIdIndex(LocalSecondaryIndex):
 class Event(Model):
     # hk: v<version_number>
     # rk: <adminId>#<eventId>
-    class Meta:
+    class Meta(DynamoDBModelMeta):
         table_name = os.getenv('EVENTS_TABLE')
         region = os.getenv('REGION')
         billing_mode = 'PAY_PER_REQUEST'
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Optional
+
+from model.entities import Entities
+from model.jobs.jobs_constants import JobStatus, JobType
+from pydantic import BaseModel, Extra, Field
+from pynamodb.attributes import ListAttribute, NumberAttribute, UnicodeAttribute
+
+
+class Job(Entities, discriminator='Job'):
+    # hk: Job#<eventId>
+    # rk: v0#<jobType>
+    # entryId is regenerated on every run, so messages of an older run can be told apart
+    eventId = UnicodeAttribute(null=False)
+    jobType = UnicodeAttribute(null=False)
+    jobStatus = UnicodeAttribute(null=False)
+    cursor = UnicodeAttribute(null=True)
+    processedCount = NumberAttribute(default=0)
+    # IDs of the items a run claimed but has not confirmed as queued yet, carried over to the next run
+    claimedIds = ListAttribute(of=UnicodeAttribute, null=True)
+    message = UnicodeAttribute(null=True)
+
+
+class JobMessage(BaseModel):
+    class Config:
+        extra = Extra.ignore
+
+    jobType: JobType = Field(..., title='Type of the job')
+    eventId: str = Field(..., title='Event ID of the job')
+    jobId: Optional[str] = Field(None, title='ID of the job run')
+
+
+class JobOut(BaseModel):
+    class Config:
+        extra = Extra.ignore
+
+    jobId: str = Field(..., title='ID of the job run')
+    jobType: JobType = Field(..., title='Type of the job')
+    eventId: str = Field(..., title='Event ID of the job')
+    jobStatus: JobStatus = Field(..., title='Status of the job')
+    processedCount: int = Field(0, title='Number of items processed so far')
+    message: Optional[str] = Field(None, title='Error message of the last failed attempt')
+    createDate: datetime = Field(..., title='Queued At')
+    updateDate: datetime = Field(..., title='Updated At')
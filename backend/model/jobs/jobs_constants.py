@@ -0,0 +1,13 @@
+from enum import Enum
+
+
+class JobType(str, Enum):
+    ACCEPT_REJECT_EMAILS = 'acceptRejectEmails'
+    EVENT_COMPLETION_EMAILS = 'eventCompletionEmails'
+
+
+class JobStatus(str, Enum):
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 from model.entities import Entities
 from model.pycon_registrations.pycon_registration import (
@@ -8,6 +8,7 @@ from model.pycon_registrations.pycon_registration import (
 )
 from pydantic import BaseModel, Field
 from pynamodb.attributes import BooleanAttribute, NumberAttribute, UnicodeAttribute
+from pynamodb.indexes import AllProjection, GlobalSecondaryIndex, IncludeProjection
 
 
 class TransactionStatus(str, Enum):
@@ -16,13 +17,42 @@ class TransactionStatus(str, Enum):
     FAILED = 'FAILED'
 
 
+class PaymentTransactionIdIndex(GlobalSecondaryIndex):
+    class Meta:
+        index_name = 'PaymentTransactionIdIndex'
+        # cls is the discriminator that PynamoDB filters every query of a subclass on
+        projection = IncludeProjection(['cls'])
+        read_capacity_units = 1
+        write_capacity_units = 1
+
+    paymentTransactionId = UnicodeAttribute(hash_key=True)
+
+
+class TransactionStatusIndex(GlobalSecondaryIndex):
+    class Meta:
+        index_name = 'TransactionStatusIndex'
+        projection = AllProjection()
+        read_capacity_units = 1
+        write_capacity_units = 1
+
+    latestTransactionStatus = UnicodeAttribute(hash_key=True)
+    createDate = UnicodeAttribute(range_key=True)
+
+
 class PaymentTransaction(Entities, discriminator='PaymentTransaction'):
     # hk: PaymentTransaction#<eventId>
     # rk: v<version_number>#<entry_id>
 
+    paymentTransactionIdIndex = PaymentTransactionIdIndex()
+    transactionStatusIndex = TransactionStatusIndex()
+
     price = NumberAttribute(null=False)
     eventId = UnicodeAttribute(null=False)
     transactionStatus = UnicodeAttribute(null=False)
+    # copies of entryId and transactionStatus kept only on the latest (v0) entry, so that
+    # PaymentTransactionIdIndex and TransactionStatusIndex stay sparse
+    paymentTransactionId = UnicodeAttribute(null=True)
+    latestTransactionStatus = UnicodeAttribute(null=True)
 
     # registration data - core info
     firstName = UnicodeAttribute(null=True)
@@ -86,6 +116,14 @@ class PaymentTransactionOut(PaymentTransactionIn):
     gcashPayment: Optional[dict] = Field(None, title='GCash Payment Details')
 
 
+class PaymentTransactionPageOut(BaseModel):
+    class Config:
+        extra = 'ignore'
+
+    paymentTransactions: List[PaymentTransactionOut] = Field(..., title='Payment Transactions')
+    nextCursor: Optional[str] = Field(None, title='Cursor of the next page')
+
+
 class PaymentTrackingBody(BaseModel):
     class Config:
         extra = 'ignore'
@@ -2,6 +2,7 @@ import os
 from datetime import datetime
 from typing import Optional
 
+from aws.aws_clients import DynamoDBModelMeta
 from model.preregistrations.preregistrations_constants import AcceptanceStatus
 from pydantic import BaseModel, EmailStr, Extra, Field
 from pynamodb.attributes import BooleanAttribute, UnicodeAttribute
@@ -31,7 +32,7 @@ class EmailLSI(LocalSecondaryIndex):
 
 
 class PreRegistration(Model):
-    class Meta:
+    class Meta(DynamoDBModelMeta):
         table_name = os.getenv('PREREGISTRATIONS_TABLE')
         region = os.getenv('REGION')
         billing_mode = 'PAY_PER_REQUEST'
@@ -1,7 +1,8 @@
 import os
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
+from aws.aws_clients import DynamoDBModelMeta
 from pydantic import BaseModel, EmailStr, Extra, Field
 from pynamodb.attributes import BooleanAttribute, NumberAttribute, UnicodeAttribute
 from pynamodb.indexes import AllProjection, GlobalSecondaryIndex, LocalSecondaryIndex
@@ -30,7 +31,7 @@ class EmailLSI(LocalSecondaryIndex):
 
 
 class Registration(Model):
-    class Meta:
+    class Meta(DynamoDBModelMeta):
         table_name = os.getenv('REGISTRATIONS_TABLE')
         region = os.getenv('REGION')
         billing_mode = 'PAY_PER_REQUEST'
@@ -168,6 +169,14 @@ class RegistrationOut(RegistrationIn):
     certificateGenerated: bool = Field(None, title='Certificate Generated')
 
 
+class RegistrationPageOut(BaseModel):
+    class Config:
+        extra = Extra.ignore
+
+    registrations: List[RegistrationOut] = Field(..., title='Registrations')
+    nextCursor: Optional[str] = Field(None, title='Cursor of the next page')
+
+
 class RegistrationPreviewOut(BaseModel):
     class Config:
         extra = Extra.ignore
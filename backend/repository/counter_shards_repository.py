@@ -0,0 +1,320 @@
+import os
+import random
+from collections import defaultdict
+from datetime import datetime
+from http import HTTPStatus
+from typing import Dict, Iterable, Optional, Tuple
+
+import pytz
+from aws.aws_clients import AWSClients
+from constants.common_constants import EntryStatus
+from model.counters.counter_shard import CounterShard
+from model.events.event import Event
+from model.ticket_types.ticket_types import TicketType
+from pynamodb.connection import Connection
+from pynamodb.exceptions import (
+    PynamoDBConnectionError,
+    QueryError,
+    TableDoesNotExist,
+    TransactWriteError,
+)
+from pynamodb.transactions import TransactWrite
+from utils.cache import TTLCache
+from utils.logger import logger
+from utils.tracing import traced
+
+
+@traced
+class CounterShardsRepository:
+    """
+    A repository class for sharded counters of an event, e.g. its registration count and ticket type sales.
+
+    With COUNTER_SHARD_COUNT above 1, increments go to one of N shard items picked at random instead of to the
+    counter attribute of the event or ticket type, so concurrent registrations do not all contend on one item.
+    The counter attribute is kept as the base of the count and the shards hold everything counted on top of it.
+    A counter with a limit splits the remaining capacity between its shards, so each shard can enforce its part
+    with a condition expression and the total can never go over the limit.
+
+    The shards are read into every total even with sharding disabled, since a counter keeps what its shards
+    counted until scripts/fold_counter_shards.py moves it back into the base.
+
+    Attributes:
+        shard_count (int): The number of shards per counter, 1 disables sharding.
+        counts_cache (TTLCache): The shard counts of recently read events, kept briefly.
+    """
+
+    REGISTRATION_COUNT = 'registrationCount'
+
+    shard_count = max(1, int(os.getenv('COUNTER_SHARD_COUNT', '1')))
+    # Shared by every instance, a read of the totals is only cached briefly since the shards change constantly
+    counts_cache = TTLCache(
+        maxsize=int(os.getenv('COUNTER_CACHE_MAX_SIZE', '256')),
+        ttl=float(os.getenv('COUNTER_CACHE_TTL_SECONDS', '2')),
+    )
+
+    def __init__(self, connection: Connection = None) -> None:
+        self.core_obj = 'CounterShard'
+        self.current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
+        self.latest_version = 0
+        self.conn = connection or AWSClients.get_connection()
+
+    @property
+    def enabled(self) -> bool:
+        return self.shard_count > 1
+
+    @staticmethod
+    def ticket_type_sales_counter(ticket_type_entry: TicketType) -> str:
+        return f'currentSales#{ticket_type_entry.entryId}'
+
+    def query_shard_counts(self, event_id: str, use_cache: bool = True) -> Dict[str, Dict[int, int]]:
+        """Query the count of every shard of every counter of an event.
+
+        :param event_id: The event ID.
+        :type event_id: str
+
+        :param use_cache: Whether a recent read may be served from the cache.
+        :type use_cache: bool
+
+        :return: The count of each shard index, per counter name. Missing shards have not been counted yet.
+        :rtype: Dict[str, Dict[int, int]]
+
+        """
+        if use_cache:
+            cached_counts = self.counts_cache.get(event_id)
+            if cached_counts is not None:
+                return cached_counts
+
+        shard_counts = defaultdict(dict)
+        try:
+            for shard_entry in CounterShard.query(hash_key=f'{self.core_obj}#{event_id}'):
+                counter_name, _, shard_index = shard_entry.rangeKey.rpartition('#')
+                shard_counts[counter_name][int(shard_index)] = int(shard_entry.count or 0)
+
+        except (QueryError, TableDoesNotExist, PynamoDBConnectionError) as e:
+            # the shards are only ever added to the base count, so an unreadable shard reads as uncounted
+            logger.error(f'[{self.core_obj}={event_id}] Failed to query counter shards: {str(e)}')
+            return {}
+
+        shard_counts = dict(shard_counts)
+        self.counts_cache.set(event_id, shard_counts)
+        return shard_counts
+
+    def get_shard_total(self, event_id: str, counter_name: str) -> int:
+        """Get the sum of the shards of a counter, i.e. what it counted on top of its base count.
+
+        :param event_id: The event ID of the counter.
+        :type event_id: str
+
+        :param counter_name: The counter name.
+        :type counter_name: str
+
+        :return: The sum of every shard of the counter, 0 if it has none.
+        :rtype: int
+
+        """
+        return sum(self.query_shard_counts(event_id).get(counter_name, {}).values())
+
+    def get_event_registration_count(self, event_entry: Event) -> int:
+        """Get the registration count of an event, including its shards.
+
+        :param event_entry: The event.
+        :type event_entry: Event
+
+        :return: The registration count.
+        :rtype: int
+
+        """
+        base_count = event_entry.registrationCount or 0
+        return base_count + self.get_shard_total(event_entry.eventId, self.REGISTRATION_COUNT)
+
+    def get_ticket_type_sales(self, ticket_type_entry: TicketType) -> int:
+        """Get the sales of a ticket type, including its shards.
+
+        :param ticket_type_entry: The ticket type.
+        :type ticket_type_entry: TicketType
+
+        :return: The current sales.
+        :rtype: int
+
+        """
+        base_count = ticket_type_entry.currentSales or 0
+        counter_name = self.ticket_type_sales_counter(ticket_type_entry)
+        return base_count + self.get_shard_total(ticket_type_entry.eventId, counter_name)
+
+    def get_shard_limits(self, event_id: str, counter_name: str, remaining: int) -> Dict[int, int]:
+        """Get the part of the remaining capacity of a counter that each shard may count.
+
+        The capacity is split evenly between the shards, after taking out what the split can not limit anymore:
+        the counts of shards at an index of COUNTER_SHARD_COUNT or above, e.g. from before it was lowered, and
+        what a shard counted above its part, e.g. from before it was raised. Those shards are full, so the
+        limits of every shard never add up to more than the capacity.
+
+        :param event_id: The event ID of the counter.
+        :type event_id: str
+
+        :param counter_name: The counter name.
+        :type counter_name: str
+
+        :param remaining: The capacity of the counter above its base count.
+        :type remaining: int
+
+        :return: The limit of each shard index below COUNTER_SHARD_COUNT.
+        :rtype: Dict[int, int]
+
+        """
+        shard_counts = self.query_shard_counts(event_id).get(counter_name, {})
+        remaining -= sum(count for shard_index, count in shard_counts.items() if shard_index >= self.shard_count)
+
+        # a smaller split leaves more shards above their part, so split again until the excess stops growing
+        excess = 0
+        while True:
+            split = max(0, remaining - excess)
+            shard_limits = {
+                shard_index: split // self.shard_count + (1 if shard_index < split % self.shard_count else 0)
+                for shard_index in range(self.shard_count)
+            }
+            split_excess = sum(
+                max(0, shard_counts.get(shard_index, 0) - shard_limit)
+                for shard_index, shard_limit in shard_limits.items()
+            )
+            if split_excess == excess:
+                return shard_limits
+
+            excess = split_excess
+
+    def pick_shard(
+        self,
+        event_id: str,
+        counter_name: str,
+        remaining: Optional[int] = None,
+        excluded_shards: Iterable[int] = (),
+        append_count: int = 1,
+    ) -> Optional[int]:
+        """Pick a random shard of a counter that still has capacity.
+
+        :param event_id: The event ID of the counter.
+        :type event_id: str
+
+        :param counter_name: The counter name.
+        :type counter_name: str
+
+        :param remaining: The capacity of the counter above its base count, None if it has no limit.
+        :type remaining: Optional[int]
+
+        :param excluded_shards: Shards known to be full, e.g. from a cancelled transaction.
+        :type excluded_shards: Iterable[int]
+
+        :param append_count: The count to be appended.
+        :type append_count: int
+
+        :return: The shard index, or None if every shard is full.
+        :rtype: Optional[int]
+
+        """
+        excluded_shards = set(excluded_shards)
+        shard_indexes = [shard_index for shard_index in range(self.shard_count) if shard_index not in excluded_shards]
+        if remaining is not None:
+            shard_counts = self.query_shard_counts(event_id).get(counter_name, {})
+            shard_limits = self.get_shard_limits(event_id, counter_name, remaining)
+            shard_indexes = [
+                shard_index
+                for shard_index in shard_indexes
+                if shard_counts.get(shard_index, 0) + append_count <= shard_limits[shard_index]
+            ]
+
+        return random.choice(shard_indexes) if shard_indexes else None
+
+    def add_increment(
+        self,
+        transaction: TransactWrite,
+        event_id: str,
+        counter_name: str,
+        shard_index: int,
+        remaining: Optional[int] = None,
+        append_count: int = 1,
+    ) -> None:
+        """Add the increment of a shard of a counter to a transaction, conditioned on the limit of the shard.
+
+        :param transaction: The transaction to add the increment to.
+        :type transaction: TransactWrite
+
+        :param event_id: The event ID of the counter.
+        :type event_id: str
+
+        :param counter_name: The counter name.
+        :type counter_name: str
+
+        :param shard_index: The shard index, see pick_shard.
+        :type shard_index: int
+
+        :param remaining: The capacity of the counter above its base count, None if it has no limit.
+        :type remaining: Optional[int]
+
+        :param append_count: The count to be appended.
+        :type append_count: int
+
+        """
+        condition = None
+        if remaining is not None:
+            shard_limit = self.get_shard_limits(event_id, counter_name, remaining)[shard_index]
+            condition = CounterShard.count <= shard_limit - append_count
+            if shard_limit >= append_count:
+                condition = CounterShard.count.does_not_exist() | condition
+
+        transaction.update(
+            self.__shard_entry(event_id, counter_name, shard_index),
+            actions=[
+                CounterShard.count.add(append_count),
+                CounterShard.cls.set(CounterShard),
+                CounterShard.eventId.set(event_id),
+                CounterShard.counterName.set(counter_name),
+                CounterShard.entryId.remove(),
+                CounterShard.entryStatus.set(EntryStatus.ACTIVE.value),
+                CounterShard.latestVersion.set(self.latest_version),
+                CounterShard.updateDate.set(self.current_date),
+            ],
+            condition=condition,
+        )
+
+    def increment(
+        self, event_id: str, counter_name: str, append_count: int = 1
+    ) -> Tuple[HTTPStatus, Optional[int], str]:
+        """Increment a random shard of a counter without checking its limit.
+
+        :param event_id: The event ID of the counter.
+        :type event_id: str
+
+        :param counter_name: The counter name.
+        :type counter_name: str
+
+        :param append_count: The count to be appended.
+        :type append_count: int
+
+        :return: The HTTP status, the shard index that was incremented, and a message.
+        :rtype: Tuple[HTTPStatus, Optional[int], str]
+
+        """
+        try:
+            shard_index = self.pick_shard(event_id=event_id, counter_name=counter_name)
+            with TransactWrite(connection=self.conn) as transaction:
+                self.add_increment(
+                    transaction,
+                    event_id=event_id,
+                    counter_name=counter_name,
+                    shard_index=shard_index,
+                    append_count=append_count,
+                )
+
+            logger.info(f'[{self.core_obj}={event_id}] Increment {counter_name} shard {shard_index} successful')
+            return HTTPStatus.OK, shard_index, ''
+
+        except TransactWriteError as e:
+            message = f'Failed to increment {counter_name} shard: {str(e)}'
+            logger.error(f'[{self.core_obj}={event_id}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+
+    def invalidate_cached_counts(self, event_id: str) -> None:
+        self.counts_cache.invalidate(event_id)
+
+    def __shard_entry(self, event_id: str, counter_name: str, shard_index: int) -> CounterShard:
+        return CounterShard(hashKey=f'{self.core_obj}#{event_id}', rangeKey=f'{counter_name}#{shard_index}')
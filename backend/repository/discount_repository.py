@@ -2,13 +2,15 @@ import os
 from copy import deepcopy
 from datetime import datetime
 from http import HTTPStatus
-from typing import List, Tuple
+from typing import Iterable, List, Set, Tuple
 
 import pytz
+from aws.aws_clients import AWSClients
 from constants.common_constants import EntryStatus
 from model.discount.discount import Discount, DiscountDBIn
 from pynamodb.connection import Connection
 from pynamodb.exceptions import (
+    GetError,
     PutError,
     PynamoDBConnectionError,
     QueryError,
@@ -18,14 +20,16 @@ from pynamodb.exceptions import (
 from pynamodb.transactions import TransactWrite
 from repository.repository_utils import RepositoryUtils
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class DiscountsRepository:
-    def __init__(self) -> None:
+    def __init__(self, connection: Connection = None) -> None:
         self.core_obj = 'Discount'
         self.current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
         self.latest_version = 0
-        self.conn = Connection(region=os.getenv('REGION'))
+        self.conn = connection or AWSClients.get_connection()
 
     def store_discount(self, discount_in: DiscountDBIn) -> Tuple[HTTPStatus, Discount, str]:
         """Store a new discount.
@@ -37,22 +41,9 @@ class DiscountsRepository:
         :rtype: Tuple[HTTPStatus, Discount, str]
 
         """
-        data = RepositoryUtils.load_data(pydantic_schema_in=discount_in)
         entry_id = discount_in.entryId
-        event_id = discount_in.eventId
-        range_key = f'v{self.latest_version}#{event_id}#{entry_id}'
         try:
-            discount_entry = Discount(
-                hashKey=self.core_obj,
-                rangeKey=range_key,
-                createDate=self.current_date,
-                updateDate=self.current_date,
-                createdBy=os.getenv('CURRENT_USER'),
-                updatedBy=os.getenv('CURRENT_USER'),
-                latestVersion=self.latest_version,
-                entryStatus=EntryStatus.ACTIVE.value,
-                **data,
-            )
+            discount_entry = self.__build_discount_entry(discount_in)
             discount_entry.save()
 
         except PutError as e:
@@ -71,6 +62,82 @@ class DiscountsRepository:
             logger.info(f'[{self.core_obj} = {entry_id}]: Save Discounts strategy data successful')
             return HTTPStatus.OK, discount_entry, None
 
+    def store_discounts(self, discounts_in: List[DiscountDBIn]) -> Tuple[HTTPStatus, List[Discount], str]:
+        """Store many new discounts with BatchWriteItem.
+
+        Items are written in batches of 25, the BatchWriteItem limit, and items left unprocessed by DynamoDB
+        are written again until every item has been stored.
+
+        :param discounts_in: The discounts data to store.
+        :type discounts_in: List[DiscountDBIn]
+
+        :return: The HTTP status, the stored discounts or None, and a message.
+        :rtype: Tuple[HTTPStatus, List[Discount], str]
+
+        """
+        try:
+            discount_entries = [self.__build_discount_entry(discount_in) for discount_in in discounts_in]
+            with Discount.batch_write() as batch:
+                for discount_entry in discount_entries:
+                    batch.save(discount_entry)
+
+        except PutError as e:
+            message = f'Failed to save discounts: {str(e)}'
+            logger.error(f'[{self.core_obj}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except TableDoesNotExist as db_error:
+            message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
+            logger.error(f'[{self.core_obj}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except PynamoDBConnectionError as db_error:
+            message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
+            logger.error(f'[{self.core_obj}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        else:
+            logger.info(f'[{self.core_obj}]: Save {len(discount_entries)} discounts successful')
+            return HTTPStatus.OK, discount_entries, None
+
+    def query_existing_discount_ids(
+        self, event_id: str, discount_ids: Iterable[str]
+    ) -> Tuple[HTTPStatus, Set[str], str]:
+        """Query which discount IDs of an event are already taken, with BatchGetItem.
+
+        Deleted discounts are included, since storing a discount with the same ID would overwrite them.
+
+        :param event_id: The ID of the event.
+        :type event_id: str
+
+        :param discount_ids: The discount IDs to check.
+        :type discount_ids: Iterable[str]
+
+        :return: The HTTP status, the discount IDs that already exist or None, and a message.
+        :rtype: Tuple[HTTPStatus, Set[str], str]
+
+        """
+        discount_keys = {
+            (self.core_obj, f'v{self.latest_version}#{event_id}#{discount_id}') for discount_id in discount_ids
+        }
+        if not discount_keys:
+            return HTTPStatus.OK, set(), None
+
+        try:
+            existing_ids = {discount_entry.entryId for discount_entry in Discount.batch_get(discount_keys)}
+
+        except GetError as e:
+            message = f'Failed to batch get discounts: {str(e)}'
+            logger.error(f'[{self.core_obj}={event_id}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except TableDoesNotExist as db_error:
+            message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
+            logger.error(f'[{self.core_obj}={event_id}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except PynamoDBConnectionError as db_error:
+            message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
+            logger.error(f'[{self.core_obj}={event_id}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        else:
+            return HTTPStatus.OK, existing_ids, None
+
     def query_discounts(self, event_id: str) -> Tuple[HTTPStatus, List[Discount], str]:
         """Query discounts by event.
 
@@ -195,7 +262,7 @@ class DiscountsRepository:
                     updatedBy=os.getenv('CURRENT_USER'),
                     latestVersion=new_version,
                 )
-                actions = [getattr(Discount, k).set(v) for k, v in updated_data.items()]
+                actions = RepositoryUtils.get_update_actions(Discount, updated_data)
                 transaction.update(discount_entry, actions=actions)
 
                 # Store Old Entry --------------------------------------------------------------------------
@@ -283,3 +350,18 @@ class DiscountsRepository:
             message = f'Failed to update discount uses: {str(e)}'
             logger.error(f'[{discount_entry.rangeKey}] {message}')
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+
+    def __build_discount_entry(self, discount_in: DiscountDBIn) -> Discount:
+        data = RepositoryUtils.load_data(pydantic_schema_in=discount_in)
+        range_key = f'v{self.latest_version}#{discount_in.eventId}#{discount_in.entryId}'
+        return Discount(
+            hashKey=self.core_obj,
+            rangeKey=range_key,
+            createDate=self.current_date,
+            updateDate=self.current_date,
+            createdBy=os.getenv('CURRENT_USER'),
+            updatedBy=os.getenv('CURRENT_USER'),
+            latestVersion=self.latest_version,
+            entryStatus=EntryStatus.ACTIVE.value,
+            **data,
+        )
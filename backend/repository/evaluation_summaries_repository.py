@@ -0,0 +1,247 @@
+from datetime import datetime
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+from aws.aws_clients import AWSClients
+from constants.common_constants import EntryStatus
+from model.entities import Entities
+from model.evaluations.evaluation_summary import (
+    EvaluationAnswerCount,
+    EvaluationSummary,
+)
+from model.evaluations.evaluations_constants import (
+    ANSWER_SCALES,
+    OTHER_ANSWER,
+    QUESTION_OPTIONS,
+    QuestionType,
+)
+from pynamodb.connection import Connection
+from pynamodb.exceptions import PynamoDBConnectionError, QueryError, TableDoesNotExist
+from pynamodb.expressions.update import Action
+from utils.logger import logger
+from utils.tracing import traced
+
+
+@traced
+class EvaluationSummariesRepository:
+    """
+    A repository class for the running summary of the evaluations of an event.
+
+    Each question has a summary item with its response count and the count and sum of its answer scales, and
+    every closed answer of a choice, scale or boolean question is counted in its own item beside it, with the
+    rest under a single OTHER_ANSWER item. Every change is an ADD, which creates the item on first use, and is
+    written in the same transaction as the evaluation that makes it, so the whole summary of an event is one
+    query of a few items per question.
+    """
+
+    COUNTED_ANSWER_TYPES = (QuestionType.MULTIPLE_CHOICE.value, QuestionType.MULTIPLE_CHOICE_WITH_OTHER.value)
+
+    def __init__(self, connection: Connection = None) -> None:
+        self.core_obj = 'EvaluationSummary'
+        self.current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
+        self.latest_version = 0
+        self.conn = connection or AWSClients.get_connection()
+
+    def query_evaluation_summaries(self, event_id: str) -> Tuple[HTTPStatus, List[Entities], str]:
+        """Query the summary and answer count items of every question of an event.
+
+        :param event_id: The event ID.
+        :type event_id: str
+
+        :return: Tuple containing the HTTP status, the EvaluationSummary and EvaluationAnswerCount objects, and
+            a message. An event without evaluations has no items.
+        :rtype: Tuple[HTTPStatus, List[Entities], str]
+
+        """
+        try:
+            summary_entries = list(Entities.query(hash_key=f'{self.core_obj}#{event_id}'))
+
+        except QueryError as e:
+            message = f'Failed to query evaluation summary: {str(e)}'
+            logger.error(f'[{self.core_obj}={event_id}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except TableDoesNotExist as db_error:
+            message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
+            logger.error(f'[{self.core_obj}={event_id}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except PynamoDBConnectionError as db_error:
+            message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
+            logger.error(f'[{self.core_obj}={event_id}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        else:
+            logger.info(f'[{self.core_obj}={event_id}] Fetch Evaluation Summary data successful')
+            return HTTPStatus.OK, summary_entries, None
+
+    def get_summary_changes(
+        self,
+        event_id: str,
+        question: str,
+        old_evaluation: Optional[dict],
+        new_evaluation: Optional[dict],
+    ) -> List[Tuple[Entities, List[Action]]]:
+        """Get the updates of the summary items for the change from the old to the new answer of a question.
+
+        The updates are meant for the transaction that writes the evaluation.
+
+        :param event_id: The event ID.
+        :type event_id: str
+
+        :param question: The question.
+        :type question: str
+
+        :param old_evaluation: The stored evaluation data, None if there is none yet.
+        :type old_evaluation: Optional[dict]
+
+        :param new_evaluation: The evaluation data to be stored.
+        :type new_evaluation: Optional[dict]
+
+        :return: The summary item and the update actions of each item that changes.
+        :rtype: List[Tuple[Entities, List[Action]]]
+
+        """
+        old_totals, old_answers = self.__summary_counts(question, old_evaluation)
+        new_totals, new_answers = self.__summary_counts(question, new_evaluation)
+        hash_key = f'{self.core_obj}#{event_id}'
+        summary_changes = []
+
+        total_changes = {
+            name: new_totals.get(name, 0) - old_totals.get(name, 0) for name in sorted({*old_totals, *new_totals})
+        }
+        total_changes = {name: change for name, change in total_changes.items() if change}
+        old_question_type = (old_evaluation or {}).get('questionType')
+        question_type = (new_evaluation or {}).get('questionType') or old_question_type
+        if total_changes or question_type != old_question_type:
+            actions = [getattr(EvaluationSummary, name).add(change) for name, change in total_changes.items()]
+            if question_type:
+                actions.append(EvaluationSummary.questionType.set(question_type))
+
+            summary_changes.append(
+                (
+                    EvaluationSummary(hashKey=hash_key, rangeKey=question),
+                    [
+                        *actions,
+                        EvaluationSummary.cls.set(EvaluationSummary),
+                        EvaluationSummary.eventId.set(event_id),
+                        EvaluationSummary.question.set(question),
+                        EvaluationSummary.entryId.remove(),
+                        EvaluationSummary.entryStatus.set(EntryStatus.ACTIVE.value),
+                        EvaluationSummary.latestVersion.set(self.latest_version),
+                        EvaluationSummary.updateDate.set(self.current_date),
+                    ],
+                )
+            )
+
+        for answer in sorted({*old_answers, *new_answers}):
+            change = new_answers.get(answer, 0) - old_answers.get(answer, 0)
+            if not change:
+                continue
+
+            summary_changes.append(
+                (
+                    EvaluationAnswerCount(hashKey=hash_key, rangeKey=f'{question}#{answer}'),
+                    [
+                        EvaluationAnswerCount.count.add(change),
+                        EvaluationAnswerCount.cls.set(EvaluationAnswerCount),
+                        EvaluationAnswerCount.eventId.set(event_id),
+                        EvaluationAnswerCount.question.set(question),
+                        EvaluationAnswerCount.answer.set(answer),
+                        EvaluationAnswerCount.entryId.remove(),
+                        EvaluationAnswerCount.entryStatus.set(EntryStatus.ACTIVE.value),
+                        EvaluationAnswerCount.latestVersion.set(self.latest_version),
+                        EvaluationAnswerCount.updateDate.set(self.current_date),
+                    ],
+                )
+            )
+
+        return summary_changes
+
+    def build_evaluation_summaries(self, event_id: str, evaluations: List[dict]) -> List[Entities]:
+        """Build the summary and answer count items of an event from all of its evaluations.
+
+        Used to backfill the summaries of evaluations stored before they were maintained, the counts are totals
+        rather than changes.
+
+        :param event_id: The event ID.
+        :type event_id: str
+
+        :param evaluations: The data of every evaluation of the event.
+        :type evaluations: List[dict]
+
+        :return: The EvaluationSummary and EvaluationAnswerCount objects, unsaved.
+        :rtype: List[Entities]
+
+        """
+        hash_key = f'{self.core_obj}#{event_id}'
+        common = {
+            'hashKey': hash_key,
+            'eventId': event_id,
+            'entryStatus': EntryStatus.ACTIVE.value,
+            'latestVersion': self.latest_version,
+            'createDate': self.current_date,
+            'updateDate': self.current_date,
+        }
+        summaries: Dict[str, EvaluationSummary] = {}
+        answer_counts: Dict[Tuple[str, str], EvaluationAnswerCount] = {}
+        for evaluation in evaluations:
+            question = evaluation['question']
+            totals, answers = self.__summary_counts(question, evaluation)
+            summary = summaries.get(question)
+            if summary is None:
+                summary = summaries[question] = EvaluationSummary(rangeKey=question, question=question, **common)
+
+            summary.questionType = evaluation.get('questionType') or summary.questionType
+            for name, count in totals.items():
+                setattr(summary, name, getattr(summary, name) + count)
+
+            for answer, count in answers.items():
+                answer_count = answer_counts.get((question, answer))
+                if answer_count is None:
+                    answer_count = answer_counts[question, answer] = EvaluationAnswerCount(
+                        rangeKey=f'{question}#{answer}', question=question, answer=answer, **common
+                    )
+
+                answer_count.count += count
+
+        return [*summaries.values(), *answer_counts.values()]
+
+    @classmethod
+    def __summary_counts(cls, question: str, evaluation: Optional[dict]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Get what an evaluation counts towards the summary of its question.
+
+        Only the closed answers are counted apart, i.e. the answer scales, the boolean answers and the known
+        options of a choice question. Every other answer of a choice question is counted as OTHER_ANSWER, so
+        that free text never becomes an item or a sort key of its own.
+
+        :param question: The question.
+        :type question: str
+
+        :param evaluation: The evaluation data, None if there is none.
+        :type evaluation: Optional[dict]
+
+        :return: The counts of the summary item by attribute name, and the count of each answer.
+        :rtype: Tuple[Dict[str, int], Dict[str, int]]
+
+        """
+        if not evaluation:
+            return {}, {}
+
+        totals = {'responseCount': 1}
+        answers = []
+        answer_scale = evaluation.get('answerScale')
+        if answer_scale is not None:
+            answer_scale = int(answer_scale)
+            totals.update(answerScaleCount=1, answerScaleSum=answer_scale)
+            answers.append(str(answer_scale) if answer_scale in ANSWER_SCALES else OTHER_ANSWER)
+
+        boolean_answer = evaluation.get('booleanAnswer')
+        if boolean_answer is not None:
+            answers.append(str(boolean_answer).lower())
+
+        choices = list(evaluation.get('multipleAnswers') or [])
+        if evaluation.get('answer') and evaluation.get('questionType') in cls.COUNTED_ANSWER_TYPES:
+            choices.append(evaluation['answer'])
+
+        options = QUESTION_OPTIONS.get(question, ())
+        answers.extend(choice if choice in options else OTHER_ANSWER for choice in choices)
+        return totals, dict.fromkeys(answers, 1)
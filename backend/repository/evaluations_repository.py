@@ -4,28 +4,34 @@ from http import HTTPStatus
 from typing import List, Tuple
 
 import pytz
+from aws.aws_clients import AWSClients
+from constants.common_constants import CommonConstants
 from model.evaluations.evaluation import Evaluation, EvaluationListIn, EvaluationPatch
 from pynamodb.connection import Connection
 from pynamodb.exceptions import (
-    PutError,
     PynamoDBConnectionError,
     QueryError,
     TableDoesNotExist,
     TransactWriteError,
 )
 from pynamodb.transactions import TransactWrite
+from repository.evaluation_summaries_repository import EvaluationSummariesRepository
 from repository.repository_utils import RepositoryUtils
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class EvaluationRepository:
-    def __init__(self) -> None:
+    def __init__(self, connection: Connection = None) -> None:
         self.core_obj = 'Evaluation'
         self.current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
-        self.conn = Connection(region=os.getenv('REGION'))
+        self.conn = connection or AWSClients.get_connection()
+        self.__evaluation_summaries_repository = EvaluationSummariesRepository(connection=self.conn)
 
     def store_evaluation(self, evaluation_list_in: EvaluationListIn) -> Tuple[HTTPStatus, List[Evaluation], str]:
-        """Store a new evaluation.
+        """Store the evaluations of a registration, replacing any it already has, and update the summary of
+        each question in the same transaction.
 
         :param evaluation_list_in: EvaluationListIn object containing the new evaluation data.
         :type evaluation_list_in: EvaluationListIn
@@ -38,7 +44,17 @@ class EvaluationRepository:
         registration_id = evaluation_list_in.registrationId
 
         try:
+            # a resubmission replaces the old answers, so they are taken back out of the summary
+            existing_evaluations = {
+                evaluation_entry.question: evaluation_entry
+                for evaluation_entry in Evaluation.query(
+                    hash_key=hash_key, range_key_condition=Evaluation.rangeKey.startswith(f'{registration_id}#')
+                )
+            }
+
             evaluation_items = []
+            conditions = []
+            summary_changes = []
             for evaluation_in in evaluation_list_in.evaluationList:
                 data = RepositoryUtils.load_data(pydantic_schema_in=evaluation_in)
                 range_key = f'{registration_id}#{evaluation_in.question}'
@@ -53,24 +69,54 @@ class EvaluationRepository:
                 )
                 evaluation_items.append(evaluation_entry)
 
-            with Evaluation.batch_write() as batch:
-                for item in evaluation_items:
-                    batch.save(item)
+                existing_entry = existing_evaluations.get(evaluation_entry.question)
+                if existing_entry:
+                    conditions.append(Evaluation.updateDate == existing_entry.updateDate)
+                else:
+                    conditions.append(Evaluation.rangeKey.does_not_exist())
+
+                summary_changes.extend(
+                    self.__evaluation_summaries_repository.get_summary_changes(
+                        event_id=event_id,
+                        question=evaluation_entry.question,
+                        old_evaluation=RepositoryUtils.db_model_to_dict(existing_entry) if existing_entry else None,
+                        new_evaluation=RepositoryUtils.db_model_to_dict(evaluation_entry),
+                    )
+                )
+
+            item_count = len(evaluation_items) + len(summary_changes)
+            if item_count > CommonConstants.TRANSACT_WRITE_MAX_ITEMS:
+                message = (
+                    f'Too many evaluations to save at once, {item_count} items are more than the '
+                    f'{CommonConstants.TRANSACT_WRITE_MAX_ITEMS} of a transaction'
+                )
+                logger.error(f'[{self.core_obj} = {hash_key}, {registration_id}]: {message}')
+                return HTTPStatus.BAD_REQUEST, None, message
 
-        except PutError as e:
-            message = f'Failed to save evaluation strategy form: {str(e)}'
-            logger.error(f'[{self.core_obj} = {hash_key}, {range_key}]: {message}')
+            with TransactWrite(connection=self.conn) as transaction:
+                for evaluation_entry, condition in zip(evaluation_items, conditions):
+                    transaction.save(evaluation_entry, condition=condition)
+                for summary_entry, actions in summary_changes:
+                    transaction.update(summary_entry, actions=actions)
+
+        except TransactWriteError as e:
+            status, message = self.__transact_write_error(e, 'Failed to save evaluation strategy form')
+            logger.error(f'[{self.core_obj} = {hash_key}, {registration_id}]: {message}')
+            return status, None, message
+        except QueryError as e:
+            message = f'Failed to query existing evaluations: {str(e)}'
+            logger.error(f'[{self.core_obj} = {hash_key}, {registration_id}]: {message}')
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
         except TableDoesNotExist as db_error:
             message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
-            logger.error(f'[{self.core_obj} = {hash_key}, {range_key}]: {message}')
+            logger.error(f'[{self.core_obj} = {hash_key}, {registration_id}]: {message}')
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
         except PynamoDBConnectionError as db_error:
             message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
-            logger.error(f'[{self.core_obj} = {hash_key}, {range_key}]: {message}')
+            logger.error(f'[{self.core_obj} = {hash_key}, {registration_id}]: {message}')
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
         else:
-            logger.info(f'[{self.core_obj} = {hash_key}, {range_key}]: Save Evaluations strategy data successful')
+            logger.info(f'[{self.core_obj} = {hash_key}, {registration_id}]: Save Evaluations strategy data successful')
             return HTTPStatus.OK, evaluation_items, None
 
     def query_evaluations(
@@ -184,7 +230,7 @@ class EvaluationRepository:
     def update_evaluation(
         self, evaluation_entry: Evaluation, evaluation_in: EvaluationPatch
     ) -> Tuple[HTTPStatus, Evaluation, str]:
-        """Update an existing evaluation.
+        """Update an existing evaluation and the summary of its question in the same transaction.
 
         :param evaluation_entry: The Evaluation object to be updated.
         :type evaluation_entry: Evaluation
@@ -209,14 +255,49 @@ class EvaluationRepository:
                 updated_data.update(
                     updateDate=self.current_date,
                 )
-                actions = [getattr(Evaluation, k).set(v) for k, v in updated_data.items()]
-                transaction.update(evaluation_entry, actions=actions)
+                actions = RepositoryUtils.get_update_actions(Evaluation, updated_data)
+                transaction.update(
+                    evaluation_entry,
+                    actions=actions,
+                    condition=Evaluation.updateDate == evaluation_entry.updateDate,
+                )
+
+                old_evaluation = RepositoryUtils.db_model_to_dict(evaluation_entry)
+                summary_changes = self.__evaluation_summaries_repository.get_summary_changes(
+                    event_id=evaluation_entry.eventId,
+                    question=evaluation_entry.question,
+                    old_evaluation=old_evaluation,
+                    new_evaluation={**old_evaluation, **updated_data},
+                )
+                for summary_entry, summary_actions in summary_changes:
+                    transaction.update(summary_entry, actions=summary_actions)
 
             evaluation_entry.refresh()
             logger.info(f'[{evaluation_entry.rangeKey}] Update evaluation data successful')
             return HTTPStatus.OK, evaluation_entry, None
 
         except TransactWriteError as e:
-            message = f'Failed to update evaluation data: {str(e)}'
+            status, message = self.__transact_write_error(e, 'Failed to update evaluation data')
             logger.error(f'[{self.core_obj}={evaluation_entry.rangeKey}] {message}')
-            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+            return status, None, message
+
+    @staticmethod
+    def __transact_write_error(error: TransactWriteError, failure_message: str) -> Tuple[HTTPStatus, str]:
+        """Get the status and message of a failed evaluation write.
+
+        :param error: The error of the transaction.
+        :type error: TransactWriteError
+
+        :param failure_message: The message of an unexpected failure.
+        :type failure_message: str
+
+        :return: CONFLICT if the evaluation was changed since it was read, otherwise INTERNAL_SERVER_ERROR, and
+            the message.
+        :rtype: Tuple[HTTPStatus, str]
+
+        """
+        reasons = error.cancellation_reasons if error.cause_response_code == 'TransactionCanceledException' else []
+        if any(reason and reason.code in ('ConditionalCheckFailed', 'TransactionConflict') for reason in reasons):
+            return HTTPStatus.CONFLICT, 'Evaluation was changed by another request, please try again'
+
+        return HTTPStatus.INTERNAL_SERVER_ERROR, f'{failure_message}: {str(error)}'
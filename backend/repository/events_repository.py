@@ -5,6 +5,7 @@ from http import HTTPStatus
 from typing import List, Tuple, Union
 
 import pytz
+from aws.aws_clients import AWSClients
 from constants.common_constants import EntryStatus
 from model.events.event import Event, EventDBIn, EventIn
 from pynamodb.connection import Connection
@@ -16,17 +17,28 @@ from pynamodb.exceptions import (
     TransactWriteError,
 )
 from pynamodb.transactions import TransactWrite
+from repository.counter_shards_repository import CounterShardsRepository
 from repository.repository_utils import RepositoryUtils
+from utils.cache import TTLCache
 from utils.logger import logger
+from utils.tracing import traced
 from utils.utils import Utils
 
 
+@traced
 class EventsRepository:
-    def __init__(self) -> None:
+    # Shared by every instance so that event lookups stay cached across warm invocations
+    event_cache = TTLCache(
+        maxsize=int(os.getenv('EVENT_CACHE_MAX_SIZE', '256')),
+        ttl=float(os.getenv('EVENT_CACHE_TTL_SECONDS', '30')),
+    )
+
+    def __init__(self, connection: Connection = None) -> None:
         self.core_obj = 'Event'
         self.current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
         self.latest_version = 0
-        self.conn = Connection(region=os.getenv('REGION'))
+        self.conn = connection or AWSClients.get_connection()
+        self.__counter_shards_repository = CounterShardsRepository(connection=self.conn)
 
     def store_event(self, event_in: EventIn) -> Tuple[HTTPStatus, Event, str]:
         """Store a new event.
@@ -134,16 +146,29 @@ class EventsRepository:
             logger.info(f'[{self.core_obj}={event_id}] Fetch Event data successful')
             return HTTPStatus.OK, event_entries, None
 
-    def query_events(self, event_id: str = None) -> Tuple[HTTPStatus, Union[Event, List[Event]], str]:
+    def query_events(
+        self, event_id: str = None, use_cache: bool = True
+    ) -> Tuple[HTTPStatus, Union[Event, List[Event]], str]:
         """Query events.
 
+        Single event lookups are served from the per-container event cache when possible.
+
         :param event_id: The event ID (optional).
         :type event_id: str
 
+        :param use_cache: Whether a single event lookup may be served from the event cache.
+        :type use_cache: bool
+
         :return: Tuple containing the HTTP status, a list of Event objects, and a message.
         :rtype: Tuple[HTTPStatus, List[Event], str]
 
         """
+        if event_id and use_cache:
+            cached_event = self.event_cache.get(event_id)
+            if cached_event is not None:
+                logger.info(f'[{self.core_obj}={event_id}] Fetch Event data from cache successful')
+                return HTTPStatus.OK, deepcopy(cached_event), None
+
         try:
             range_key_condition = Event.eventId == event_id if event_id else None
             event_entries = list(
@@ -180,6 +205,7 @@ class EventsRepository:
         else:
             if event_id:
                 logger.info(f'[{self.core_obj}={event_id}] Fetch Event data successful')
+                self.cache_event(event_entries[0])
                 return HTTPStatus.OK, event_entries[0], None
 
             logger.info(f'[{self.core_obj}={event_id}] Fetch Event data successful')
@@ -218,13 +244,13 @@ class EventsRepository:
                     updatedBy=os.getenv('CURRENT_USER'),
                     latestVersion=new_version,
                 )
-                if updated_data.get('lastEmailSent') is None:
+                if updated_data.get('lastEmailSent', event_entry.lastEmailSent) is None:
                     updated_data['lastEmailSent'] = self.current_date
 
-                if updated_data.get('dailyEmailCount') is None:
+                if updated_data.get('dailyEmailCount', event_entry.dailyEmailCount) is None:
                     updated_data['dailyEmailCount'] = 0
 
-                actions = [getattr(Event, k).set(v) for k, v in updated_data.items()]
+                actions = RepositoryUtils.get_update_actions(Event, updated_data)
                 transaction.update(event_entry, actions=actions)
 
                 # Store Old Entry --------------------------------------------------------------------------
@@ -235,12 +261,14 @@ class EventsRepository:
                 transaction.save(old_event_entry)
 
             event_entry.refresh()
+            self.cache_event(event_entry)
             logger.info(f'[{event_entry.rangeKey}] Update event data successful')
             return HTTPStatus.OK, event_entry, ''
 
         except TransactWriteError as e:
             message = f'Failed to update event data: {str(e)}'
             logger.error(f'[{event_entry.rangeKey}] {message}')
+            self.event_cache.invalidate(event_entry.eventId)
 
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
 
@@ -254,6 +282,7 @@ class EventsRepository:
         :rtype: Tuple[HTTPStatus, str]
 
         """
+        self.event_cache.invalidate(event_entry.eventId)
         try:
             # create new entry with old data
             current_version = event_entry.latestVersion
@@ -296,22 +325,26 @@ class EventsRepository:
         data = RepositoryUtils.load_data(pydantic_schema_in=event_in, exclude_unset=True)
         db_in = EventDBIn(**data)
         db_in_data = RepositoryUtils.load_data(pydantic_schema_in=db_in)
-        _, updated_data = RepositoryUtils.get_update(
+        has_update, updated_data = RepositoryUtils.get_update(
             old_data=RepositoryUtils.db_model_to_dict(event_entry), new_data=db_in_data
         )
+        if not has_update:
+            return HTTPStatus.OK, event_entry, 'no update'
 
         try:
             with TransactWrite(connection=self.conn) as transaction:
-                actions = [getattr(Event, k).set(v) for k, v in updated_data.items()]
+                actions = RepositoryUtils.get_update_actions(Event, updated_data)
                 transaction.update(event_entry, actions=actions)
 
             event_entry.refresh()
+            self.cache_event(event_entry)
             logger.info(f'[{event_entry.rangeKey}] Update event data successful')
             return HTTPStatus.OK, event_entry, ''
 
         except TransactWriteError as e:
             message = f'Failed to update event data: {str(e)}'
             logger.error(f'[{event_entry.rangeKey}] {message}')
+            self.event_cache.invalidate(event_entry.eventId)
 
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
 
@@ -328,18 +361,28 @@ class EventsRepository:
         :rtype: Tuple[HTTPStatus, Event, str]
 
         """
+        if self.__counter_shards_repository.enabled:
+            status, _, message = self.__counter_shards_repository.increment(
+                event_id=event_entry.eventId,
+                counter_name=CounterShardsRepository.REGISTRATION_COUNT,
+                append_count=append_count,
+            )
+            return status, event_entry if status == HTTPStatus.OK else None, message
+
         try:
             with TransactWrite(connection=self.conn) as transaction:
                 actions = [Event.registrationCount.add(append_count)]
                 transaction.update(event_entry, actions=actions)
 
             event_entry.refresh()
+            self.cache_event(event_entry)
             logger.info(f'[{event_entry.rangeKey}] Update event data successful')
             return HTTPStatus.OK, event_entry, ''
 
         except TransactWriteError as e:
             message = f'Failed to append event registration count: {str(e)}'
             logger.error(f'[{event_entry.rangeKey}] {message}')
+            self.event_cache.invalidate(event_entry.eventId)
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
 
     def append_event_email_sent_count(self, event_entry: Event, append_count: int = 1):
@@ -361,10 +404,36 @@ class EventsRepository:
                 transaction.update(event_entry, actions=actions)
 
             event_entry.refresh()
+            self.cache_event(event_entry)
             logger.info(f'[{event_entry.rangeKey}] Update event data successful')
             return HTTPStatus.OK, event_entry, ''
 
         except TransactWriteError as e:
             message = f'Failed to append event daily email sent count: {str(e)}'
             logger.error(f'[{event_entry.rangeKey}] {message}')
+            self.event_cache.invalidate(event_entry.eventId)
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+
+    def cache_event(self, event_entry: Event) -> None:
+        """Write an event through to the per-container event cache.
+
+        A copy is cached so that callers mutating the returned entry do not affect the cache.
+
+        :param event_entry: The latest state of the event.
+        :type event_entry: Event
+
+        """
+        if event_entry.entryStatus != EntryStatus.ACTIVE.value:
+            self.event_cache.invalidate(event_entry.eventId)
+            return
+
+        self.event_cache.set(event_entry.eventId, deepcopy(event_entry))
+
+    def invalidate_cached_event(self, event_id: str) -> None:
+        """Drop an event from the per-container event cache, e.g. after its counters were updated elsewhere.
+
+        :param event_id: The event ID.
+        :type event_id: str
+
+        """
+        self.event_cache.invalidate(event_id)
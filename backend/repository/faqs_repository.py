@@ -5,6 +5,7 @@ from http import HTTPStatus
 from typing import Tuple
 
 import pytz
+from aws.aws_clients import AWSClients
 from constants.common_constants import EntryStatus
 from model.faqs.faqs import FAQs, FAQsIn
 from pynamodb.connection import Connection
@@ -18,14 +19,16 @@ from pynamodb.exceptions import (
 from pynamodb.transactions import TransactWrite
 from repository.repository_utils import RepositoryUtils
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class FAQsRepository:
-    def __init__(self) -> None:
+    def __init__(self, connection: Connection = None) -> None:
         self.core_obj = 'FAQs'
         self.current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
         self.latest_version = 0
-        self.conn = Connection(region=os.getenv('REGION'))
+        self.conn = connection or AWSClients.get_connection()
 
     def store_faqs(self, event_id: str, faqs_in: FAQsIn) -> Tuple[HTTPStatus, FAQs, str]:
         """Store a new FAQs entry.
@@ -152,7 +155,7 @@ class FAQsRepository:
                     updatedBy=os.getenv('CURRENT_USER'),
                     latestVersion=new_version,
                 )
-                actions = [getattr(FAQs, k).set(v) for k, v in updated_data.items()]
+                actions = RepositoryUtils.get_update_actions(FAQs, updated_data)
                 transaction.update(faqs_entry, actions=actions)
 
                 # Store Old Entry --------------------------------------------------------------------------
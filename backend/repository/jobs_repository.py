@@ -0,0 +1,164 @@
+import os
+from datetime import datetime
+from http import HTTPStatus
+from typing import List, Tuple
+
+import pytz
+from aws.aws_clients import AWSClients
+from constants.common_constants import EntryStatus
+from model.jobs.job import Job
+from model.jobs.jobs_constants import JobStatus, JobType
+from pynamodb.connection import Connection
+from pynamodb.exceptions import (
+    DoesNotExist,
+    GetError,
+    PutError,
+    PynamoDBConnectionError,
+    TableDoesNotExist,
+    UpdateError,
+)
+from ulid import ulid
+from utils.logger import logger
+from utils.tracing import traced
+
+
+@traced
+class JobsRepository:
+    """
+    A repository class for the status records of background jobs.
+
+    There is a single record per event and job type, which is reset every time the job is enqueued.
+    Job records are progress checkpoints rather than user data, so they are updated in place without versions.
+    """
+
+    def __init__(self, connection: Connection = None) -> None:
+        self.core_obj = 'Job'
+        self.latest_version = 0
+        self.conn = connection or AWSClients.get_connection()
+
+    @staticmethod
+    def __now() -> str:
+        # Jobs outlive a single request, so timestamps are taken when written instead of at init
+        return datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
+
+    def store_job(self, event_id: str, job_type: JobType, claimed_ids: List[str] = None) -> Tuple[HTTPStatus, Job, str]:
+        """Store a new run of a job, replacing the record of the previous run.
+
+        :param event_id: The ID of the event the job runs for.
+        :type event_id: str
+
+        :param job_type: The type of the job.
+        :type job_type: JobType
+
+        :param claimed_ids: The IDs claimed but not confirmed by the previous run, for the new run to finish.
+        :type claimed_ids: List[str]
+
+        :return: The HTTP status, the stored job or None, and a message.
+        :rtype: Tuple[HTTPStatus, Job, str]
+
+        """
+        current_date = self.__now()
+        try:
+            job_entry = Job(
+                hashKey=f'{self.core_obj}#{event_id}',
+                rangeKey=f'v{self.latest_version}#{job_type.value}',
+                createDate=current_date,
+                updateDate=current_date,
+                createdBy=os.getenv('CURRENT_USER'),
+                updatedBy=os.getenv('CURRENT_USER'),
+                latestVersion=self.latest_version,
+                entryStatus=EntryStatus.ACTIVE.value,
+                entryId=ulid(),
+                eventId=event_id,
+                jobType=job_type.value,
+                jobStatus=JobStatus.QUEUED.value,
+                processedCount=0,
+                claimedIds=claimed_ids or None,
+            )
+            job_entry.save()
+
+        except PutError as e:
+            message = f'Failed to save job: {str(e)}'
+            logger.error(f'[{self.core_obj} = {event_id}#{job_type.value}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except TableDoesNotExist as db_error:
+            message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
+            logger.error(f'[{self.core_obj} = {event_id}#{job_type.value}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except PynamoDBConnectionError as db_error:
+            message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
+            logger.error(f'[{self.core_obj} = {event_id}#{job_type.value}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        else:
+            logger.info(f'[{self.core_obj} = {event_id}#{job_type.value}]: Save Job data successful')
+            return HTTPStatus.OK, job_entry, None
+
+    def query_job(self, event_id: str, job_type: JobType) -> Tuple[HTTPStatus, Job, str]:
+        """Query the latest run of a job.
+
+        :param event_id: The ID of the event the job runs for.
+        :type event_id: str
+
+        :param job_type: The type of the job.
+        :type job_type: JobType
+
+        :return: The HTTP status, the queried job or None, and a message.
+        :rtype: Tuple[HTTPStatus, Job, str]
+
+        """
+        try:
+            job_entry = Job.get(
+                hash_key=f'{self.core_obj}#{event_id}',
+                range_key=f'v{self.latest_version}#{job_type.value}',
+            )
+
+        except DoesNotExist:
+            message = f'No {job_type.value} job found for event {event_id}'
+            logger.error(f'[{self.core_obj} = {event_id}#{job_type.value}] {message}')
+            return HTTPStatus.NOT_FOUND, None, message
+        except GetError as e:
+            message = f'Failed to query job: {str(e)}'
+            logger.error(f'[{self.core_obj} = {event_id}#{job_type.value}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except TableDoesNotExist as db_error:
+            message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
+            logger.error(f'[{self.core_obj} = {event_id}#{job_type.value}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except PynamoDBConnectionError as db_error:
+            message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
+            logger.error(f'[{self.core_obj} = {event_id}#{job_type.value}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        else:
+            logger.info(f'[{self.core_obj} = {event_id}#{job_type.value}] Fetch Job data successful')
+            return HTTPStatus.OK, job_entry, None
+
+    def update_job(self, job_entry: Job, **fields) -> Tuple[HTTPStatus, Job, str]:
+        """Update the status or progress of a job run.
+
+        The update is conditioned on the record still belonging to the same run, so a stale worker cannot
+        overwrite the progress of a newer run.
+
+        :param job_entry: The job to be updated.
+        :type job_entry: Job
+
+        :param fields: The attributes to be set, a value of None removes the attribute.
+        :type fields: dict
+
+        :return: The HTTP status, the updated job or None, and a message.
+        :rtype: Tuple[HTTPStatus, Job, str]
+
+        """
+        fields.update(updateDate=self.__now())
+        actions = [
+            getattr(Job, key).remove() if value is None else getattr(Job, key).set(value)
+            for key, value in fields.items()
+        ]
+        try:
+            job_entry.update(actions=actions, condition=Job.entryId == job_entry.entryId)
+
+        except UpdateError as e:
+            message = f'Failed to update job: {str(e)}'
+            logger.error(f'[{job_entry.hashKey}|{job_entry.rangeKey}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        else:
+            return HTTPStatus.OK, job_entry, None
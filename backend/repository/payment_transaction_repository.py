@@ -1,10 +1,11 @@
 import os
 from copy import deepcopy
-from datetime import datetime
+from datetime import datetime, timedelta
 from http import HTTPStatus
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import pytz
+from aws.aws_clients import AWSClients
 from constants.common_constants import EntryStatus
 from model.payments.payments import (
     PaymentTransaction,
@@ -24,15 +25,22 @@ from pynamodb.exceptions import (
 from pynamodb.transactions import TransactWrite
 from repository.repository_utils import RepositoryUtils
 from ulid import ulid
+from utils.cache import TTLCache
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class PaymentTransactionRepository:
-    def __init__(self):
+    # Shared by every instance, a new index can only be queried once DynamoDB has built it, which takes a while
+    # after the deploy that creates it, so its status is only looked up again every minute
+    index_status_cache = TTLCache(maxsize=8, ttl=60)
+
+    def __init__(self, connection: Connection = None):
         self.core_obj = 'PaymentTransaction'
         self.current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
         self.latest_version = 0
-        self.conn = Connection(region=os.getenv('REGION'))
+        self.conn = connection or AWSClients.get_connection()
 
     def store_payment_transaction(
         self, payment_transaction_in: PaymentTransactionIn
@@ -65,6 +73,8 @@ class PaymentTransactionRepository:
                 latestVersion=self.latest_version,
                 entryStatus=EntryStatus.ACTIVE.value,
                 entryId=entry_id,
+                paymentTransactionId=entry_id,
+                latestTransactionStatus=data.get('transactionStatus'),
                 **data,
                 **registration_data,
             )
@@ -188,7 +198,11 @@ class PaymentTransactionRepository:
     def query_payment_transaction_by_id_only(
         self, payment_transaction_id: str
     ) -> Tuple[HTTPStatus, PaymentTransaction, str]:
-        """Query payment_transaction by payment_transaction ID only (using scan).
+        """Query payment_transaction by payment_transaction ID only, across all events.
+
+        Uses the sparse PaymentTransactionIdIndex, which only holds the keys of the latest version of each
+        payment_transaction, so the lookup does not need the event ID that is part of the hash key. Until the
+        index is ACTIVE, the whole Entities table is scanned instead.
 
         :param payment_transaction_id: The ID of the payment_transaction to query.
         :type payment_transaction_id: str
@@ -198,25 +212,27 @@ class PaymentTransactionRepository:
 
         """
         try:
-            # Use scan to find payment transaction by ID across all events
-            range_key_suffix = f'#{payment_transaction_id}'
-
-            filter_condition = PaymentTransaction.rangeKey.contains(range_key_suffix)
-            filter_condition &= PaymentTransaction.entryStatus == EntryStatus.ACTIVE.value
-            filter_condition &= PaymentTransaction.rangeKey.startswith(f'v{self.latest_version}#')
+            if self.is_index_active(PaymentTransaction.paymentTransactionIdIndex.Meta.index_name):
+                key_entries = PaymentTransaction.paymentTransactionIdIndex.query(hash_key=payment_transaction_id)
+                payment_transaction_entries = [
+                    payment_transaction_entry
+                    for payment_transaction_entry in PaymentTransaction.batch_get(
+                        [(key_entry.hashKey, key_entry.rangeKey) for key_entry in key_entries]
+                    )
+                    if payment_transaction_entry.entryStatus == EntryStatus.ACTIVE.value
+                ]
+            else:
+                filter_condition = PaymentTransaction.rangeKey == f'v{self.latest_version}#{payment_transaction_id}'
+                filter_condition &= PaymentTransaction.entryStatus == EntryStatus.ACTIVE.value
+                payment_transaction_entries = list(PaymentTransaction.scan(filter_condition=filter_condition))
 
-            payment_transaction_entries = list(
-                PaymentTransaction.scan(
-                    filter_condition=filter_condition,
-                )
-            )
             if not payment_transaction_entries:
                 message = f'PaymentTransaction with ID = {payment_transaction_id} not found'
                 logger.error(f'[{self.core_obj} = {payment_transaction_id}] {message}')
                 return HTTPStatus.NOT_FOUND, None, message
 
-        except ScanError as e:
-            message = f'Failed to scan payment_transaction: {str(e)}'
+        except (QueryError, ScanError) as e:
+            message = f'Failed to query payment_transaction: {str(e)}'
             logger.error(f'[{self.core_obj}={payment_transaction_id}] {message}')
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
 
@@ -233,6 +249,33 @@ class PaymentTransactionRepository:
             logger.info(f'[{self.core_obj}={payment_transaction_id}] Fetch PaymentTransaction by ID successful')
             return HTTPStatus.OK, payment_transaction_entries[0], None
 
+    def is_index_active(self, index_name: str) -> bool:
+        """Check whether a global secondary index of the Entities table has been built and can be queried.
+
+        :param index_name: The name of the index.
+        :type index_name: str
+
+        :return: True if the index is ACTIVE, False if it is still being created, or does not exist yet.
+        :rtype: bool
+
+        """
+        is_active = self.index_status_cache.get(index_name)
+        if is_active is not None:
+            return is_active
+
+        try:
+            table_description = self.conn.describe_table(PaymentTransaction.Meta.table_name)
+        except (TableDoesNotExist, PynamoDBConnectionError) as e:
+            logger.error(f'[{self.core_obj}] Failed to describe the table of {index_name}: {str(e)}')
+            return False
+
+        is_active = any(
+            index['IndexName'] == index_name and index.get('IndexStatus') == 'ACTIVE'
+            for index in table_description.get('GlobalSecondaryIndexes') or []
+        )
+        self.index_status_cache.set(index_name, is_active)
+        return is_active
+
     def update_payment_transaction_status(
         self, event_id: str, payment_transaction_id: str, status: TransactionStatus
     ) -> Tuple[HTTPStatus, PaymentTransaction, str]:
@@ -277,6 +320,7 @@ class PaymentTransactionRepository:
                     payment_transaction,
                     actions=[
                         PaymentTransaction.transactionStatus.set(status.value),
+                        PaymentTransaction.latestTransactionStatus.set(status.value),
                         PaymentTransaction.updateDate.set(current_date),
                         PaymentTransaction.updatedBy.set(current_user),
                         PaymentTransaction.latestVersion.set(new_version),
@@ -287,6 +331,8 @@ class PaymentTransactionRepository:
                 old_payment_transaction = deepcopy(payment_transaction)
                 old_payment_transaction.rangeKey = payment_transaction.rangeKey.replace('v0#', f'v{new_version}#')
                 old_payment_transaction.latestVersion = current_version
+                old_payment_transaction.paymentTransactionId = None
+                old_payment_transaction.latestTransactionStatus = None
                 old_payment_transaction.updatedBy = old_payment_transaction.updatedBy or current_user
                 transaction.save(old_payment_transaction)
 
@@ -357,14 +403,19 @@ class PaymentTransactionRepository:
                     updateDate=self.current_date,
                     updatedBy=os.getenv('CURRENT_USER'),
                     latestVersion=new_version,
+                    latestTransactionStatus=updated_data.get(
+                        'transactionStatus', payment_transaction.transactionStatus
+                    ),
                 )
-                actions = [getattr(PaymentTransaction, k).set(v) for k, v in updated_data.items()]
+                actions = RepositoryUtils.get_update_actions(PaymentTransaction, updated_data)
                 transaction.update(payment_transaction, actions=actions)
 
                 # Store Old Entry --------------------------------------------------------------------------
                 old_payment_transaction = deepcopy(payment_transaction)
                 old_payment_transaction.rangeKey = payment_transaction.rangeKey.replace('v0#', f'v{new_version}#')
                 old_payment_transaction.latestVersion = current_version
+                old_payment_transaction.paymentTransactionId = None
+                old_payment_transaction.latestTransactionStatus = None
                 old_payment_transaction.updatedBy = old_payment_transaction.updatedBy or os.getenv('CURRENT_USER')
                 transaction.save(old_payment_transaction)
 
@@ -378,48 +429,88 @@ class PaymentTransactionRepository:
 
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
 
-    def query_pending_payment_transactions(self) -> Tuple[HTTPStatus, List[PaymentTransaction], str]:
-        """Scan for PENDING payment_transactions across all events.
+    def query_pending_payment_transactions(
+        self, older_than_minutes: int = None, limit: int = None, cursor: str = None
+    ) -> Tuple[HTTPStatus, List[PaymentTransaction], Optional[str], str]:
+        """Query PENDING payment_transactions across all events, oldest first.
 
+        Uses the sparse TransactionStatusIndex, which only holds the latest version of each
+        payment_transaction, so a single query replaces the scan of the whole Entities table. Until the index
+        is ACTIVE, the table is scanned as before, and a page is only sorted within itself.
 
-        :return: The HTTP status, the queried payment_transactions or None, and a message.
-        :rtype: Tuple[HTTPStatus, List[PaymentTransaction], str]
+        :param older_than_minutes: If provided, only returns payment_transactions created at least this many minutes ago.
+        :type older_than_minutes: int
+
+        :param limit: The maximum number of payment_transactions to return (default is None for no limit).
+        :type limit: int
+
+        :param cursor: The opaque cursor returned by a previous page (default is None for the first page).
+        :type cursor: str
+
+        :return: The HTTP status, the queried payment_transactions or None, the cursor of the next page
+            (None when there are no more pages), and a message.
+        :rtype: Tuple[HTTPStatus, List[PaymentTransaction], Optional[str], str]
 
         """
         try:
-            # Use scan with filters instead of query
-            range_key_prefix = f'v{self.latest_version}#'
+            last_evaluated_key = RepositoryUtils.decode_cursor(cursor)
+        except ValueError as e:
+            message = f'Invalid cursor: {str(e)}'
+            logger.error(f'[{self.core_obj}] {message}')
+            return HTTPStatus.BAD_REQUEST, None, None, message
 
-            filter_condition = PaymentTransaction.transactionStatus == TransactionStatus.PENDING.value
-            filter_condition &= PaymentTransaction.entryStatus == EntryStatus.ACTIVE.value
-            filter_condition &= PaymentTransaction.rangeKey.startswith(range_key_prefix)
+        try:
+            cutoff_date = None
+            if older_than_minutes is not None:
+                cutoff_date = datetime.now(tz=pytz.timezone('Asia/Manila')) - timedelta(minutes=older_than_minutes)
 
-            payment_transaction_entries = list(
-                PaymentTransaction.scan(
-                    filter_condition=filter_condition,
+            if self.is_index_active(PaymentTransaction.transactionStatusIndex.Meta.index_name):
+                range_key_condition = None
+                if cutoff_date is not None:
+                    range_key_condition = PaymentTransaction.createDate < cutoff_date.isoformat()
+
+                result_iterator = PaymentTransaction.transactionStatusIndex.query(
+                    hash_key=TransactionStatus.PENDING.value,
+                    range_key_condition=range_key_condition,
+                    filter_condition=PaymentTransaction.entryStatus == EntryStatus.ACTIVE.value,
+                    limit=limit,
+                    last_evaluated_key=last_evaluated_key,
                 )
-            )
+                payment_transaction_entries = list(result_iterator)
+            else:
+                filter_condition = PaymentTransaction.transactionStatus == TransactionStatus.PENDING.value
+                filter_condition &= PaymentTransaction.entryStatus == EntryStatus.ACTIVE.value
+                filter_condition &= PaymentTransaction.rangeKey.startswith(f'v{self.latest_version}#')
+                if cutoff_date is not None:
+                    filter_condition &= PaymentTransaction.createDate < cutoff_date.isoformat()
+
+                result_iterator = PaymentTransaction.scan(
+                    filter_condition=filter_condition, limit=limit, last_evaluated_key=last_evaluated_key
+                )
+                payment_transaction_entries = sorted(result_iterator, key=lambda entry: entry.createDate)
 
-            if not payment_transaction_entries:
+            next_cursor = RepositoryUtils.encode_cursor(result_iterator.last_evaluated_key)
+
+            if not payment_transaction_entries and not cursor:
                 message = 'No pending payment_transactions found'
                 logger.info(f'[{self.core_obj}] {message}')
-                return HTTPStatus.NOT_FOUND, [], message
+                return HTTPStatus.NOT_FOUND, [], None, message
 
-        except ScanError as e:
-            message = f'Failed to scan payment_transactions: {str(e)}'
+        except (QueryError, ScanError) as e:
+            message = f'Failed to query payment_transactions: {str(e)}'
             logger.error(f'[{self.core_obj}] {message}')
-            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, None, message
 
         except TableDoesNotExist as db_error:
             message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
             logger.error(f'[{self.core_obj}] {message}')
-            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, None, message
 
         except PynamoDBConnectionError as db_error:
             message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
             logger.error(f'[{self.core_obj}] {message}')
-            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, None, message
 
         else:
             logger.info(f'[{self.core_obj}] Fetch PaymentTransaction data successful')
-            return HTTPStatus.OK, payment_transaction_entries, None
+            return HTTPStatus.OK, payment_transaction_entries, next_cursor, None
@@ -1,11 +1,12 @@
 import os
 from datetime import datetime
 from http import HTTPStatus
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Tuple
 
 import pytz
 import ulid
-from constants.common_constants import EntryStatus
+from aws.aws_clients import AWSClients
+from constants.common_constants import CommonConstants, EntryStatus
 from model.preregistrations.preregistration import (
     PreRegistration,
     PreRegistrationIn,
@@ -15,6 +16,7 @@ from model.preregistrations.preregistrations_constants import AcceptanceStatus
 from pynamodb.connection import Connection
 from pynamodb.exceptions import (
     DeleteError,
+    GetError,
     PutError,
     PynamoDBConnectionError,
     QueryError,
@@ -24,8 +26,10 @@ from pynamodb.exceptions import (
 from pynamodb.transactions import TransactWrite
 from repository.repository_utils import RepositoryUtils
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class PreRegistrationsRepository:
     """
     A repository class for managing pre-registration records in a DynamoDB table.
@@ -38,10 +42,10 @@ class PreRegistrationsRepository:
         conn (Connection): The PynamoDB connection for database operations.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, connection: Connection = None) -> None:
         self.core_obj = 'PreRegistration'
         self.current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
-        self.conn = Connection(region=os.getenv('REGION'))
+        self.conn = connection or AWSClients.get_connection()
 
     def store_preregistration(
         self, preregistration_in: PreRegistrationIn, preregistration_id: str = None
@@ -136,6 +140,39 @@ class PreRegistrationsRepository:
             logger.info(f'[{self.core_obj}]: Fetch Pre-registration data successful')
             return HTTPStatus.OK, preregistration_entries, None
 
+    def iter_preregistrations(
+        self, event_id: str, page_size: int = CommonConstants.EXPORT_PAGE_SIZE, pending_acceptance_email: bool = False
+    ) -> Iterator[PreRegistration]:
+        """Lazily iterate over the active pre-registration records of an event.
+
+        Records are fetched from DynamoDB one page at a time as the iterator is consumed.
+        Query errors are raised while iterating.
+
+        :param event_id: The event ID to query.
+        :type event_id: str
+
+        :param page_size: The number of records to read per DynamoDB request.
+        :type page_size: int
+
+        :param pending_acceptance_email: Whether to only include records whose acceptance email was not sent yet.
+        :type pending_acceptance_email: bool
+
+        :return: An iterator of pre-registration records.
+        :rtype: Iterator[PreRegistration]
+
+        """
+        filter_condition = PreRegistration.entryStatus == EntryStatus.ACTIVE.value
+        if pending_acceptance_email:
+            filter_condition &= (PreRegistration.acceptanceEmailSent == False) | (  # noqa: E712
+                PreRegistration.acceptanceEmailSent.does_not_exist()
+            )
+
+        return PreRegistration.query(
+            hash_key=event_id,
+            filter_condition=filter_condition,
+            page_size=page_size,
+        )
+
     def query_preregistration_with_preregistration_id(
         self, preregistration_id: str, event_id: str
     ) -> Tuple[HTTPStatus, PreRegistration, str]:
@@ -183,6 +220,53 @@ class PreRegistrationsRepository:
             logger.info(f'[{self.core_obj} = {preregistration_id}]: Fetch Pre-registration data successful')
             return HTTPStatus.OK, preregistration_entries[0], None
 
+    def query_preregistrations_by_ids(
+        self, event_id: str, preregistration_ids: Iterable[str]
+    ) -> Tuple[HTTPStatus, List[PreRegistration], str]:
+        """Query many pre-registration records of an event by their IDs with BatchGetItem.
+
+        IDs without an active pre-registration are left out.
+
+        :param event_id: The event ID to query.
+        :type event_id: str
+
+        :param preregistration_ids: The pre-registration IDs to query.
+        :type preregistration_ids: Iterable[str]
+
+        :return: A tuple containing HTTP status, a list of pre-registration records, and an optional error message.
+        :rtype: Tuple[HTTPStatus, List[PreRegistration], str]
+
+        """
+        preregistration_keys = {(event_id, preregistration_id) for preregistration_id in preregistration_ids}
+        if not preregistration_keys:
+            return HTTPStatus.OK, [], None
+
+        try:
+            preregistration_entries = [
+                preregistration
+                for preregistration in PreRegistration.batch_get(preregistration_keys)
+                if preregistration.entryStatus == EntryStatus.ACTIVE.value
+            ]
+
+        except GetError as e:
+            message = f'Failed to batch get pre-registrations: {str(e)}'
+            logger.error(f'[{self.core_obj} = {event_id}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except TableDoesNotExist as db_error:
+            message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
+            logger.error(f'[{self.core_obj} = {event_id}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except PynamoDBConnectionError as db_error:
+            message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
+            logger.error(f'[{self.core_obj} = {event_id}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        else:
+            logger.info(
+                f'[{self.core_obj} = {event_id}]: Fetch {len(preregistration_entries)} of '
+                f'{len(preregistration_keys)} pre-registrations successful'
+            )
+            return HTTPStatus.OK, preregistration_entries, None
+
     def query_preregistrations_with_email(
         self, event_id: str, email: str, exclude_preregistration_id: str = None
     ) -> Tuple[HTTPStatus, List[PreRegistration], str]:
@@ -266,7 +350,7 @@ class PreRegistrationsRepository:
                 updated_data.update(
                     updateDate=self.current_date,
                 )
-                actions = [getattr(PreRegistration, k).set(v) for k, v in updated_data.items()]
+                actions = RepositoryUtils.get_update_actions(PreRegistration, updated_data)
                 transaction.update(preregistration_entry, actions=actions)
 
             preregistration_entry.refresh()
@@ -278,6 +362,86 @@ class PreRegistrationsRepository:
             logger.error(f'[{preregistration_entry.rangeKey}] {message}')
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
 
+    def update_acceptance_email_sent(
+        self, preregistration_entries: List[PreRegistration], acceptance_email_sent: bool
+    ) -> Tuple[HTTPStatus, List[PreRegistration], str]:
+        """Set the acceptanceEmailSent flag of many pre-registration records in bulk.
+
+        Records are written in transactions of up to TRANSACT_WRITE_MAX_ITEMS, each update conditioned on the flag
+        still having the opposite value. Records that fail the condition were already flipped by another run and
+        are left out of the result, so callers only act on the records they changed.
+
+        :param preregistration_entries: The pre-registration records to be updated.
+        :type preregistration_entries: List[PreRegistration]
+
+        :param acceptance_email_sent: The new value of the flag.
+        :type acceptance_email_sent: bool
+
+        :return: A tuple containing HTTP status, the records that were updated, and an optional error message.
+        :rtype: Tuple[HTTPStatus, List[PreRegistration], str]
+
+        """
+        if acceptance_email_sent:
+            condition = (PreRegistration.acceptanceEmailSent == False) | (  # noqa: E712
+                PreRegistration.acceptanceEmailSent.does_not_exist()
+            )
+        else:
+            condition = PreRegistration.acceptanceEmailSent == True  # noqa: E712
+
+        actions = [
+            PreRegistration.acceptanceEmailSent.set(acceptance_email_sent),
+            PreRegistration.updateDate.set(self.current_date),
+        ]
+        updated_entries = []
+        chunk_size = CommonConstants.TRANSACT_WRITE_MAX_ITEMS
+        for index in range(0, len(preregistration_entries), chunk_size):
+            chunk = preregistration_entries[index : index + chunk_size]
+            try:
+                try:
+                    self.__transact_update(entries=chunk, actions=actions, condition=condition)
+                except TransactWriteError as e:
+                    reasons = e.cancellation_reasons
+                    if not reasons or not any(reason and reason.code == 'ConditionalCheckFailed' for reason in reasons):
+                        raise
+
+                    # Retry the chunk without the records that already have the new value
+                    chunk = [entry for entry, reason in zip(chunk, reasons) if not reason]
+                    if chunk:
+                        self.__transact_update(entries=chunk, actions=actions, condition=condition)
+
+            except TransactWriteError as e:
+                message = f'Failed to update pre-registration acceptance email flags: {str(e)}'
+                logger.error(f'[{self.core_obj}] {message}')
+                return HTTPStatus.INTERNAL_SERVER_ERROR, updated_entries, message
+
+            for entry in chunk:
+                entry.acceptanceEmailSent = acceptance_email_sent
+                entry.updateDate = self.current_date
+
+            updated_entries.extend(chunk)
+
+        logger.info(
+            f'[{self.core_obj}] Set acceptanceEmailSent = {acceptance_email_sent} on {len(updated_entries)} records'
+        )
+        return HTTPStatus.OK, updated_entries, None
+
+    def __transact_update(self, entries: List[PreRegistration], actions: list, condition) -> None:
+        """Apply the same update actions to pre-registration records in a single transaction.
+
+        :param entries: The pre-registration records to be updated.
+        :type entries: List[PreRegistration]
+
+        :param actions: The update actions applied to every record.
+        :type actions: list
+
+        :param condition: The condition every record must meet.
+        :type condition: Condition
+
+        """
+        with TransactWrite(connection=self.conn) as transaction:
+            for entry in entries:
+                transaction.update(entry, actions=actions, condition=condition)
+
     def delete_preregistration(self, preregistration_entry: PreRegistration) -> HTTPStatus:
         """Delete a preregistration record from the database.
 
@@ -1,26 +1,40 @@
 import os
+from collections import defaultdict
+from copy import deepcopy
 from datetime import datetime
 from http import HTTPStatus
-from typing import List, Tuple, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 import pytz
 import ulid
-from constants.common_constants import EntryStatus
+from aws.aws_clients import AWSClients
+from constants.common_constants import CommonConstants, EntryStatus
+from model.discount.discount import Discount
+from model.events.event import Event
+from model.events.events_constants import EventStatus
 from model.pycon_registrations.pycon_registration import PyconRegistrationIn
 from model.registrations.registration import Registration, RegistrationIn
+from model.ticket_types.ticket_types import TicketType
+from pynamodb.attributes import NumberAttribute
 from pynamodb.connection import Connection
 from pynamodb.exceptions import (
+    GetError,
     PutError,
     PynamoDBConnectionError,
     QueryError,
+    ScanError,
     TableDoesNotExist,
     TransactWriteError,
 )
+from pynamodb.expressions.condition import Condition
 from pynamodb.transactions import TransactWrite
+from repository.counter_shards_repository import CounterShardsRepository
 from repository.repository_utils import RepositoryUtils
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class RegistrationsRepository:
     """
     A repository class for managing registration records in a DynamoDB table.
@@ -33,10 +47,11 @@ class RegistrationsRepository:
         conn (Connection): The PynamoDB connection for database operations.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, connection: Connection = None) -> None:
         self.core_obj = 'Registration'
         self.current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
-        self.conn = Connection(region=os.getenv('REGION'))
+        self.conn = connection or AWSClients.get_connection()
+        self.__counter_shards_repository = CounterShardsRepository(connection=self.conn)
 
     def store_registration(
         self, registration_in: Union[PyconRegistrationIn, RegistrationIn], registration_id: str = None
@@ -53,20 +68,12 @@ class RegistrationsRepository:
         :rtype: Tuple[HTTPStatus, Registration, str]
 
         """
-        data = RepositoryUtils.load_data(pydantic_schema_in=registration_in)  # load data from pydantic schema
         registration_id = registration_id or ulid.ulid()
 
         try:
-            registration_entry = Registration(
-                hashKey=registration_in.eventId,
-                rangeKey=registration_id,
-                createDate=self.current_date,
-                updateDate=self.current_date,
-                entryStatus=EntryStatus.ACTIVE.value,
-                registrationId=registration_id,
-                **data,
+            registration_entry = self.__build_registration_entry(
+                registration_in=registration_in, registration_id=registration_id
             )
-            registration_entry.certificateGenerated = False
             registration_entry.save()
 
         except PutError as e:
@@ -88,6 +95,308 @@ class RegistrationsRepository:
             logger.info(f'[{self.core_obj} = {registration_id}]: Successfully saved registration strategy form')
             return HTTPStatus.OK, registration_entry, None
 
+    def commit_registration(
+        self,
+        registration_in: Union[PyconRegistrationIn, RegistrationIn],
+        registration_id: str,
+        event_entry: Event,
+        ticket_type_entry: TicketType = None,
+        discount_entry: Discount = None,
+    ) -> Tuple[HTTPStatus, Registration, str]:
+        """Store a registration, count it against its event and ticket type, and claim its discount in one transaction.
+
+        The capacity checks are condition expressions of the transaction, so concurrent registrations can not
+        oversell the event slots or a ticket type, and a single-use discount can only be claimed once. With
+        sharded counters the registration count and ticket type sales go to counter shards instead, and a full
+        or contended shard is retried on another one.
+
+        :param registration_in: The registration data to be stored.
+        :type registration_in: Union[PyconRegistrationIn, RegistrationIn]
+
+        :param registration_id: The registration ID to be stored.
+        :type registration_id: str
+
+        :param event_entry: The event of the registration.
+        :type event_entry: Event
+
+        :param ticket_type_entry: The ticket type of the registration, if the event has multiple ticket types.
+        :type ticket_type_entry: TicketType
+
+        :param discount_entry: The discount claimed by the registration, if any.
+        :type discount_entry: Discount
+
+        :return: A tuple containing HTTP status, the stored registration record, and an optional error message.
+        :rtype: Tuple[HTTPStatus, Registration, str]
+
+        """
+        registration_entry = self.__build_registration_entry(
+            registration_in=registration_in, registration_id=registration_id
+        )
+
+        attempts = self.__counter_shards_repository.shard_count
+        full_shards = defaultdict(set)
+        for attempt in range(1, attempts + 1):
+            counter_shards, full_message = self.__pick_counter_shards(
+                event_entry=event_entry, ticket_type_entry=ticket_type_entry, full_shards=full_shards
+            )
+            if full_message:
+                logger.info(f'[{self.core_obj} = {registration_id}]: {full_message}')
+                return HTTPStatus.BAD_REQUEST, None, full_message
+
+            # (message, counter shard) of the transaction items in the order they are sent
+            check_items, put_items, update_items = [], [], []
+            try:
+                with TransactWrite(connection=self.conn) as transaction:
+                    transaction.save(registration_entry, condition=Registration.rangeKey.does_not_exist())
+                    put_items.append(('Registration already exists', None))
+
+                    self.__add_counter_increments(
+                        transaction=transaction,
+                        event_entry=event_entry,
+                        ticket_type_entry=ticket_type_entry,
+                        counter_shards=counter_shards,
+                        check_items=check_items,
+                        update_items=update_items,
+                    )
+                    self.__add_discount_claim(
+                        transaction=transaction,
+                        discount_entry=discount_entry,
+                        registration_id=registration_id,
+                        put_items=put_items,
+                        update_items=update_items,
+                    )
+
+            except TransactWriteError as e:
+                reasons = e.cancellation_reasons if e.cause_response_code == 'TransactionCanceledException' else []
+                failed_items = [
+                    (reason.code, message, shard)
+                    for reason, (message, shard) in zip(reasons, check_items + put_items + update_items)
+                    if reason and reason.code in ('ConditionalCheckFailed', 'TransactionConflict')
+                ]
+                is_retryable = all(shard or code == 'TransactionConflict' for code, _, shard in failed_items)
+                if attempt < attempts and failed_items and is_retryable:
+                    for code, _, shard in failed_items:
+                        if code == 'ConditionalCheckFailed':
+                            counter_name, shard_index = shard
+                            full_shards[counter_name].add(shard_index)
+                    self.__counter_shards_repository.invalidate_cached_counts(event_entry.eventId)
+                    logger.info(f'[{self.core_obj} = {registration_id}]: Retrying on other counter shards')
+                    continue
+
+                for code, message, _ in failed_items:
+                    if code == 'ConditionalCheckFailed':
+                        logger.info(f'[{self.core_obj} = {registration_id}]: {message}')
+                        return HTTPStatus.BAD_REQUEST, None, message
+
+                message = f'Failed to save registration: {str(e)}'
+                logger.error(f'[{self.core_obj} = {registration_id}]: {message}')
+                return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+
+            except TableDoesNotExist as db_error:
+                message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
+                logger.error(f'[{self.core_obj} = {registration_id}]: {message}')
+                return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+
+            except PynamoDBConnectionError as db_error:
+                message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
+                logger.error(f'[{self.core_obj} = {registration_id}]: {message}')
+                return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+
+            else:
+                logger.info(f'[{self.core_obj} = {registration_id}]: Successfully committed registration')
+                return HTTPStatus.OK, registration_entry, None
+
+    def __counter_messages(self, event_entry: Event, ticket_type_entry: Optional[TicketType]) -> Dict[str, str]:
+        """Get the message of every counter of a registration for when it has no capacity left."""
+        counter_messages = {
+            CounterShardsRepository.REGISTRATION_COUNT: (
+                f'Event registration is full. Maximum slots: {event_entry.maximumSlots}'
+            )
+        }
+        if ticket_type_entry:
+            counter_name = CounterShardsRepository.ticket_type_sales_counter(ticket_type_entry)
+            counter_messages[counter_name] = f'Ticket type {ticket_type_entry.name} is sold out'
+        return counter_messages
+
+    def __counter_remaining(self, event_entry: Event, ticket_type_entry: Optional[TicketType]) -> Dict[str, int]:
+        """Get the capacity above the base count of every limited counter of a registration."""
+        remaining = {}
+        if event_entry.isLimitedSlot and event_entry.maximumSlots is not None:
+            remaining[CounterShardsRepository.REGISTRATION_COUNT] = event_entry.maximumSlots - (
+                event_entry.registrationCount or 0
+            )
+        if ticket_type_entry:
+            remaining[CounterShardsRepository.ticket_type_sales_counter(ticket_type_entry)] = (
+                ticket_type_entry.maximumQuantity - (ticket_type_entry.currentSales or 0)
+            )
+        return remaining
+
+    def __pick_counter_shards(
+        self, event_entry: Event, ticket_type_entry: Optional[TicketType], full_shards: Dict[str, Set[int]]
+    ) -> Tuple[Dict[str, int], Optional[str]]:
+        """Pick the counter shards to increment for a registration, when counters are sharded.
+
+        :return: The shard index per counter name, and the message of a counter with no capacity left on any shard
+        :rtype: Tuple[Dict[str, int], Optional[str]]
+
+        """
+        if not self.__counter_shards_repository.enabled:
+            return {}, None
+
+        remaining = self.__counter_remaining(event_entry, ticket_type_entry)
+        counter_shards = {}
+        for counter_name, message in self.__counter_messages(event_entry, ticket_type_entry).items():
+            shard_index = self.__counter_shards_repository.pick_shard(
+                event_id=event_entry.eventId,
+                counter_name=counter_name,
+                remaining=remaining.get(counter_name),
+                excluded_shards=full_shards[counter_name],
+            )
+            if shard_index is None:
+                return {}, message
+
+            counter_shards[counter_name] = shard_index
+
+        return counter_shards, None
+
+    def __add_counter_increments(
+        self,
+        transaction: TransactWrite,
+        event_entry: Event,
+        ticket_type_entry: Optional[TicketType],
+        counter_shards: Dict[str, int],
+        check_items: List[Tuple[str, Optional[Tuple[str, int]]]],
+        update_items: List[Tuple[str, Optional[Tuple[str, int]]]],
+    ) -> None:
+        """Add the registration count and ticket type sales increments, with their capacity conditions, to a
+        transaction. With sharded counters the picked shards are incremented instead of the entries.
+        """
+        counter_messages = self.__counter_messages(event_entry, ticket_type_entry)
+        open_condition = Event.status == EventStatus.OPEN.value
+
+        # Event ----------------------------------------------------------------------------------------
+        if not self.__counter_shards_repository.enabled:
+            # what the shards counted while counters were sharded still takes up capacity until it is folded
+            event_condition = open_condition
+            if event_entry.isLimitedSlot and event_entry.maximumSlots is not None:
+                shard_total = self.__counter_shards_repository.get_shard_total(
+                    event_entry.eventId, CounterShardsRepository.REGISTRATION_COUNT
+                )
+                event_condition &= self.__below_limit(Event.registrationCount, event_entry.maximumSlots - shard_total)
+            transaction.update(event_entry, actions=[Event.registrationCount.add(1)], condition=event_condition)
+            update_items.append((counter_messages[CounterShardsRepository.REGISTRATION_COUNT], None))
+
+            # Ticket Type ------------------------------------------------------------------------------
+            if ticket_type_entry:
+                counter_name = CounterShardsRepository.ticket_type_sales_counter(ticket_type_entry)
+                shard_total = self.__counter_shards_repository.get_shard_total(ticket_type_entry.eventId, counter_name)
+                transaction.update(
+                    ticket_type_entry,
+                    actions=[
+                        TicketType.currentSales.add(1),
+                        TicketType.updateDate.set(self.current_date),
+                        TicketType.updatedBy.set(os.getenv('CURRENT_USER')),
+                    ],
+                    condition=self.__below_limit(
+                        TicketType.currentSales, ticket_type_entry.maximumQuantity - shard_total
+                    ),
+                )
+                update_items.append((counter_messages[counter_name], None))
+
+            return
+
+        # Sharded Counters -------------------------------------------------------------------------------
+        transaction.condition_check(
+            Event, event_entry.hashKey, range_key=event_entry.rangeKey, condition=open_condition
+        )
+        check_items.append(('Event is not open for registration', None))
+
+        remaining = self.__counter_remaining(event_entry, ticket_type_entry)
+
+        for counter_name, shard_index in counter_shards.items():
+            self.__counter_shards_repository.add_increment(
+                transaction,
+                event_id=event_entry.eventId,
+                counter_name=counter_name,
+                shard_index=shard_index,
+                remaining=remaining.get(counter_name),
+            )
+            update_items.append((counter_messages[counter_name], (counter_name, shard_index)))
+
+    @staticmethod
+    def __below_limit(count_attribute: NumberAttribute, limit: int) -> Condition:
+        """Get the condition that a count attribute is below a limit, a missing count is below a positive limit."""
+        condition = count_attribute < limit
+        return count_attribute.does_not_exist() | condition if limit > 0 else condition
+
+    def __add_discount_claim(
+        self,
+        transaction: TransactWrite,
+        discount_entry: Optional[Discount],
+        registration_id: str,
+        put_items: List[Tuple[str, Optional[Tuple[str, int]]]],
+        update_items: List[Tuple[str, Optional[Tuple[str, int]]]],
+    ) -> None:
+        if not discount_entry:
+            return
+
+        current_version = discount_entry.latestVersion
+        new_version = current_version + 1
+        version_actions = [
+            Discount.registrationId.set(registration_id),
+            Discount.updateDate.set(self.current_date),
+            Discount.updatedBy.set(os.getenv('CURRENT_USER')),
+            Discount.latestVersion.set(new_version),
+        ]
+        if discount_entry.isReusable:
+            discount_condition = None
+            if discount_entry.maxDiscountUses is not None:
+                discount_condition = Discount.remainingUses > 0
+            transaction.update(
+                discount_entry,
+                actions=[
+                    Discount.currentDiscountUses.add(1),
+                    Discount.remainingUses.set(Discount.remainingUses - 1),
+                    *version_actions,
+                ],
+                condition=discount_condition,
+            )
+            discount_message = 'Discount has no remaining uses'
+
+        else:
+            transaction.update(
+                discount_entry,
+                actions=[Discount.claimed.set(True), *version_actions],
+                condition=Discount.claimed.does_not_exist() | (Discount.claimed == False),  # noqa: E712
+            )
+            discount_message = 'Discount already claimed'
+
+        update_items.append((discount_message, None))
+
+        # Store Old Entry ----------------------------------------------------------------------------
+        old_discount_entry = deepcopy(discount_entry)
+        old_discount_entry.rangeKey = discount_entry.rangeKey.replace('v0#', f'v{new_version}#')
+        old_discount_entry.latestVersion = current_version
+        old_discount_entry.updatedBy = old_discount_entry.updatedBy or os.getenv('CURRENT_USER')
+        transaction.save(old_discount_entry)
+        put_items.append((discount_message, None))
+
+    def __build_registration_entry(
+        self, registration_in: Union[PyconRegistrationIn, RegistrationIn], registration_id: str
+    ) -> Registration:
+        data = RepositoryUtils.load_data(pydantic_schema_in=registration_in)  # load data from pydantic schema
+        registration_entry = Registration(
+            hashKey=registration_in.eventId,
+            rangeKey=registration_id,
+            createDate=self.current_date,
+            updateDate=self.current_date,
+            entryStatus=EntryStatus.ACTIVE.value,
+            registrationId=registration_id,
+            **data,
+        )
+        registration_entry.certificateGenerated = False
+        return registration_entry
+
     def query_registrations(
         self, event_id: str = None, is_deleted: bool = False
     ) -> Tuple[HTTPStatus, List[Registration], str]:
@@ -141,6 +450,106 @@ class RegistrationsRepository:
             logger.info(f'[{self.core_obj}]: Fetch Registration data successful')
             return HTTPStatus.OK, registration_entries, None
 
+    def query_registrations_page(
+        self, event_id: str = None, is_deleted: bool = False, limit: int = None, cursor: str = None
+    ) -> Tuple[HTTPStatus, List[Registration], Optional[str], str]:
+        """Query a single page of registration records from the database.
+
+        Entries are pulled lazily from the PynamoDB result iterator, which stops once `limit` entries
+        have been read, so only the requested page is ever held in memory.
+
+        :param event_id: The event ID to query (default is None to query all records).
+        :type event_id: str
+
+        :param is_deleted: Whether to include soft-deleted records.
+        :type is_deleted: bool
+
+        :param limit: The maximum number of records to return (default is None for no limit).
+        :type limit: int
+
+        :param cursor: The opaque cursor returned by a previous page (default is None for the first page).
+        :type cursor: str
+
+        :return: A tuple containing HTTP status, a page of registration records, the cursor of the next page
+            (None when there are no more pages), and an optional error message.
+        :rtype: Tuple[HTTPStatus, List[Registration], Optional[str], str]
+
+        """
+        try:
+            last_evaluated_key = RepositoryUtils.decode_cursor(cursor)
+        except ValueError as e:
+            message = f'Invalid cursor: {str(e)}'
+            logger.error(f'[{self.core_obj}] {message}')
+            return HTTPStatus.BAD_REQUEST, None, None, message
+
+        try:
+            condition = None
+            if not is_deleted:
+                condition = Registration.entryStatus == EntryStatus.ACTIVE.value
+
+            if event_id is None:
+                result_iterator = Registration.scan(
+                    filter_condition=condition,
+                    limit=limit,
+                    last_evaluated_key=last_evaluated_key,
+                )
+            else:
+                result_iterator = Registration.query(
+                    hash_key=event_id,
+                    filter_condition=condition,
+                    limit=limit,
+                    last_evaluated_key=last_evaluated_key,
+                )
+
+            registration_entries = list(result_iterator)
+            next_cursor = RepositoryUtils.encode_cursor(result_iterator.last_evaluated_key)
+
+            if not registration_entries and not cursor:
+                message = 'No registration found'
+                logger.error(f'[{self.core_obj}] {message}')
+
+                return HTTPStatus.NOT_FOUND, None, None, message
+
+        except (QueryError, ScanError) as e:
+            message = f'Failed to query registration: {str(e)}'
+            logger.error(f'[{self.core_obj}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, None, message
+        except TableDoesNotExist as db_error:
+            message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
+            logger.error(f'[{self.core_obj}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, None, message
+        except PynamoDBConnectionError as db_error:
+            message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
+            logger.error(f'[{self.core_obj}] {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, None, message
+        else:
+            logger.info(f'[{self.core_obj}]: Fetch Registration page successful')
+            return HTTPStatus.OK, registration_entries, next_cursor, None
+
+    def iter_registrations(
+        self, event_id: str, page_size: int = CommonConstants.EXPORT_PAGE_SIZE
+    ) -> Iterator[Registration]:
+        """Lazily iterate over the active registration records of an event.
+
+        Records are fetched from DynamoDB one page at a time as the iterator is consumed.
+        Query errors are raised while iterating.
+
+        :param event_id: The event ID to query.
+        :type event_id: str
+
+        :param page_size: The number of records to read per DynamoDB request.
+        :type page_size: int
+
+        :return: An iterator of registration records.
+        :rtype: Iterator[Registration]
+
+        """
+        return Registration.query(
+            hash_key=event_id,
+            filter_condition=Registration.entryStatus == EntryStatus.ACTIVE.value,
+            page_size=page_size,
+        )
+
     def query_registration_with_registration_id(
         self, registration_id: str, event_id: str
     ) -> Tuple[HTTPStatus, Registration, str]:
@@ -188,6 +597,50 @@ class RegistrationsRepository:
             logger.info(f'[{self.core_obj} = {registration_id}]: Fetch Registration data successful')
             return HTTPStatus.OK, registration_entries[0], None
 
+    def query_registrations_by_ids(
+        self, registration_keys: Iterable[Tuple[str, str]]
+    ) -> Tuple[HTTPStatus, List[Registration], str]:
+        """Query many registration records by their keys with BatchGetItem.
+
+        Keys are requested in batches of up to 100, and keys left unprocessed by DynamoDB are requested
+        again until every key has been read. Keys without an active registration are left out.
+
+        :param registration_keys: The (event ID, registration ID) pairs to query.
+        :type registration_keys: Iterable[Tuple[str, str]]
+
+        :return: A tuple containing HTTP status, a list of registration records, and an optional error message.
+        :rtype: Tuple[HTTPStatus, List[Registration], str]
+
+        """
+        registration_keys = set(registration_keys)
+        if not registration_keys:
+            return HTTPStatus.OK, [], None
+
+        try:
+            registration_entries = [
+                registration
+                for registration in Registration.batch_get(registration_keys)
+                if registration.entryStatus == EntryStatus.ACTIVE.value
+            ]
+
+        except GetError as e:
+            message = f'Failed to batch get registrations: {str(e)}'
+            logger.error(f'[{self.core_obj}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except TableDoesNotExist as db_error:
+            message = f'Error on Table, Please check config to make sure table is created: {str(db_error)}'
+            logger.error(f'[{self.core_obj}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        except PynamoDBConnectionError as db_error:
+            message = f'Connection error occurred, Please check config(region, table name, etc): {str(db_error)}'
+            logger.error(f'[{self.core_obj}]: {message}')
+            return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
+        else:
+            logger.info(
+                f'[{self.core_obj}]: Fetch {len(registration_entries)} of {len(registration_keys)} registrations successful'
+            )
+            return HTTPStatus.OK, registration_entries, None
+
     def query_registrations_with_email(
         self, event_id: str, email: str, exclude_registration_id: str = None
     ) -> Tuple[HTTPStatus, List[Registration], str]:
@@ -271,7 +724,7 @@ class RegistrationsRepository:
                 updated_data.update(
                     updateDate=self.current_date,
                 )
-                actions = [getattr(Registration, k).set(v) for k, v in updated_data.items()]
+                actions = RepositoryUtils.get_update_actions(Registration, updated_data)
                 transaction.update(registration_entry, actions=actions)
 
             registration_entry.refresh()
@@ -283,6 +736,86 @@ class RegistrationsRepository:
             logger.error(f'[{registration_entry.rangeKey}] {message}')
             return HTTPStatus.INTERNAL_SERVER_ERROR, None, message
 
+    def update_evaluation_email_sent(
+        self, registration_entries: List[Registration], evaluation_email_sent: bool
+    ) -> Tuple[HTTPStatus, List[Registration], str]:
+        """Set the evaluationEmailSent flag of many registration records in bulk.
+
+        Records are written in transactions of up to TRANSACT_WRITE_MAX_ITEMS, each update conditioned on the flag
+        still having the opposite value. Records that fail the condition were already flipped by another run and
+        are left out of the result, so callers only act on the records they changed.
+
+        :param registration_entries: The registration records to be updated.
+        :type registration_entries: List[Registration]
+
+        :param evaluation_email_sent: The new value of the flag.
+        :type evaluation_email_sent: bool
+
+        :return: A tuple containing HTTP status, the records that were updated, and an optional error message.
+        :rtype: Tuple[HTTPStatus, List[Registration], str]
+
+        """
+        if evaluation_email_sent:
+            condition = (Registration.evaluationEmailSent == False) | (  # noqa: E712
+                Registration.evaluationEmailSent.does_not_exist()
+            )
+        else:
+            condition = Registration.evaluationEmailSent == True  # noqa: E712
+
+        actions = [
+            Registration.evaluationEmailSent.set(evaluation_email_sent),
+            Registration.updateDate.set(self.current_date),
+        ]
+        updated_entries = []
+        chunk_size = CommonConstants.TRANSACT_WRITE_MAX_ITEMS
+        for index in range(0, len(registration_entries), chunk_size):
+            chunk = registration_entries[index : index + chunk_size]
+            try:
+                try:
+                    self.__transact_update(entries=chunk, actions=actions, condition=condition)
+                except TransactWriteError as e:
+                    reasons = e.cancellation_reasons
+                    if not reasons or not any(reason and reason.code == 'ConditionalCheckFailed' for reason in reasons):
+                        raise
+
+                    # Retry the chunk without the records that already have the new value
+                    chunk = [entry for entry, reason in zip(chunk, reasons) if not reason]
+                    if chunk:
+                        self.__transact_update(entries=chunk, actions=actions, condition=condition)
+
+            except TransactWriteError as e:
+                message = f'Failed to update registration evaluation email flags: {str(e)}'
+                logger.error(f'[{self.core_obj}] {message}')
+                return HTTPStatus.INTERNAL_SERVER_ERROR, updated_entries, message
+
+            for entry in chunk:
+                entry.evaluationEmailSent = evaluation_email_sent
+                entry.updateDate = self.current_date
+
+            updated_entries.extend(chunk)
+
+        logger.info(
+            f'[{self.core_obj}] Set evaluationEmailSent = {evaluation_email_sent} on {len(updated_entries)} records'
+        )
+        return HTTPStatus.OK, updated_entries, None
+
+    def __transact_update(self, entries: List[Registration], actions: list, condition: Condition) -> None:
+        """Apply the same update actions to registration records in a single transaction.
+
+        :param entries: The registration records to be updated.
+        :type entries: List[Registration]
+
+        :param actions: The update actions applied to every record.
+        :type actions: list
+
+        :param condition: The condition every record must meet.
+        :type condition: Condition
+
+        """
+        with TransactWrite(connection=self.conn) as transaction:
+            for entry in entries:
+                transaction.update(entry, actions=actions, condition=condition)
+
     def delete_registration(self, registration_entry: Registration) -> HTTPStatus:
         """Delete a registration record from the database.
 
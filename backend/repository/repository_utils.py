@@ -1,16 +1,22 @@
+import base64
+import binascii
 import json
-from copy import deepcopy
-from typing import Tuple
+from typing import Iterable, List, Optional, Tuple, Type
 
 from constants.common_constants import CommonConstants
 from pynamodb.attributes import MapAttribute
+from pynamodb.expressions.update import Action
 from pynamodb.models import Model
 
 
 class RepositoryUtils:
     @staticmethod
     def get_update(old_data: dict, new_data: dict) -> Tuple[bool, dict]:
-        """Get the updated data and check if there's an update.
+        """Get the changes that new_data makes to old_data and check if there's an update.
+
+        Only the attributes that change are returned, so that updates write the smallest possible set of paths.
+        Plain dictionaries in the result hold the changes to nested paths of an existing map, MapAttribute
+        values replace the whole map, and None values mark attributes to be removed.
 
         :param old_data: The old data to be compared with the new data.
         :type old_data: dict
@@ -18,26 +24,80 @@ class RepositoryUtils:
         :param new_data: The new data to be that will be used as basis for comparison.
         :type new_data: dict
 
-        :return: A tuple containing a boolean value indicating if there's an update and the updated data.
+        :return: A tuple containing a boolean value indicating if there's an update and the changed data.
         :rtype: Tuple[bool, dict]
 
         """
-        excluded_comparison_keys = deepcopy(CommonConstants.EXCLUDE_COMPARISON_KEYS)
+        updated_data = RepositoryUtils.diff_nested_dict(
+            old_dict=old_data, new_data=new_data, excluded_keys=set(CommonConstants.EXCLUDE_COMPARISON_KEYS)
+        )
+        return bool(updated_data), updated_data
 
-        # copy old_data
-        old_data_copy = deepcopy(old_data)
-        for key in excluded_comparison_keys:
-            old_data_copy.pop(key, None)
+    @staticmethod
+    def diff_nested_dict(old_dict: dict, new_data: dict, excluded_keys: Iterable[str] = ()) -> dict:
+        """Get the changes that merging new_data into old_dict with update_nested_dict would make.
 
-        # set updated_data
-        updated_data = deepcopy(old_data_copy)
-        RepositoryUtils.update_nested_dict(updated_data, new_data)
-        has_update = updated_data != old_data_copy
+        :param old_dict: The old dictionary, which is not modified.
+        :type old_dict: dict
+
+        :param new_data: The new data to be added or changed in the old dictionary.
+        :type new_data: dict
 
-        # Change to MapAttribute
-        updated_data = RepositoryUtils.items_to_map_attr(updated_data)
+        :param excluded_keys: Keys whose old value is ignored, so they are changed whenever new_data sets them.
+        :type excluded_keys: Iterable[str]
 
-        return has_update, updated_data
+        :return: The changed keys, see get_update for the format of the values.
+        :rtype: dict
+
+        """
+        changes = {}
+        for key, val in new_data.items():
+            has_old_val = key in old_dict and key not in excluded_keys
+            old_val = old_dict.get(key) if has_old_val else None
+            if isinstance(val, dict):
+                if isinstance(old_val, dict):
+                    nested_changes = RepositoryUtils.diff_nested_dict(old_dict=old_val, new_data=val)
+                    if nested_changes:
+                        changes[key] = nested_changes
+                else:
+                    new_map = RepositoryUtils.update_nested_dict({}, val)
+                    changes[key] = MapAttribute(**RepositoryUtils.items_to_map_attr(new_map))
+            elif val is None:
+                if old_val is not None:
+                    changes[key] = None
+            elif not has_old_val or val != old_val:
+                changes[key] = val
+
+        return changes
+
+    @staticmethod
+    def get_update_actions(model: Type[Model], updated_data: dict) -> List[Action]:
+        """Convert the changes returned by get_update into update actions.
+
+        :param model: The model class of the item to be updated.
+        :type model: Type[Model]
+
+        :param updated_data: The changed data, with any extra attributes to be set added at the top level.
+        :type updated_data: dict
+
+        :return: A SET action for each changed path, and a REMOVE action for each removed path.
+        :rtype: List[Action]
+
+        """
+
+        def to_actions(parent, changes: dict) -> List[Action]:
+            actions = []
+            for key, val in changes.items():
+                path = getattr(parent, key) if parent is model else parent[key]
+                if isinstance(val, dict):
+                    actions.extend(to_actions(path, val))
+                elif val is None:
+                    actions.append(path.remove())
+                else:
+                    actions.append(path.set(val))
+            return actions
+
+        return to_actions(model, updated_data)
 
     @staticmethod
     def update_nested_dict(old_dict: dict, new_data: dict):
@@ -114,3 +174,46 @@ class RepositoryUtils:
 
         """
         return json.loads(pydantic_schema_in.json(exclude_unset=exclude_unset))
+
+    @staticmethod
+    def encode_cursor(last_evaluated_key: Optional[dict]) -> Optional[str]:
+        """Encode a DynamoDB LastEvaluatedKey into an opaque pagination cursor.
+
+        :param last_evaluated_key: The LastEvaluatedKey returned by a query or scan.
+        :type last_evaluated_key: Optional[dict]
+
+        :return: A URL-safe cursor string, or None if there are no more pages.
+        :rtype: Optional[str]
+
+        """
+        if not last_evaluated_key:
+            return None
+
+        raw_key = json.dumps(last_evaluated_key, separators=(',', ':'), sort_keys=True)
+        return base64.urlsafe_b64encode(raw_key.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+        """Decode an opaque pagination cursor back into a DynamoDB ExclusiveStartKey.
+
+        :param cursor: The cursor previously returned by encode_cursor.
+        :type cursor: Optional[str]
+
+        :raises ValueError: If the cursor is malformed.
+
+        :return: The ExclusiveStartKey to resume from, or None to start from the beginning.
+        :rtype: Optional[dict]
+
+        """
+        if not cursor:
+            return None
+
+        try:
+            last_evaluated_key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (binascii.Error, UnicodeError, ValueError) as e:
+            raise ValueError('Malformed pagination cursor') from e
+
+        if not isinstance(last_evaluated_key, dict):
+            raise ValueError('Malformed pagination cursor')
+
+        return last_evaluated_key
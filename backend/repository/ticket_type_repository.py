@@ -5,6 +5,7 @@ from http import HTTPStatus
 from typing import List, Tuple
 
 import pytz
+from aws.aws_clients import AWSClients
 from constants.common_constants import EntryStatus
 from model.ticket_types.ticket_types import TicketType, TicketTypeIn
 from pynamodb.connection import Connection
@@ -16,17 +17,21 @@ from pynamodb.exceptions import (
     TransactWriteError,
 )
 from pynamodb.transactions import TransactWrite
+from repository.counter_shards_repository import CounterShardsRepository
 from repository.repository_utils import RepositoryUtils
 from utils.logger import logger
+from utils.tracing import traced
 from utils.utils import Utils
 
 
+@traced
 class TicketTypeRepository:
-    def __init__(self) -> None:
+    def __init__(self, connection: Connection = None) -> None:
         self.core_obj = 'TicketType'
         self.current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
         self.latest_version = 0
-        self.conn = Connection(region=os.getenv('REGION'))
+        self.conn = connection or AWSClients.get_connection()
+        self.__counter_shards_repository = CounterShardsRepository(connection=self.conn)
 
     def store_ticket_type(self, ticket_type_in: TicketTypeIn) -> Tuple[HTTPStatus, TicketType, str]:
         """Store a new ticket_type.
@@ -207,7 +212,7 @@ class TicketTypeRepository:
                     updatedBy=os.getenv('CURRENT_USER'),
                     latestVersion=new_version,
                 )
-                actions = [getattr(TicketType, k).set(v) for k, v in updated_data.items()]
+                actions = RepositoryUtils.get_update_actions(TicketType, updated_data)
                 transaction.update(ticket_type_entry, actions=actions)
 
                 # Store Old Entry --------------------------------------------------------------------------
@@ -273,6 +278,14 @@ class TicketTypeRepository:
         :rtype: Tuple[HTTPStatus, TicketType, str]
 
         """
+        if self.__counter_shards_repository.enabled:
+            status, _, message = self.__counter_shards_repository.increment(
+                event_id=ticket_type_entry.eventId,
+                counter_name=CounterShardsRepository.ticket_type_sales_counter(ticket_type_entry),
+                append_count=append_count,
+            )
+            return status, ticket_type_entry if status == HTTPStatus.OK else None, message
+
         try:
             with TransactWrite(connection=self.conn) as transaction:
                 condition = TicketType.rangeKey == ticket_type_entry.rangeKey
@@ -0,0 +1,109 @@
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parser = argparse.ArgumentParser(
+    description='Rebuild the evaluation summaries of events from their stored evaluations, so that evaluations '
+    'submitted before the summaries were maintained are counted'
+)
+parser.add_argument(
+    '--env-file', type=str, default=os.path.join(script_dir, '..', '.env'), help='Path to the .env file'
+)
+parser.add_argument('--event-id', type=str, help='Only rebuild the summary of this event, every event by default')
+parser.add_argument('--dry-run', action='store_true', help='Only log the summaries that would be updated')
+args = parser.parse_args()
+load_dotenv(dotenv_path=args.env_file)
+
+
+from http import HTTPStatus
+
+from model.entities import Entities
+from model.evaluations.evaluation import Evaluation
+from repository.evaluation_summaries_repository import EvaluationSummariesRepository
+from repository.events_repository import EventsRepository
+from repository.repository_utils import RepositoryUtils
+from utils.logger import logger
+
+# entryId too, so that the items written when it was still set are rewritten without it
+SUMMARY_ATTRIBUTES = ('questionType', 'responseCount', 'answerScaleCount', 'answerScaleSum', 'count', 'entryId')
+
+
+def summary_values(entry: Entities) -> tuple:
+    attributes = entry.get_attributes()
+    return tuple(getattr(entry, name) if name in attributes else None for name in SUMMARY_ATTRIBUTES)
+
+
+def rebuild_event_summary(summaries_repository: EvaluationSummariesRepository, event_id: str) -> int:
+    """Replace the summary items of an event with the ones built from all of its evaluations
+
+    Evaluations submitted while this runs may be counted twice or not at all, run it when the event is not
+    being evaluated, or run it again afterwards.
+
+    :param summaries_repository: The repository that builds the summary items
+    :type summaries_repository: EvaluationSummariesRepository
+
+    :param event_id: The event ID
+    :type event_id: str
+
+    :return: The number of summary items written or deleted
+    :rtype: int
+
+    """
+    evaluations = [RepositoryUtils.db_model_to_dict(entry) for entry in Evaluation.query(hash_key=event_id)]
+    rebuilt_entries = {
+        entry.rangeKey: entry
+        for entry in summaries_repository.build_evaluation_summaries(event_id=event_id, evaluations=evaluations)
+    }
+    status, stored_entries, message = summaries_repository.query_evaluation_summaries(event_id=event_id)
+    if status != HTTPStatus.OK:
+        raise RuntimeError(message)
+
+    stored_entries = {entry.rangeKey: entry for entry in stored_entries}
+    changed_entries = [
+        entry
+        for range_key, entry in rebuilt_entries.items()
+        if range_key not in stored_entries or summary_values(stored_entries[range_key]) != summary_values(entry)
+    ]
+    # e.g. the count of an answer that no stored evaluation has anymore, or of free text now counted as other
+    stale_entries = [entry for range_key, entry in stored_entries.items() if range_key not in rebuilt_entries]
+    if not changed_entries and not stale_entries:
+        return 0
+
+    logger.info(
+        f'[{event_id}] {len(evaluations)} evaluations, writing {len(changed_entries)} and deleting '
+        f'{len(stale_entries)} of {len(stored_entries)} summary items'
+    )
+    if not args.dry_run:
+        with Entities.batch_write() as batch:
+            for entry in changed_entries:
+                batch.save(entry)
+            for entry in stale_entries:
+                batch.delete(entry)
+
+    return len(changed_entries) + len(stale_entries)
+
+
+def main():
+    if args.event_id:
+        event_ids = [args.event_id]
+    else:
+        status, events, message = EventsRepository().query_events()
+        if status != HTTPStatus.OK:
+            logger.error(f'Failed to query events: {message}')
+            return
+
+        event_ids = [event.eventId for event in events]
+
+    summaries_repository = EvaluationSummariesRepository()
+    updated = 0
+    for event_id in event_ids:
+        updated += rebuild_event_summary(summaries_repository, event_id)
+
+    action = 'Would update' if args.dry_run else 'Updated'
+    logger.info(f'{action} {updated} summary items of {len(event_ids)} events')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parser = argparse.ArgumentParser(
+    description='Backfill the attributes that the PaymentTransactionIdIndex and TransactionStatusIndex of payment '
+    'transactions rely on'
+)
+parser.add_argument(
+    '--env-file', type=str, default=os.path.join(script_dir, '..', '.env'), help='Path to the .env file'
+)
+parser.add_argument('--dry-run', action='store_true', help='Only log the entries that would be updated')
+args = parser.parse_args()
+load_dotenv(dotenv_path=args.env_file)
+
+
+from constants.common_constants import EntryStatus
+from model.payments.payments import PaymentTransaction
+from utils.logger import logger
+
+
+def main():
+    # DynamoDB populates the indexes on its own, but only for items that already carry their key attributes.
+    # Older payment transactions predate paymentTransactionId and latestTransactionStatus, which only the latest
+    # active version should have.
+    scanned = 0
+    updated = 0
+    for payment_transaction in PaymentTransaction.scan(
+        filter_condition=PaymentTransaction.hashKey.startswith('PaymentTransaction#')
+    ):
+        scanned += 1
+        actions = []
+
+        _, _, entry_id = payment_transaction.rangeKey.partition('#')
+        is_latest = (
+            payment_transaction.rangeKey.startswith('v0#')
+            and payment_transaction.entryStatus == EntryStatus.ACTIVE.value
+        )
+        if is_latest and payment_transaction.paymentTransactionId != entry_id:
+            actions.append(PaymentTransaction.paymentTransactionId.set(entry_id))
+        elif not is_latest and payment_transaction.paymentTransactionId is not None:
+            actions.append(PaymentTransaction.paymentTransactionId.remove())
+
+        if is_latest and payment_transaction.latestTransactionStatus != payment_transaction.transactionStatus:
+            actions.append(PaymentTransaction.latestTransactionStatus.set(payment_transaction.transactionStatus))
+        elif not is_latest and payment_transaction.latestTransactionStatus is not None:
+            actions.append(PaymentTransaction.latestTransactionStatus.remove())
+
+        if not actions:
+            continue
+
+        logger.info(
+            f'[{payment_transaction.hashKey}|{payment_transaction.rangeKey}] Updating {len(actions)} attribute(s)'
+        )
+        if not args.dry_run:
+            payment_transaction.update(actions=actions)
+        updated += 1
+
+    action = 'Would update' if args.dry_run else 'Updated'
+    logger.info(f'{action} {updated} of {scanned} payment transaction entries')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,444 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(script_dir, '..')
+parser = argparse.ArgumentParser(
+    description='Benchmark the pure-Python hot paths of the API and compare them against a stored baseline'
+)
+parser.add_argument(
+    '--baseline',
+    type=str,
+    default=os.path.join(script_dir, 'benchmark_baseline.json'),
+    help='Path to the baseline file',
+)
+parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline')
+parser.add_argument('--filter', type=str, help='Only run the benchmarks whose name contains this text')
+parser.add_argument('--repeat', type=int, default=15, help='Number of timed runs per benchmark, the median is kept')
+parser.add_argument(
+    '--tolerance',
+    type=float,
+    help='Fail if ops/sec drops by more than this fraction of the baseline, by default NOISE_MULTIPLIER times '
+    'the run-to-run noise measured for the benchmark, and at least MIN_TOLERANCE',
+)
+parser.add_argument(
+    '--memory-tolerance',
+    type=float,
+    default=0.10,
+    help='Fail if the peak allocation per op grows by more than this fraction of the baseline',
+)
+parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+args = parser.parse_args()
+
+# the models read their table settings on import, but no benchmark reaches AWS
+os.environ.setdefault('REGION', 'ap-southeast-1')
+sys.path.insert(0, backend_dir)
+
+
+from model.email.email import EmailRecipient, EmailTemplateIn
+from model.events.event import Event, EventIn, EventOut
+from model.payments.payments import PaymentTransaction, PaymentTransactionOut
+from model.pycon_registrations.pycon_registration import PaymentRegistrationDetailsOut
+from model.registrations.registration import (
+    Registration,
+    RegistrationIn,
+    RegistrationOut,
+    RegistrationPatch,
+)
+from repository.repository_utils import RepositoryUtils
+from usecase.email_usecase import EmailUsecase
+from utils.logger import logger
+
+EVENT_ID = 'devfest-davao-2024'
+CREATE_DATE = '2024-10-01T09:30:00.123456+08:00'
+UPDATE_DATE = '2024-10-02T14:05:42.654321+08:00'
+PAGE_SIZE = 100
+# a drop within this many times the noise of the timed runs is taken for noise, not a regression
+NOISE_MULTIPLIER = 4
+MIN_TOLERANCE = 0.05
+
+
+class StubSQSClient:
+    """Accepts every message, so that the email benchmarks only measure building and packing the messages."""
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[dict]) -> dict:
+        return {'Successful': [{'Id': entry['Id'], 'MessageId': entry['Id']} for entry in Entries]}
+
+
+def build_event() -> Event:
+    return Event(
+        hashKey='v0',
+        rangeKey=f'admin-01J9ZQ3K7W#{EVENT_ID}',
+        latestVersion=3,
+        entryStatus='ACTIVE',
+        eventId=EVENT_ID,
+        createDate=CREATE_DATE,
+        updateDate=UPDATE_DATE,
+        createdBy='admin-01J9ZQ3K7W',
+        updatedBy='admin-01J9ZQ3K7W',
+        name='DevFest Davao 2024',
+        description='A community-led developer festival with talks, workshops and a hackathon. ' * 4,
+        status='open',
+        email='gdgdavao@gmail.com',
+        startDate='2024-11-16T08:00:00+08:00',
+        endDate='2024-11-16T18:00:00+08:00',
+        venue='SMX Convention Center, Lanang, Davao City',
+        bannerLink=f'events/{EVENT_ID}/banner.png',
+        logoLink=f'events/{EVENT_ID}/logo.png',
+        paidEvent=True,
+        price=450.0,
+        certificateTemplate=f'events/{EVENT_ID}/certificate.png',
+        isApprovalFlow=False,
+        gcashName='GDG Davao',
+        gcashNumber='09171234567',
+        isLimitedSlot=True,
+        registrationCount=512,
+        maximumSlots=800,
+        dailyEmailCount=42,
+        hasMultipleTicketTypes=True,
+        platformFee=0.05,
+    )
+
+
+def build_registration(index: int) -> Registration:
+    registration_id = f'01J9ZQ{index:020d}'
+    return Registration(
+        hashKey=EVENT_ID,
+        rangeKey=registration_id,
+        registrationId=registration_id,
+        entryStatus='ACTIVE',
+        createDate=CREATE_DATE,
+        updateDate=UPDATE_DATE,
+        eventId=EVENT_ID,
+        email=f'attendee{index}@example.com',
+        firstName='Juan Miguel',
+        lastName='Dela Cruz',
+        contactNumber='09171234567',
+        careerStatus='Working Professional',
+        yearsOfExperience='3-5 years',
+        organization='Davao Tech Collective',
+        title='Software Engineer',
+        ticketTypeId='early-bird',
+        shirtSize='M',
+        cityOfResidence='Davao City',
+        industry='Information Technology',
+        levelOfAWSUsage='Intermediate',
+        awsUsecase='Serverless APIs',
+        foodRestrictions='None',
+        discountCode=f'DEVFEST{index:06d}',
+        amountPaid=405.0,
+        transactionId=f'txn-{index:08d}',
+        referenceNumber='1234567890123',
+        certificateClaimed=False,
+        registrationEmailSent=True,
+    )
+
+
+def build_payment_transaction() -> PaymentTransaction:
+    return PaymentTransaction(
+        hashKey=f'PaymentTransaction#{EVENT_ID}',
+        rangeKey='v0#01J9ZQ5T2B8N',
+        latestVersion=1,
+        entryStatus='ACTIVE',
+        entryId='01J9ZQ5T2B8N',
+        createDate=CREATE_DATE,
+        updateDate=UPDATE_DATE,
+        price=1500.0,
+        eventId=EVENT_ID,
+        transactionStatus='PENDING',
+        latestTransactionStatus='PENDING',
+        firstName='Maria',
+        lastName='Santos',
+        nickname='Mia',
+        pronouns='she/her',
+        email='maria.santos@example.com',
+        contactNumber='09181234567',
+        organization='Mindanao Python Users Group',
+        jobTitle='Data Engineer',
+        facebookLink='https://facebook.com/maria.santos',
+        linkedInLink='https://linkedin.com/in/maria-santos',
+        ticketType='coder',
+        sprintDay=True,
+        availTShirt=True,
+        shirtType='unisex',
+        shirtSize='M',
+        communityInvolvement=True,
+        futureVolunteer=False,
+        dietaryRestrictions='Vegetarian',
+        discountCode='PYCON10',
+        validIdObjectKey=f'pycon/{EVENT_ID}/valid-id/01J9ZQ5T2B8N.png',
+        paymentRequestId='pr-01J9ZQ5T2B8N',
+    )
+
+
+def build_benchmarks() -> Dict[str, Callable[[], object]]:
+    """Build the benchmarks, each a function that runs one operation on a prebuilt payload
+
+    :return: The operation of each benchmark, by name
+    :rtype: Dict[str, Callable[[], object]]
+
+    """
+    event = build_event()
+    registration = build_registration(0)
+    registrations = [build_registration(index) for index in range(PAGE_SIZE)]
+    payment_transaction = build_payment_transaction()
+
+    registration_data = RepositoryUtils.db_model_to_dict(registration)
+    registration_patch = RegistrationPatch(
+        organization='Davao Cloud Builders', title='Senior Software Engineer', shirtSize='L', certificateClaimed=True
+    )
+    registration_patch_data = RepositoryUtils.load_data(pydantic_schema_in=registration_patch, exclude_unset=True)
+    registration_in = RegistrationIn(
+        **{key: registration_data[key] for key in RegistrationIn.__fields__ if key in registration_data}
+    )
+    event_in = EventIn(
+        **{key: val for key, val in RepositoryUtils.db_model_to_dict(event).items() if key in EventIn.__fields__}
+    )
+
+    payment_transaction_data = RepositoryUtils.db_model_to_dict(payment_transaction)
+    # a payment transaction with its registration data and gcash details nested, the shape of a map attribute update
+    nested_payment_data = {
+        **payment_transaction_data,
+        'registrationData': {key: val for key, val in payment_transaction_data.items() if isinstance(val, str)},
+        'gcashPayment': {'referenceNumber': '1234567890123', 'sender': {'name': 'Maria Santos', 'number': '0918'}},
+    }
+    nested_payment_patch = {
+        'transactionStatus': 'SUCCESS',
+        'registrationData': {'shirtSize': 'L', 'dietaryRestrictions': None},
+        'gcashPayment': {'sender': {'number': '09181234567'}},
+    }
+
+    email_usecase = EmailUsecase(sqs_client=StubSQSClient())
+    email_template = EmailTemplateIn(
+        subject='{eventName} Registration Confirmation',
+        salutation='Good day {firstName},',
+        body=[
+            'Thank you for registering for the upcoming {eventName}!',
+            'Your ticket is reserved under {email}. Please bring a valid ID on the day of the event.',
+            'See you soon!',
+        ],
+        regards=['Best,', 'GDG Davao'],
+        emailType='registrationEmail',
+        eventId=EVENT_ID,
+        recipients=[
+            EmailRecipient(
+                to=['attendee0@example.com'],
+                substitutions={
+                    'eventName': 'DevFest Davao 2024',
+                    'firstName': 'Juan',
+                    'email': 'attendee0@example.com',
+                },
+            )
+        ],
+    )
+
+    def convert_payment_transaction_out():
+        data = RepositoryUtils.db_model_to_dict(payment_transaction)
+        return PaymentTransactionOut(**data, registrationData=PaymentRegistrationDetailsOut(**data))
+
+    return {
+        'repository_utils.get_update.registration': lambda: RepositoryUtils.get_update(
+            old_data=RepositoryUtils.db_model_to_dict(registration), new_data=registration_patch_data
+        ),
+        'repository_utils.get_update.nested': lambda: RepositoryUtils.get_update(
+            old_data=nested_payment_data, new_data=nested_payment_patch
+        ),
+        'repository_utils.update_nested_dict.nested': lambda: RepositoryUtils.update_nested_dict(
+            {**nested_payment_data, 'gcashPayment': {'referenceNumber': '1234567890123'}}, nested_payment_patch
+        ),
+        'repository_utils.items_to_map_attr.nested': lambda: RepositoryUtils.items_to_map_attr(nested_payment_data),
+        'repository_utils.load_data.registration_in': lambda: RepositoryUtils.load_data(
+            pydantic_schema_in=registration_in
+        ),
+        'repository_utils.load_data.event_in': lambda: RepositoryUtils.load_data(pydantic_schema_in=event_in),
+        'convert.registration_out': lambda: RegistrationOut(**RepositoryUtils.db_model_to_dict(registration)),
+        'convert.registration_out.page': lambda: [
+            RegistrationOut(**RepositoryUtils.db_model_to_dict(entry)) for entry in registrations
+        ],
+        'convert.event_out': lambda: EventOut(**RepositoryUtils.db_model_to_dict(event)),
+        'convert.payment_transaction_out': convert_payment_transaction_out,
+        'email.registration_confirmation': lambda: email_usecase.send_registration_creation_email(
+            registration=registration, event=event
+        ),
+        'email.template_render': lambda: email_template.render(email_template.recipients[0]),
+    }
+
+
+def reference_operation() -> object:
+    # a fixed mix of dict building and JSON round trips, like the benchmarks but independent of the code under test
+    data = {f'key{index}': [index, str(index), {'value': index * 1.5}] for index in range(50)}
+    return json.loads(json.dumps(data))
+
+
+def measure(operation: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Measure the throughput and the peak allocation of an operation
+
+    Each timed run of the operation follows a timed run of reference_operation, and the speed relative to the
+    reference is what is compared against the baseline. It holds across machines and load, unlike ops/sec.
+    The median of the runs is kept, and their spread around it is the noise the regression tolerance is set from.
+
+    :param operation: The operation to be measured
+    :type operation: Callable[[], object]
+
+    :param repeat: Number of timed runs, the median is kept
+    :type repeat: int
+
+    :return: The ops/sec, the ops per reference op, its relative noise, and the peak bytes allocated by one op
+    :rtype: Dict[str, float]
+
+    """
+    timer = timeit.Timer(operation)
+    number, _ = timer.autorange()
+    reference_timer = timeit.Timer(reference_operation)
+    reference_number, _ = reference_timer.autorange()
+
+    run_ops_per_sec, run_relative_speeds = [], []
+    for _ in range(repeat):
+        reference_ops_per_sec = reference_number / reference_timer.timeit(number=reference_number)
+        ops_per_sec = number / timer.timeit(number=number)
+        run_ops_per_sec.append(ops_per_sec)
+        run_relative_speeds.append(ops_per_sec / reference_ops_per_sec)
+
+    relative_speed = statistics.median(run_relative_speeds)
+    # the median absolute deviation, scaled to estimate the standard deviation, is not thrown off by a single
+    # run that was interrupted, and the error of the median of the runs is about 1.25 deviations / sqrt(runs)
+    deviation = statistics.median(abs(speed - relative_speed) for speed in run_relative_speeds) * 1.4826
+    median_error = 1.2533 * deviation / len(run_relative_speeds) ** 0.5
+
+    gc.collect()
+    tracemalloc.start()
+    start_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    operation()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'opsPerSec': round(statistics.median(run_ops_per_sec), 1),
+        'relativeSpeed': round(relative_speed, 6),
+        'relativeNoise': round(median_error / relative_speed, 4),
+        'peakBytes': peak_bytes - start_bytes,
+    }
+
+
+def speed_tolerance(result: Dict[str, float], baseline: Dict[str, float]) -> float:
+    """Get the fraction by which the relative speed of a benchmark may drop before it is a regression
+
+    :param result: The result of the benchmark
+    :type result: Dict[str, float]
+
+    :param baseline: The baseline of the benchmark
+    :type baseline: Dict[str, float]
+
+    :return: The tolerance given with --tolerance, or the one set from the noise of both measurements
+    :rtype: float
+
+    """
+    if args.tolerance is not None:
+        return args.tolerance
+
+    # the noise of the difference of two measurements
+    noise = (result['relativeNoise'] ** 2 + baseline.get('relativeNoise', result['relativeNoise']) ** 2) ** 0.5
+    return max(MIN_TOLERANCE, NOISE_MULTIPLIER * noise)
+
+
+def compare(name: str, result: Dict[str, float], baseline: Dict[str, float]) -> List[str]:
+    """Compare a result against its baseline
+
+    :param name: The benchmark name
+    :type name: str
+
+    :param result: The result of the benchmark
+    :type result: Dict[str, float]
+
+    :param baseline: The baseline of the benchmark
+    :type baseline: Dict[str, float]
+
+    :return: The regressions, if any
+    :rtype: List[str]
+
+    """
+    regressions = []
+    change = result['relativeSpeed'] / baseline['relativeSpeed'] - 1
+    tolerance = speed_tolerance(result, baseline)
+    if change < -tolerance:
+        regressions.append(
+            f'{name} is {-change:.0%} slower than its baseline, relative to the reference workload '
+            f'({result["opsPerSec"]:.0f} ops/sec now), over the {tolerance:.0%} tolerance'
+        )
+
+    max_peak_bytes = baseline['peakBytes'] * (1 + args.memory_tolerance)
+    if result['peakBytes'] > max_peak_bytes:
+        regressions.append(
+            f'{name} allocates {result["peakBytes"]} bytes per op at peak, over {max_peak_bytes:.0f} '
+            f'({baseline["peakBytes"]} baseline + {args.memory_tolerance:.0%})'
+        )
+
+    return regressions
+
+
+def main():
+    # the usecases log every call, which would be measured along with the operation
+    logger.setLevel(logging.WARNING)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, mode='r') as baseline_file:
+            baseline = json.load(baseline_file).get('benchmarks', {})
+
+    benchmarks = {
+        name: operation for name, operation in build_benchmarks().items() if not args.filter or args.filter in name
+    }
+    results = {name: measure(operation, args.repeat) for name, operation in benchmarks.items()}
+
+    regressions = []
+    if not args.save_baseline:
+        for name, result in results.items():
+            if name in baseline:
+                regressions.extend(compare(name, result, baseline[name]))
+
+    if args.json:
+        report = {
+            'python': platform.python_version(),
+            'benchmarks': {
+                name: {**result, 'baselineOpsPerSec': baseline.get(name, {}).get('opsPerSec')}
+                for name, result in results.items()
+            },
+            'regressions': regressions,
+        }
+        print(json.dumps(report, indent=2))
+    else:
+        print(f'{"benchmark":<45} {"ops/sec":>12} {"baseline":>12} {"change":>8} {"noise":>7} {"peak KiB":>9}')
+        for name, result in results.items():
+            baseline_ops_per_sec = baseline.get(name, {}).get('opsPerSec')
+            baseline_speed = baseline.get(name, {}).get('relativeSpeed')
+            change = f'{result["relativeSpeed"] / baseline_speed - 1:+.1%}' if baseline_speed else '-'
+            print(
+                f'{name:<45} {result["opsPerSec"]:>12,.0f} {baseline_ops_per_sec or 0:>12,.0f} {change:>8} '
+                f'{result["relativeNoise"]:>7.1%} {result["peakBytes"] / 1024:>9.1f}'
+            )
+        for regression in regressions:
+            print(f'REGRESSION: {regression}')
+
+    if args.save_baseline:
+        # a filtered run only replaces the baselines of the benchmarks it ran
+        stored = {'python': platform.python_version(), 'benchmarks': {**baseline, **results}}
+        with open(args.baseline, mode='w') as baseline_file:
+            json.dump(stored, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write('\n')
+        print(f'Saved the baseline of {len(results)} benchmarks to {args.baseline}')
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parser = argparse.ArgumentParser(
+    description='Fold the counter shards of events back into the registration count of the event and the current '
+    'sales of its ticket types, and delete the shards'
+)
+parser.add_argument(
+    '--env-file', type=str, default=os.path.join(script_dir, '..', '.env'), help='Path to the .env file'
+)
+parser.add_argument('--event-id', type=str, help='Only fold the shards of this event, every event by default')
+parser.add_argument('--dry-run', action='store_true', help='Only log the counts that would be folded')
+args = parser.parse_args()
+load_dotenv(dotenv_path=args.env_file)
+
+
+from http import HTTPStatus
+from typing import Dict
+
+from aws.aws_clients import AWSClients
+from constants.common_constants import CommonConstants
+from model.counters.counter_shard import CounterShard
+from model.events.event import Event
+from model.ticket_types.ticket_types import TicketType
+from pynamodb.exceptions import TransactWriteError
+from pynamodb.transactions import TransactWrite
+from repository.counter_shards_repository import CounterShardsRepository
+from repository.events_repository import EventsRepository
+from repository.ticket_type_repository import TicketTypeRepository
+from utils.logger import logger
+
+
+def fold_counter(event_entry: Event, base_entry, counter_name: str, shard_counts: Dict[int, int]) -> int:
+    """Move the counts of the shards of a counter into its base count and delete the shards, in transactions
+
+    Each shard is deleted on the condition that its count is still the one that was read, so a shard incremented
+    meanwhile cancels its transaction and is left for the next run. Run it with COUNTER_SHARD_COUNT at 1, or when
+    the event is not being registered for, since the shard limits of a sharded counter are split from the base.
+
+    :param event_entry: The event of the counter
+    :type event_entry: Event
+
+    :param base_entry: The event or ticket type that holds the base count
+    :type base_entry: Union[Event, TicketType]
+
+    :param counter_name: The counter name
+    :type counter_name: str
+
+    :param shard_counts: The count of each shard index
+    :type shard_counts: Dict[int, int]
+
+    :return: The count that was folded
+    :rtype: int
+
+    """
+    base_attribute = Event.registrationCount if isinstance(base_entry, Event) else TicketType.currentSales
+    shard_items = sorted(shard_counts.items())
+    # one item of each transaction is the base count
+    chunk_size = CommonConstants.TRANSACT_WRITE_MAX_ITEMS - 1
+    folded = 0
+    for start in range(0, len(shard_items), chunk_size):
+        chunk = shard_items[start : start + chunk_size]
+        chunk_total = sum(count for _, count in chunk)
+        logger.info(
+            f'[{event_entry.eventId}] Folding {chunk_total} of {len(chunk)} {counter_name} shards into '
+            f'{base_attribute.attr_name} {base_entry.rangeKey}'
+        )
+        if args.dry_run:
+            folded += chunk_total
+            continue
+
+        try:
+            with TransactWrite(connection=AWSClients.get_connection()) as transaction:
+                transaction.update(base_entry, actions=[base_attribute.add(chunk_total)])
+                for shard_index, count in chunk:
+                    transaction.delete(
+                        CounterShard(
+                            hashKey=f'CounterShard#{event_entry.eventId}', rangeKey=f'{counter_name}#{shard_index}'
+                        ),
+                        condition=CounterShard.count == count,
+                    )
+
+        except TransactWriteError as e:
+            logger.error(f'[{event_entry.eventId}] Failed to fold {counter_name} shards, run it again: {str(e)}')
+            continue
+
+        folded += chunk_total
+
+    return folded
+
+
+def fold_event_shards(event_entry: Event) -> int:
+    """Fold every counter shard of an event
+
+    :param event_entry: The event
+    :type event_entry: Event
+
+    :return: The count that was folded
+    :rtype: int
+
+    """
+    counter_shards_repository = CounterShardsRepository()
+    shard_counts = counter_shards_repository.query_shard_counts(event_entry.eventId, use_cache=False)
+    if not shard_counts:
+        return 0
+
+    base_entries = {CounterShardsRepository.REGISTRATION_COUNT: event_entry}
+    status, ticket_types, message = TicketTypeRepository().query_ticket_types(event_id=event_entry.eventId)
+    if status == HTTPStatus.OK:
+        for ticket_type in ticket_types:
+            base_entries[CounterShardsRepository.ticket_type_sales_counter(ticket_type)] = ticket_type
+
+    folded = 0
+    for counter_name, counter_shard_counts in shard_counts.items():
+        base_entry = base_entries.get(counter_name)
+        if base_entry is None:
+            logger.error(f'[{event_entry.eventId}] No base count for the {counter_name} shards, skipping them')
+            continue
+
+        folded += fold_counter(event_entry, base_entry, counter_name, counter_shard_counts)
+
+    return folded
+
+
+def main():
+    events_repository = EventsRepository()
+    if args.event_id:
+        status, event_entry, message = events_repository.query_events(event_id=args.event_id, use_cache=False)
+        events = [event_entry] if status == HTTPStatus.OK else []
+    else:
+        status, events, message = events_repository.query_events(use_cache=False)
+
+    if status != HTTPStatus.OK:
+        logger.error(f'Failed to query events: {message}')
+        return
+
+    folded = 0
+    for event_entry in events:
+        folded += fold_event_shards(event_entry)
+
+    action = 'Would fold' if args.dry_run else 'Folded'
+    logger.info(f'{action} a count of {folded} from the counter shards of {len(events)} events')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,52 @@
+import argparse
 import csv
+import json
+import os
+import random
 import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from enum import Enum
-from typing import Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parser = argparse.ArgumentParser(
+    description='Import DevFest pre-registrations from a CSV file, resuming from the checkpoint of an earlier run'
+)
+parser.add_argument('--event-id', type=str, required=True, help='Event ID of the pre-registrations')
+parser.add_argument(
+    '--csv-file', type=str, default=os.path.join(script_dir, 'input.csv'), help='Path to the CSV file to import'
+)
+parser.add_argument(
+    '--env-file', type=str, default=os.path.join(script_dir, '..', '.env'), help='Path to the .env file'
+)
+parser.add_argument(
+    '--checkpoint-file', type=str, help='Path to the checkpoint file, defaults to the CSV file with .checkpoint.json'
+)
+parser.add_argument('--workers', type=int, default=4, help='Number of parallel batch writers')
+parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the first row')
+args = parser.parse_args()
+load_dotenv(dotenv_path=args.env_file)
+
 
 import pytz
 import ulid
 from constants.common_constants import EntryStatus
 from model.preregistrations.preregistration import PreRegistration, PreRegistrationIn
 from model.preregistrations.preregistrations_constants import AcceptanceStatus
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, ValidationError, validator
+from pynamodb.exceptions import PutError
+from utils.logger import logger
+
+# BatchWriteItem takes at most 25 items
+BATCH_SIZE = 25
+MAX_WRITE_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 0.2
+BACKOFF_MAX_SECONDS = 10.0
+PROGRESS_INTERVAL_SECONDS = 5.0
 
 
 class CareerStatus(str, Enum):
@@ -126,86 +163,321 @@ def separate_first_and_last_name(name: str) -> Tuple[str, str]:
     return first_name, last_name
 
 
-def import_pre_registration_from_csv(eventId: str, csv_file_path: str = 'input.csv') -> None:
-    """Import pre-registration data from a CSV file to a PreRegistration table.
+def get_column_indexes(headers: List[str]) -> Dict[str, int]:
+    """Resolve the position of the column of every DevFestPreRegistrationSchema field once, from its title.
+
+    :param headers: The header row of the CSV file.
+    :type headers: List[str]
+
+    :return: The column index of each field.
+    :rtype: Dict[str, int]
+    """
+    column_indexes = {}
+    for field_name, field in DevFestPreRegistrationSchema.__fields__.items():
+        column = field.field_info.title
+        if column not in headers:
+            raise ValueError(f'Column "{column}" is missing from the CSV file')
+
+        column_indexes[field_name] = headers.index(column)
+
+    return column_indexes
 
-    :param eventId: Event ID.
-    :type eventId: str
+
+def read_pre_registrations(
+    csv_file_path: str, start_row: int = 0
+) -> Iterator[Tuple[int, Optional[DevFestPreRegistrationSchema]]]:
+    """Stream the rows of a CSV file, validating each row only when it is read.
 
     :param csv_file_path: Path to the CSV file containing pre-registration data.
     :type csv_file_path: str
 
-    :return: None
-    :rtype: None
-    """
+    :param start_row: Number of data rows to skip, e.g. the rows done by an earlier run.
+    :type start_row: int
 
-    with open(csv_file_path, mode='r') as csv_file:
+    :return: The row number, counted from 1 after the header, and the row, or None if it is invalid.
+    :rtype: Iterator[Tuple[int, Optional[DevFestPreRegistrationSchema]]]
+    """
+    with open(csv_file_path, mode='r', newline='') as csv_file:
         csv_reader = csv.reader(csv_file)
-        headers = next(csv_reader)
-        pre_registration_data_rows: list[DevFestPreRegistrationSchema] = []
+        column_indexes = get_column_indexes(next(csv_reader))
+
+        for row_number, line in enumerate(csv_reader, start=1):
+            if row_number <= start_row:
+                continue
 
-        for line in csv_reader:
-            # Dictionary mapping of CSV columns to DevFestPreRegistrationSchema fields
             pre_registration_data = {
-                'timestamp': line[headers.index(DevFestColumns.TIMESTAMP)],
-                'email': line[headers.index(DevFestColumns.EMAIL)],
-                'name': line[headers.index(DevFestColumns.NAME)],
-                'phone_number': line[headers.index(DevFestColumns.PHONE_NUMBER)].strip(),
-                'career_status': line[headers.index(DevFestColumns.CAREER_STATUS)],
-                'developer_status': line[headers.index(DevFestColumns.DEVELOPER_STATUS)],
-                'job_title': line[headers.index(DevFestColumns.JOB_TITLE)],
-                'level_of_experience': line[headers.index(DevFestColumns.LEVEL_OF_EXPERIENCE)],
-                'company_affiliation': line[headers.index(DevFestColumns.COMPANY_AFFILIATION)],
-                'gender': line[headers.index(DevFestColumns.GENDER)],
-                'why_interested_in_devfest': line[headers.index(DevFestColumns.WHY_INTERESTED_IN_DEVFEST)],
-                'how_did_you_learn_about_devfest': line[headers.index(DevFestColumns.HOW_DID_YOU_LEARN_ABOUT_DEVFEST)],
-                'interest_in_joining_ai_workshop': bool(
-                    line[headers.index(DevFestColumns.INTEREST_IN_JOINING_AI_WORKSHOP)]
-                ),
-                'preferred_social_media': line[headers.index(DevFestColumns.PREFERRED_SOCIAL_MEDIA)],
-                'processing_of_personal_data': line[headers.index(DevFestColumns.PROCESSING_OF_PERSONAL_DATA)],
+                field_name: line[index] if index < len(line) else '' for field_name, index in column_indexes.items()
             }
+            pre_registration_data['phone_number'] = pre_registration_data['phone_number'].strip()
+            pre_registration_data['interest_in_joining_ai_workshop'] = bool(
+                pre_registration_data['interest_in_joining_ai_workshop']
+            )
+
+            try:
+                pre_registration = DevFestPreRegistrationSchema(**pre_registration_data)
+            except ValidationError as e:
+                logger.error(f'Row {row_number} is invalid and will be skipped: {e}')
+                pre_registration = None
+
+            yield row_number, pre_registration
+
+
+def query_existing_emails(event_id: str) -> Set[str]:
+    """Get the emails already pre-registered to an event, reading the keys of the EmailIndex page by page.
+
+    :param event_id: Event ID.
+    :type event_id: str
+
+    :return: The lowercase emails.
+    :rtype: Set[str]
+    """
+    return {
+        pre_registration.email.lower()
+        for pre_registration in PreRegistration.emailLSI.query(hash_key=event_id, attributes_to_get=['email'])
+        if pre_registration.email
+    }
+
+
+def build_pre_registration_entry(
+    event_id: str, pre_registration: DevFestPreRegistrationSchema, current_date: str
+) -> PreRegistration:
+    """Build the PreRegistration entry of a CSV row.
+
+    :param event_id: Event ID.
+    :type event_id: str
+
+    :param pre_registration: The validated CSV row.
+    :type pre_registration: DevFestPreRegistrationSchema
+
+    :param current_date: The create and update date of the entry.
+    :type current_date: str
+
+    :return: The entry to be written.
+    :rtype: PreRegistration
+    """
+    pre_registration_id = ulid.ulid()
+    first_name, last_name = separate_first_and_last_name(pre_registration.name)
+
+    preregistration_in = PreRegistrationIn(
+        email=pre_registration.email,
+        firstName=first_name,
+        lastName=last_name,
+        contactNumber=pre_registration.phone_number,
+        careerStatus=pre_registration.career_status,
+        yearsOfExperience=pre_registration.level_of_experience,
+        organization=pre_registration.company_affiliation,
+        title=pre_registration.job_title,
+        eventId=event_id,
+    )
+
+    return PreRegistration(
+        hashKey=event_id,
+        rangeKey=pre_registration_id,
+        createDate=current_date,
+        updateDate=current_date,
+        entryStatus=EntryStatus.ACTIVE.value,
+        preRegistrationId=pre_registration_id,
+        acceptanceStatus=AcceptanceStatus.ACCEPTED.value,
+        **preregistration_in.dict(),
+    )
+
+
+def write_batch(items: List[PreRegistration]) -> int:
+    """Write a batch of entries, backing off with jitter when the batch is throttled or left unprocessed.
+
+    The entries keep their IDs between attempts, so a batch that is written again only overwrites itself.
+
+    :param items: At most BATCH_SIZE entries.
+    :type items: List[PreRegistration]
+
+    :return: The number of entries written.
+    :rtype: int
+    """
+    for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+        try:
+            with PreRegistration.batch_write() as batch:
+                for item in items:
+                    batch.save(item)
 
-            pre_registration_data_rows.append(DevFestPreRegistrationSchema(**pre_registration_data))
-
-        with PreRegistration.batch_write() as batch:
-            current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
-            items = []
-
-            for pre_registration in pre_registration_data_rows:
-                pre_registration_id = ulid.ulid()
-                first_name, last_name = separate_first_and_last_name(pre_registration.name)
-
-                preregistration_in = PreRegistrationIn(
-                    email=pre_registration.email,
-                    firstName=first_name,
-                    lastName=last_name,
-                    contactNumber=pre_registration.phone_number,
-                    careerStatus=pre_registration.career_status,
-                    yearsOfExperience=pre_registration.level_of_experience,
-                    organization=pre_registration.company_affiliation,
-                    title=pre_registration.job_title,
-                    eventId=eventId,
-                )
-
-                items.append(
-                    PreRegistration(
-                        hashKey=eventId,
-                        rangeKey=pre_registration_id,
-                        createDate=current_date,
-                        updateDate=current_date,
-                        entryStatus=EntryStatus.ACTIVE.value,
-                        preRegistrationId=pre_registration_id,
-                        acceptanceStatus=AcceptanceStatus.ACCEPTED.value,
-                        **preregistration_in.dict(),
-                    )
-                )
-
-            for item in items:
-                batch.save(item)
+            return len(items)
+
+        except PutError as e:
+            if attempt == MAX_WRITE_ATTEMPTS:
+                raise
+
+            delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt))
+            logger.warning(f'Batch write failed on attempt {attempt}, retrying in {delay:.2f}s: {e}')
+            time.sleep(delay)
+
+
+def load_checkpoint(checkpoint_file_path: str, event_id: str, csv_file_path: str) -> int:
+    """Get the number of rows done by an earlier run of the same import.
+
+    :param checkpoint_file_path: Path to the checkpoint file.
+    :type checkpoint_file_path: str
+
+    :param event_id: Event ID.
+    :type event_id: str
+
+    :param csv_file_path: Path to the CSV file.
+    :type csv_file_path: str
+
+    :return: The number of data rows that are done, 0 if there is no checkpoint.
+    :rtype: int
+    """
+    if not os.path.exists(checkpoint_file_path):
+        return 0
+
+    with open(checkpoint_file_path, mode='r') as checkpoint_file:
+        checkpoint = json.load(checkpoint_file)
+
+    if checkpoint.get('eventId') != event_id or checkpoint.get('csvFile') != os.path.abspath(csv_file_path):
+        raise ValueError(
+            f'Checkpoint {checkpoint_file_path} belongs to another import, use --restart or another --checkpoint-file'
+        )
+
+    return checkpoint.get('rowsDone', 0)
+
+
+def save_checkpoint(checkpoint_file_path: str, event_id: str, csv_file_path: str, rows_done: int) -> None:
+    """Save the number of rows that are done, replacing the checkpoint file at once so it is never half written.
+
+    :param checkpoint_file_path: Path to the checkpoint file.
+    :type checkpoint_file_path: str
+
+    :param event_id: Event ID.
+    :type event_id: str
+
+    :param csv_file_path: Path to the CSV file.
+    :type csv_file_path: str
+
+    :param rows_done: The number of data rows, from the first, that are written or skipped.
+    :type rows_done: int
+    """
+    checkpoint = {
+        'eventId': event_id,
+        'csvFile': os.path.abspath(csv_file_path),
+        'rowsDone': rows_done,
+        'updateDate': datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat(),
+    }
+    temporary_file_path = f'{checkpoint_file_path}.tmp'
+    with open(temporary_file_path, mode='w') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+
+    os.replace(temporary_file_path, checkpoint_file_path)
+
+
+def import_pre_registration_from_csv(
+    eventId: str,
+    csv_file_path: str = 'input.csv',
+    checkpoint_file_path: Optional[str] = None,
+    workers: int = 4,
+    restart: bool = False,
+) -> None:
+    """Import pre-registration data from a CSV file to a PreRegistration table.
+
+    Rows are read and validated as they are needed and written in batches by parallel writers. Emails that are
+    already pre-registered to the event, or that come up again in the file, are skipped. The checkpoint holds
+    the number of rows up to which every row is done, so a re-run resumes there, and the rows that an earlier
+    run wrote past it are skipped as already pre-registered.
+
+    :param eventId: Event ID.
+    :type eventId: str
+
+    :param csv_file_path: Path to the CSV file containing pre-registration data.
+    :type csv_file_path: str
+
+    :param checkpoint_file_path: Path to the checkpoint file, defaults to the CSV file with .checkpoint.json.
+    :type checkpoint_file_path: Optional[str]
+
+    :param workers: Number of parallel batch writers.
+    :type workers: int
+
+    :param restart: Whether to ignore the checkpoint and start from the first row.
+    :type restart: bool
+
+    :return: None
+    :rtype: None
+    """
+    checkpoint_file_path = checkpoint_file_path or f'{csv_file_path}.checkpoint.json'
+    start_row = 0 if restart else load_checkpoint(checkpoint_file_path, eventId, csv_file_path)
+    if start_row:
+        logger.info(f'Resuming after row {start_row} from {checkpoint_file_path}')
+
+    seen_emails = query_existing_emails(eventId)
+    logger.info(f'Found {len(seen_emails)} pre-registrations of event {eventId}')
+
+    current_date = datetime.now(tz=pytz.timezone('Asia/Manila')).isoformat()
+    start_time = last_progress_time = time.monotonic()
+    rows_done = last_row = start_row
+    imported = duplicates = invalid = 0
+    # batches in the order they were read, with the last row each one covers
+    in_flight: List[Tuple[Future, int]] = []
+
+    def collect_done_batches() -> None:
+        # the checkpoint only moves past a batch once it and every batch before it are written
+        nonlocal rows_done, imported
+        try:
+            while in_flight and in_flight[0][0].done():
+                future, batch_last_row = in_flight[0]
+                imported += future.result()
+                in_flight.pop(0)
+                rows_done = batch_last_row
+        finally:
+            save_checkpoint(checkpoint_file_path, eventId, csv_file_path, rows_done)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        batch: List[PreRegistration] = []
+        for row_number, pre_registration in read_pre_registrations(csv_file_path, start_row=start_row):
+            last_row = row_number
+            if pre_registration is None:
+                invalid += 1
+            elif pre_registration.email.lower() in seen_emails:
+                duplicates += 1
+            else:
+                seen_emails.add(pre_registration.email.lower())
+                batch.append(build_pre_registration_entry(eventId, pre_registration, current_date))
+
+            if len(batch) < BATCH_SIZE:
+                continue
+
+            # at most two batches per writer are held in memory, the reader waits for the writers to catch up
+            while sum(not future.done() for future, _ in in_flight) >= workers * 2:
+                wait([future for future, _ in in_flight], return_when=FIRST_COMPLETED)
+
+            in_flight.append((executor.submit(write_batch, batch), last_row))
+            batch = []
+            collect_done_batches()
+
+            if time.monotonic() - last_progress_time >= PROGRESS_INTERVAL_SECONDS:
+                last_progress_time = time.monotonic()
+                rows_per_second = (last_row - start_row) / (last_progress_time - start_time)
+                logger.info(f'Read {last_row} rows, imported {imported}, {rows_per_second:.1f} rows/s')
+
+        in_flight.append((executor.submit(write_batch, batch), last_row))
+        wait([future for future, _ in in_flight])
+        collect_done_batches()
+
+    except Exception:
+        executor.shutdown(wait=True, cancel_futures=True)
+        logger.error(f'Import stopped, a re-run resumes after row {rows_done}')
+        raise
+
+    executor.shutdown()
+    elapsed = time.monotonic() - start_time
+    rows_per_second = (last_row - start_row) / elapsed if elapsed else 0
+    logger.info(
+        f'Imported {imported} pre-registrations, skipped {duplicates} duplicates and {invalid} invalid rows, '
+        f'read {last_row - start_row} rows in {elapsed:.1f}s ({rows_per_second:.1f} rows/s)'
+    )
 
 
 if __name__ == '__main__':
-    event_id = 'event_id'
-    csv_file_path = 'scripts/input.csv'
-    import_pre_registration_from_csv(eventId=event_id, csv_file_path=csv_file_path)
+    import_pre_registration_from_csv(
+        eventId=args.event_id,
+        csv_file_path=args.csv_file,
+        checkpoint_file_path=args.checkpoint_file,
+        workers=args.workers,
+        restart=args.restart,
+    )
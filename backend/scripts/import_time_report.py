@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from dotenv import dotenv_values
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(script_dir, '..')
+parser = argparse.ArgumentParser(
+    description='Report the import time of the Lambda entry point, per module, and check it against a budget'
+)
+parser.add_argument(
+    '--env-file', type=str, default=os.path.join(backend_dir, '.env'), help='Path to the .env file, if any'
+)
+parser.add_argument('--module', type=str, default='main', help='Module to import, e.g. main or functions.job_handling')
+parser.add_argument('--eager', action='store_true', help='Import every router at startup instead of lazily')
+parser.add_argument('--top', type=int, default=25, help='Number of slowest modules to list')
+parser.add_argument('--max-total-ms', type=float, help='Fail if the whole import takes longer than this')
+parser.add_argument(
+    '--budget',
+    action='append',
+    default=[],
+    metavar='MODULE=MS',
+    help='Fail if the cumulative import time of MODULE exceeds MS, can be repeated',
+)
+parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+args = parser.parse_args()
+
+
+def measure_imports(module: str, eager: bool) -> List[Tuple[str, int, int, int]]:
+    """Import a module in a fresh interpreter with -X importtime
+
+    :param module: The module to import
+    :type module: str
+
+    :param eager: Whether routers are imported at startup
+    :type eager: bool
+
+    :return: The (module, depth, self us, cumulative us) of every import, in the order they finished
+    :rtype: List[Tuple[str, int, int, int]]
+
+    """
+    env = {**os.environ, **{k: v for k, v in dotenv_values(args.env_file).items() if v is not None}}
+    env.setdefault('REGION', 'ap-southeast-1')
+    env['LAZY_ROUTERS'] = 'false' if eager else 'true'
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [backend_dir, env.get('PYTHONPATH')]))
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=backend_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f'Importing {module} failed:\n{result.stderr[-2000:]}')
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:') :].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+
+    return imports
+
+
+def main():
+    imports = measure_imports(args.module, args.eager)
+    cumulative_ms: Dict[str, float] = {name: cumulative / 1000 for name, _, _, cumulative in imports}
+    total_ms = sum(cumulative / 1000 for _, depth, _, cumulative in imports if depth == 0)
+    slowest = sorted(imports, key=lambda entry: entry[3], reverse=True)[: args.top]
+
+    failures = []
+    if args.max_total_ms is not None and total_ms > args.max_total_ms:
+        failures.append(f'total import time {total_ms:.1f} ms exceeds {args.max_total_ms:.1f} ms')
+
+    for budget in args.budget:
+        name, _, limit = budget.partition('=')
+        if name in cumulative_ms and cumulative_ms[name] > float(limit):
+            failures.append(f'{name} takes {cumulative_ms[name]:.1f} ms, over its budget of {float(limit):.1f} ms')
+
+    if args.json:
+        report = {
+            'module': args.module,
+            'mode': 'eager' if args.eager else 'lazy',
+            'totalMs': round(total_ms, 1),
+            'modules': [
+                {'name': name, 'selfMs': round(self_us / 1000, 1), 'cumulativeMs': round(cumulative_us / 1000, 1)}
+                for name, _, self_us, cumulative_us in slowest
+            ],
+            'failures': failures,
+        }
+        print(json.dumps(report, indent=2))
+    else:
+        print(f'Import of {args.module} ({"eager" if args.eager else "lazy"} routers): {total_ms:.1f} ms')
+        print(f'{"cumulative ms":>14} {"self ms":>9}  module')
+        for name, depth, self_us, cumulative_us in slowest:
+            print(f'{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}')
+        for failure in failures:
+            print(f'FAIL: {failure}')
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
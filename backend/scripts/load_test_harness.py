@@ -0,0 +1,539 @@
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(script_dir, '..')
+parser = argparse.ArgumentParser(
+    description='Run concurrent API scenarios in-process against mocked AWS resources and report the latency '
+    'percentiles and the DynamoDB calls of each scenario'
+)
+parser.add_argument('--registrations', type=int, default=10000, help='Number of registrations to seed')
+parser.add_argument('--requests', type=int, default=100, help='Number of requests per scenario')
+parser.add_argument(
+    '--export-requests', type=int, default=3, help='Number of CSV export requests, each reads every registration'
+)
+parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent clients')
+parser.add_argument('--scenarios', type=str, help='Comma-separated scenarios to run, all by default')
+parser.add_argument('--seed', type=int, default=7, help='Seed of the request order')
+parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+args = parser.parse_args()
+
+# every AWS call is answered by moto, so the settings only need to be consistent with each other
+REGION = 'ap-southeast-1'
+TABLE_NAMES = {
+    'entities': 'load-test-entities',
+    'events': 'load-test-events',
+    'registrations': 'load-test-registrations',
+    'preregistrations': 'load-test-preregistrations',
+    'evaluations': 'load-test-evaluations',
+}
+os.environ.update(
+    {
+        'REGION': REGION,
+        'AWS_DEFAULT_REGION': REGION,
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_SESSION_TOKEN': 'testing',
+        'ENTITIES_TABLE': TABLE_NAMES['entities'],
+        'EVENTS_TABLE': TABLE_NAMES['events'],
+        'REGISTRATIONS_TABLE': TABLE_NAMES['registrations'],
+        'PREREGISTRATIONS_TABLE': TABLE_NAMES['preregistrations'],
+        'EVALUATIONS_TABLE': TABLE_NAMES['evaluations'],
+        'S3_BUCKET': 'load-test-bucket',
+        'FRONTEND_URL': 'https://events.example.com',
+        'CURRENT_USER': 'load-test-admin',
+        'LAZY_ROUTERS': 'false',
+        # the metrics of every request would be written between the lines of the report
+        'PERFORMANCE_METRICS': 'false',
+        'TRACING_EXPORTER': 'none',
+    }
+)
+sys.path.insert(0, backend_dir)
+
+import boto3
+import yaml
+from botocore.handlers import BUILTIN_HANDLERS
+from moto.core.models import botocore_stubber
+
+try:
+    from moto import mock_aws
+
+    aws_mocks = [mock_aws()]
+except ImportError:
+    # moto 4 and older mock each service on its own
+    from moto import mock_dynamodb, mock_s3, mock_sqs
+
+    aws_mocks = [mock_dynamodb(), mock_s3(), mock_sqs()]
+
+for aws_mock in aws_mocks:
+    aws_mock.start()
+
+from fastapi.testclient import TestClient
+from model.evaluations.evaluations_constants import EvaluationQuestionType, QuestionType
+from model.events.event import EventIn
+from model.events.events_constants import EventStatus
+from model.payments.payments import PaymentTransactionIn, TransactionStatus
+from model.pycon_registrations.pycon_registration import PyconRegistration
+from model.registrations.registration import Registration
+from repository.events_repository import EventsRepository
+from repository.payment_transaction_repository import PaymentTransactionRepository
+from starlette.types import ASGIApp, Receive, Scope, Send
+from ulid import ulid
+from utils.logger import logger
+
+REQUEST_ID_HEADER = 'x-load-test-request-id'
+PERCENTILES = (50, 90, 95, 99)
+
+# the AWS calls of the request being served, see CallCountingMiddleware
+current_calls: ContextVar[Optional[Counter]] = ContextVar('current_calls', default=None)
+
+
+def count_aws_calls() -> None:
+    """Count every AWS call towards the request that makes it, and serialize the mocked calls.
+
+    The count is kept by a botocore handler, so it covers the boto3 clients and the PynamoDB connection alike, as
+    long as they are created after this. moto keeps its backends in plain dicts, so concurrent calls from the
+    worker threads are answered one at a time, and the latencies include the wait for the other requests in flight.
+    """
+
+    def count_call(model, **kwargs):
+        calls = current_calls.get()
+        if calls is not None:
+            calls[f'{model.service_model.service_name}:{model.name}'] += 1
+
+    BUILTIN_HANDLERS.append(('before-call', count_call))
+
+    stubber_class = type(botocore_stubber)
+    stubber_call = stubber_class.__call__
+    lock = threading.Lock()
+
+    def serialized_call(self, event_name, request, **kwargs):
+        with lock:
+            return stubber_call(self, event_name, request, **kwargs)
+
+    stubber_class.__call__ = serialized_call
+
+
+class CallCountingMiddleware:
+    """ASGI middleware that keeps the AWS calls of each request made with a load test request ID header."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.calls_by_request: Dict[str, Counter] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        headers = dict(scope.get('headers') or [])
+        request_id = headers.get(REQUEST_ID_HEADER.encode())
+        calls = Counter()
+        token = current_calls.set(calls)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_calls.reset(token)
+            if request_id:
+                self.calls_by_request[request_id.decode()] = calls
+
+
+class ResourcesLoader(yaml.SafeLoader):
+    """Loads the CloudFormation tags of resources/dynamodb.yml, every !If takes its true branch"""
+
+
+def construct_cloudformation_tag(loader: ResourcesLoader, tag_suffix: str, node: yaml.Node):
+    if isinstance(node, yaml.SequenceNode):
+        value = loader.construct_sequence(node, deep=True)
+        return value[1] if tag_suffix == 'If' else value
+
+    return loader.construct_scalar(node)
+
+
+ResourcesLoader.add_multi_constructor('!', construct_cloudformation_tag)
+
+
+def create_resources() -> None:
+    """Create the tables of resources/dynamodb.yml with all of their indexes, the queues and the bucket of the API"""
+    with open(os.path.join(backend_dir, 'resources', 'dynamodb.yml'), mode='r') as resources_file:
+        resources = yaml.load(resources_file, Loader=ResourcesLoader)['Resources']
+
+    dynamodb = boto3.client('dynamodb', region_name=REGION)
+    for resource in resources.values():
+        if resource['Type'] != 'AWS::DynamoDB::Table':
+            continue
+
+        properties = dict(resource['Properties'])
+        custom_name = properties.pop('TableName').removeprefix('${self:custom.').removesuffix('}')
+        dynamodb.create_table(TableName=TABLE_NAMES[custom_name], **properties)
+
+    # the email, certificate and payment messages carry a message group, the job messages do not
+    sqs = boto3.client('sqs', region_name=REGION)
+    for env_name in ('EMAIL_QUEUE', 'CERTIFICATE_QUEUE', 'PAYMENT_QUEUE'):
+        queue = sqs.create_queue(
+            QueueName=f'load-test-{env_name.lower()}.fifo',
+            Attributes={'FifoQueue': 'true', 'ContentBasedDeduplication': 'true'},
+        )
+        os.environ[env_name] = queue['QueueUrl']
+
+    os.environ['JOB_QUEUE'] = sqs.create_queue(QueueName='load-test-job_queue')['QueueUrl']
+
+    boto3.client('s3', region_name=REGION).create_bucket(
+        Bucket=os.environ['S3_BUCKET'], CreateBucketConfiguration={'LocationConstraint': REGION}
+    )
+
+
+class LoadTestData:
+    """The events and entries that the scenarios use, see seed_data"""
+
+    def __init__(self, open_event_id: str, completed_event_id: str, completed_registrations: List[Registration]):
+        self.open_event_id = open_event_id
+        self.completed_event_id = completed_event_id
+        self.completed_registrations = completed_registrations
+        self.payment_transaction_ids: List[str] = []
+
+
+def build_registration(event_id: str, index: int) -> Registration:
+    registration_id = ulid()
+    return Registration(
+        hashKey=event_id,
+        rangeKey=registration_id,
+        registrationId=registration_id,
+        entryStatus='ACTIVE',
+        createDate='2024-10-01T09:30:00.123456+08:00',
+        updateDate='2024-10-01T09:30:00.123456+08:00',
+        eventId=event_id,
+        email=f'attendee{index}@example.com',
+        firstName='Juan Miguel',
+        lastName=f'Dela Cruz {index}',
+        contactNumber='09171234567',
+        careerStatus='Working Professional',
+        yearsOfExperience='3-5 years',
+        organization='Davao Tech Collective',
+        title='Software Engineer',
+        shirtSize='M',
+        cityOfResidence='Davao City',
+        industry='Information Technology',
+        foodRestrictions='None',
+        certificateClaimed=False,
+        registrationEmailSent=True,
+    )
+
+
+def seed_data(registration_count: int, request_count: int) -> LoadTestData:
+    """Seed an open event with its registrations and pending payments, and a completed event to be evaluated
+
+    :param registration_count: Number of registrations of the open event
+    :type registration_count: int
+
+    :param request_count: Number of requests per scenario, each evaluation, claim and callback has its own entry
+    :type request_count: int
+
+    :return: The seeded data
+    :rtype: LoadTestData
+
+    """
+    events_repository = EventsRepository()
+    event_ids = []
+    for name, status, certificate_template in (
+        ('Load Test Open Event', EventStatus.OPEN, None),
+        ('Load Test Completed Event', EventStatus.COMPLETED, 'events/load-test/certificate.png'),
+    ):
+        _, event, message = events_repository.store_event(
+            EventIn(
+                name=name,
+                description='A synthetic event of the load test',
+                email='organizers@example.com',
+                startDate='2024-11-16T08:00:00+08:00',
+                endDate='2024-11-16T18:00:00+08:00',
+                venue='SMX Convention Center, Lanang, Davao City',
+                paidEvent=False,
+                isApprovalFlow=False,
+                isLimitedSlot=False,
+                hasMultipleTicketTypes=False,
+                certificateTemplate=certificate_template,
+                status=status,
+            )
+        )
+        if not event:
+            raise RuntimeError(f'Failed to seed {name}: {message}')
+
+        event_ids.append(event.eventId)
+
+    open_event_id, completed_event_id = event_ids
+    with Registration.batch_write() as batch:
+        for index in range(registration_count):
+            batch.save(build_registration(open_event_id, index))
+
+    # every evaluation and every certificate claim is for a registration of its own
+    completed_registrations = [build_registration(completed_event_id, index) for index in range(2 * request_count)]
+    with Registration.batch_write() as batch:
+        for registration in completed_registrations:
+            batch.save(registration)
+
+    data = LoadTestData(open_event_id, completed_event_id, completed_registrations)
+    payment_transaction_repository = PaymentTransactionRepository()
+    for index in range(request_count):
+        _, payment_transaction, message = payment_transaction_repository.store_payment_transaction(
+            PaymentTransactionIn(
+                price=0.0,
+                transactionStatus=TransactionStatus.PENDING,
+                eventId=open_event_id,
+                registrationData=PyconRegistration(
+                    firstName='Maria',
+                    lastName=f'Santos {index}',
+                    nickname='Mia',
+                    pronouns='she/her',
+                    email=f'payer{index}@example.com',
+                    eventId=open_event_id,
+                    contactNumber='09181234567',
+                    organization='Mindanao Python Users Group',
+                    jobTitle='Data Engineer',
+                    ticketType='coder',
+                    sprintDay=False,
+                    availTShirt=False,
+                    communityInvolvement=True,
+                    futureVolunteer=False,
+                    validIdObjectKey=f'pycon/{open_event_id}/valid-id/payer{index}.png',
+                ),
+            )
+        )
+        if not payment_transaction:
+            raise RuntimeError(f'Failed to seed payment transaction {index}: {message}')
+
+        data.payment_transaction_ids.append(payment_transaction.entryId)
+
+    return data
+
+
+def create_registration(client: TestClient, data: LoadTestData, index: int, headers: dict):
+    registration_in = {
+        'eventId': data.open_event_id,
+        'email': f'walk-in{index}@example.com',
+        'firstName': 'Ana',
+        'lastName': f'Reyes {index}',
+        'contactNumber': '09191234567',
+        'careerStatus': 'Student',
+        'organization': 'University of Mindanao',
+        'title': 'Student',
+    }
+    return client.post('/registrations', json=registration_in, headers=headers)
+
+
+def list_registrations(client: TestClient, data: LoadTestData, index: int, headers: dict):
+    return client.get('/registrations', params={'eventId': data.open_event_id, 'limit': 100}, headers=headers)
+
+
+def export_registrations_csv(client: TestClient, data: LoadTestData, index: int, headers: dict):
+    return client.get(f'/registrations/{data.open_event_id}/csv_download', headers=headers)
+
+
+def payment_callback(client: TestClient, data: LoadTestData, index: int, headers: dict):
+    params = {'paymentTransactionId': data.payment_transaction_ids[index], 'eventId': data.open_event_id}
+    return client.get('/payments/callback', params=params, headers=headers, follow_redirects=False)
+
+
+def submit_evaluation(client: TestClient, data: LoadTestData, index: int, headers: dict):
+    evaluation_list_in = {
+        'eventId': data.completed_event_id,
+        'registrationId': data.completed_registrations[index].registrationId,
+        'evaluationList': [
+            {
+                'question': EvaluationQuestionType.OVERALL_EXP.value,
+                'questionType': QuestionType.MULTIPLE_CHOICE.value,
+                'answerScale': index % 5 + 1,
+            },
+            {
+                'question': EvaluationQuestionType.EVENT_TIMING_CONVENIENT.value,
+                'questionType': QuestionType.BOOLEAN.value,
+                'booleanAnswer': index % 2 == 0,
+            },
+            {
+                'question': EvaluationQuestionType.OTHER_COMMENTS.value,
+                'questionType': QuestionType.TEXT.value,
+                'answer': 'Looking forward to the next one.',
+            },
+        ],
+    }
+    return client.post('/evaluations', json=evaluation_list_in, headers=headers)
+
+
+def claim_certificate(client: TestClient, data: LoadTestData, index: int, headers: dict):
+    registration = data.completed_registrations[args.requests + index]
+    return client.put(
+        f'/certificates/{data.completed_event_id}/claim', json={'email': registration.email}, headers=headers
+    )
+
+
+SCENARIOS: Dict[str, Callable] = {
+    'create_registration': create_registration,
+    'list_registrations': list_registrations,
+    'export_registrations_csv': export_registrations_csv,
+    'payment_callback': payment_callback,
+    'submit_evaluation': submit_evaluation,
+    'claim_certificate': claim_certificate,
+}
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(results: List[dict], calls_by_request: Dict[str, Counter]) -> dict:
+    """Summarize the latencies, statuses and AWS calls of the requests of one scenario
+
+    :param results: The request ID, latency and status of each request
+    :type results: List[dict]
+
+    :param calls_by_request: The AWS calls of each request ID
+    :type calls_by_request: Dict[str, Counter]
+
+    :return: The summary
+    :rtype: dict
+
+    """
+    latencies = sorted(result['latencyMs'] for result in results)
+    total_calls = Counter()
+    for result in results:
+        total_calls.update(calls_by_request.get(result['requestId'], Counter()))
+
+    return {
+        'requests': len(results),
+        'statusCounts': dict(sorted(Counter(str(result['status']) for result in results).items())),
+        **{f'p{percent}Ms': round(percentile(latencies, percent), 2) for percent in PERCENTILES},
+        'maxMs': round(latencies[-1], 2),
+        'meanMs': round(sum(latencies) / len(latencies), 2),
+        'awsCallsPerRequest': {
+            operation: round(count / len(results), 2) for operation, count in sorted(total_calls.items())
+        },
+        'dynamodbCallsPerRequest': round(
+            sum(count for operation, count in total_calls.items() if operation.startswith('dynamodb:')) / len(results),
+            2,
+        ),
+    }
+
+
+def run_scenarios(app: CallCountingMiddleware, data: LoadTestData, scenario_names: List[str]) -> dict:
+    """Run the requests of every scenario, shuffled together, on concurrent clients
+
+    :param app: The API, wrapped to count the AWS calls of each request
+    :type app: CallCountingMiddleware
+
+    :param data: The seeded data
+    :type data: LoadTestData
+
+    :param scenario_names: The scenarios to run
+    :type scenario_names: List[str]
+
+    :return: The summary of each scenario and the throughput of the run
+    :rtype: dict
+
+    """
+    tasks = []
+    for name in scenario_names:
+        request_count = args.export_requests if name == 'export_registrations_csv' else args.requests
+        tasks.extend((name, index) for index in range(request_count))
+    random.Random(args.seed).shuffle(tasks)
+
+    clients = []
+    clients_lock = threading.Lock()
+    local = threading.local()
+
+    def start_client():
+        local.client = TestClient(app, raise_server_exceptions=False)
+        local.client.__enter__()
+        with clients_lock:
+            clients.append(local.client)
+
+    def run_task(task):
+        name, index = task
+        request_id = str(uuid.uuid4())
+        start = time.perf_counter()
+        response = SCENARIOS[name](local.client, data, index, {REQUEST_ID_HEADER: request_id})
+        latency_ms = (time.perf_counter() - start) * 1000
+        return name, {'requestId': request_id, 'latencyMs': latency_ms, 'status': response.status_code}
+
+    results = defaultdict(list)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, initializer=start_client) as executor:
+        for name, result in executor.map(run_task, tasks):
+            results[name].append(result)
+    elapsed_seconds = time.perf_counter() - start
+
+    for client in clients:
+        client.__exit__(None, None, None)
+
+    return {
+        'requests': len(tasks),
+        'elapsedSeconds': round(elapsed_seconds, 2),
+        'requestsPerSecond': round(len(tasks) / elapsed_seconds, 1),
+        'scenarios': {name: summarize(results[name], app.calls_by_request) for name in scenario_names},
+    }
+
+
+def main():
+    # the usecases log every call, and a new email is logged as an error when its lookup finds no registration,
+    # which would flood the report and be measured along with the requests
+    logger.setLevel(logging.CRITICAL)
+
+    scenario_names = [name.strip() for name in args.scenarios.split(',')] if args.scenarios else list(SCENARIOS)
+    unknown_names = [name for name in scenario_names if name not in SCENARIOS]
+    if unknown_names:
+        parser.error(f'Unknown scenarios {", ".join(unknown_names)}, choose from {", ".join(SCENARIOS)}')
+
+    count_aws_calls()
+    create_resources()
+
+    seed_start = time.perf_counter()
+    data = seed_data(args.registrations, args.requests)
+    seed_seconds = time.perf_counter() - seed_start
+    if not args.json:
+        print(f'Seeded {args.registrations} registrations in {seed_seconds:.1f}s')
+
+    from main import app
+
+    report = {
+        'registrations': args.registrations,
+        'concurrency': args.concurrency,
+        **run_scenarios(CallCountingMiddleware(app), data, scenario_names),
+    }
+    for aws_mock in aws_mocks:
+        aws_mock.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f'{report["requests"]} requests on {args.concurrency} clients in {report["elapsedSeconds"]}s '
+        f'({report["requestsPerSecond"]} requests/s)'
+    )
+    print(
+        f'{"scenario":<26} {"reqs":>5} {"p50 ms":>8} {"p90 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8} '
+        f'{"ddb/req":>8}  statuses'
+    )
+    for name, summary in report['scenarios'].items():
+        statuses = ' '.join(f'{status}x{count}' for status, count in summary['statusCounts'].items())
+        print(
+            f'{name:<26} {summary["requests"]:>5} {summary["p50Ms"]:>8.1f} {summary["p90Ms"]:>8.1f} '
+            f'{summary["p95Ms"]:>8.1f} {summary["p99Ms"]:>8.1f} {summary["maxMs"]:>8.1f} '
+            f'{summary["dynamodbCallsPerRequest"]:>8.2f}  {statuses}'
+        )
+
+    print('\nAWS calls per request')
+    for name, summary in report['scenarios'].items():
+        calls = ', '.join(f'{operation} {count:g}' for operation, count in summary['awsCallsPerRequest'].items())
+        print(f'{name:<26} {calls}')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,8 @@ from datetime import datetime
 from http import HTTPStatus
 from typing import Tuple, Union
 
-from boto3 import client as boto3_client
+from aws.aws_clients import AWSClients
+from botocore.client import BaseClient
 from model.certificates.certificate import CertificateIn, CertificateOut
 from model.events.events_constants import EventStatus
 from model.registrations.registration import RegistrationPatch
@@ -13,14 +14,16 @@ from repository.registrations_repository import RegistrationsRepository
 from starlette.responses import JSONResponse
 from usecase.file_s3_usecase import FileS3Usecase
 from utils.logger import logger
+from utils.tracing import message_attributes, traced
 
 
+@traced
 class CertificateUsecase:
-    def __init__(self):
+    def __init__(self, sqs_client: BaseClient = None):
         self.__registrations_repository = RegistrationsRepository()
         self.__events_repository = EventsRepository()
         self.__file_s3_usecase = FileS3Usecase()
-        self.__sqs_client = boto3_client('sqs', region_name=os.getenv('REGION', 'ap-southeast-1'))
+        self.__sqs_client = sqs_client or AWSClients.get_client('sqs')
         self.__sqs_url = os.getenv('CERTIFICATE_QUEUE')
 
     def generate_certificates(self, event_id: str, registration_id: str = None) -> Tuple[HTTPStatus, str]:
@@ -53,6 +56,7 @@ class CertificateUsecase:
                 MessageBody=json.dumps(payload),
                 MessageDeduplicationId=message_dedup_id,
                 MessageGroupId=message_group_id,
+                MessageAttributes=message_attributes(),
             )
 
             message_id = response.get('MessageId')
@@ -0,0 +1,104 @@
+import csv
+import io
+from http import HTTPStatus
+from itertools import chain
+from typing import Iterable, Iterator, List, Type, Union
+
+from model.file_uploads.file_upload import FileDownloadOut
+from pynamodb.models import Model
+from starlette.responses import JSONResponse, StreamingResponse
+from usecase.file_s3_usecase import FileS3Usecase
+from utils.logger import logger
+from utils.tracing import traced
+
+
+@traced
+class CsvExportUsecase:
+    """
+    Handles exporting DynamoDB entries as CSV without materializing the whole result set.
+
+    Entries are consumed lazily from a PynamoDB result iterator, encoded into CSV chunks on the fly,
+    and either streamed to S3 with a multipart upload or streamed back to the client directly.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        self.__file_s3_usecase = FileS3Usecase()
+
+    def export_csv(
+        self, entries: Iterable[Model], model: Type[Model], object_key: str, stream: bool = False
+    ) -> Union[JSONResponse, StreamingResponse, FileDownloadOut]:
+        """Export entries as a CSV file.
+
+        :param entries: The entries to be exported, ideally a lazy PynamoDB result iterator.
+        :type entries: Iterable[Model]
+
+        :param model: The PynamoDB model of the entries, used to build the CSV header.
+        :type model: Type[Model]
+
+        :param object_key: The S3 object key of the CSV file.
+        :type object_key: str
+
+        :param stream: If True, stream the CSV back in the response instead of uploading it to S3.
+        :type stream: bool
+
+        :return: The download URL of the uploaded CSV, the streamed CSV, or a JSONResponse with an error message.
+        :rtype: Union[JSONResponse, StreamingResponse, FileDownloadOut]
+
+        """
+        entries = iter(entries)
+        try:
+            first_entry = next(entries)
+        except StopIteration:
+            return JSONResponse(status_code=HTTPStatus.NOT_FOUND, content={'message': 'No entries found'})
+        except Exception as e:
+            message = f'Failed to read entries for {object_key}: {str(e)}'
+            logger.error(message)
+            return JSONResponse(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, content={'message': message})
+
+        fieldnames = list(model.get_attributes().keys())
+        chunks = self.generate_csv(entries=chain([first_entry], entries), fieldnames=fieldnames)
+
+        if stream:
+            file_name = object_key.rsplit('/', 1)[-1]
+            return StreamingResponse(
+                chunks,
+                media_type='text/csv',
+                headers={'Content-Disposition': f'attachment; filename="{file_name}"'},
+            )
+
+        if not self.__file_s3_usecase.upload_stream(chunks=chunks, object_name=object_key, content_type='text/csv'):
+            return JSONResponse(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                content={'message': f'Failed to export CSV: {object_key}'},
+            )
+
+        return self.__file_s3_usecase.create_download_url(object_key)
+
+    def generate_csv(self, entries: Iterable[Model], fieldnames: List[str]) -> Iterator[bytes]:
+        """Encode entries into UTF-8 CSV chunks as they are read.
+
+        :param entries: The entries to be encoded.
+        :type entries: Iterable[Model]
+
+        :param fieldnames: The CSV header, attributes missing from an entry are left blank.
+        :type fieldnames: List[str]
+
+        :return: An iterator of CSV chunks of roughly CHUNK_SIZE bytes.
+        :rtype: Iterator[bytes]
+
+        """
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+
+        for entry in entries:
+            writer.writerow(entry.to_simple_dict())
+            if buffer.tell() >= self.CHUNK_SIZE:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
@@ -1,26 +1,44 @@
 import random
 import string
 from http import HTTPStatus
-from typing import List, Union
+from typing import Iterator, List, Union
 
 from model.discount.discount import (
+    Discount,
     DiscountDBIn,
     DiscountIn,
     DiscountOrganization,
     DiscountOut,
 )
+from model.discount.discount_constants import DiscountCodesFormat
 from repository.discount_repository import DiscountsRepository
 from repository.events_repository import EventsRepository
 from repository.registrations_repository import RegistrationsRepository
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, StreamingResponse
+from usecase.csv_export_usecase import CsvExportUsecase
+from utils.tracing import traced
 from utils.utils import Utils
 
 
+@traced
 class DiscountUsecase:
+    DISCOUNT_CODE_GENERATION_ATTEMPTS = 5
+    DISCOUNT_CODES_FIELDS = [
+        'entryId',
+        'discountPercentage',
+        'organizationId',
+        'eventId',
+        'isReusable',
+        'maxDiscountUses',
+        'remainingUses',
+        'createDate',
+    ]
+
     def __init__(self):
         self.__discounts_repository = DiscountsRepository()
         self.__events_repository = EventsRepository()
         self.__registrations_repository = RegistrationsRepository()
+        self.__csv_export_usecase = CsvExportUsecase()
 
     def get_discount(self, event_id: str, entry_id: str) -> DiscountOut:
         """Get a discount.
@@ -105,8 +123,10 @@ class DiscountUsecase:
             for organization_id, discount_out_list in discount_map.items()
         ]
 
-    def claim_discount(self, event_id: str, entry_id: str, registration_id: str):
-        """Claim a discount.
+    def get_claimable_discount(
+        self, event_id: str, entry_id: str, registration_id: str
+    ) -> Union[Discount, JSONResponse]:
+        """Get a discount that can still be claimed by a registration.
 
         :param event_id: The event ID.
         :type event_id: str
@@ -117,8 +137,8 @@ class DiscountUsecase:
         :param registration_id: The registration ID.
         :type registration_id: str
 
-        :return: DiscountOut object or JSONResponse in case of error.
-        :rtype: Union[DiscountOut, JSONResponse]
+        :return: Discount entry or JSONResponse if the discount does not exist or cannot be claimed.
+        :rtype: Union[Discount, JSONResponse]
 
         """
         status, discount_entry, message = self.__discounts_repository.query_discount_with_discount_id(
@@ -136,9 +156,6 @@ class DiscountUsecase:
                 content={'message': 'Discount already claimed'},
             )
 
-        discount_data = self.__convert_data_entry_to_dict(discount_entry)
-
-        # reusable discount code
         if discount_entry.isReusable:
             if (
                 discount_entry.maxDiscountUses is not None
@@ -150,6 +167,40 @@ class DiscountUsecase:
                     content={'message': 'Discount has no remaining uses'},
                 )
 
+        elif discount_entry.claimed:
+            return JSONResponse(
+                status_code=HTTPStatus.BAD_REQUEST,
+                content={'message': 'Discount already claimed'},
+            )
+
+        return discount_entry
+
+    def claim_discount(self, event_id: str, entry_id: str, registration_id: str):
+        """Claim a discount.
+
+        :param event_id: The event ID.
+        :type event_id: str
+
+        :param entry_id: The entry ID.
+        :type entry_id: str
+
+        :param registration_id: The registration ID.
+        :type registration_id: str
+
+        :return: DiscountOut object or JSONResponse in case of error.
+        :rtype: Union[DiscountOut, JSONResponse]
+
+        """
+        discount_entry = self.get_claimable_discount(
+            event_id=event_id, entry_id=entry_id, registration_id=registration_id
+        )
+        if isinstance(discount_entry, JSONResponse):
+            return discount_entry
+
+        discount_data = self.__convert_data_entry_to_dict(discount_entry)
+
+        # reusable discount code
+        if discount_entry.isReusable:
             status, updated_discount, message = self.__discounts_repository.append_claim_discount(
                 discount_entry=discount_entry, append_count=1
             )
@@ -168,12 +219,6 @@ class DiscountUsecase:
 
         # for single-use discount code
         else:
-            if discount_entry.claimed:
-                return JSONResponse(
-                    status_code=HTTPStatus.BAD_REQUEST,
-                    content={'message': 'Discount already claimed'},
-                )
-
             discount_data.update(claimed=True)
             discount_data.update(registrationId=registration_id)
 
@@ -189,21 +234,28 @@ class DiscountUsecase:
         discount_data = self.__convert_data_entry_to_dict(discount)
         return DiscountOut(**discount_data)
 
-    def create_discounts(self, discount_in: DiscountIn) -> Union[JSONResponse, List[DiscountOut]]:
+    def create_discounts(
+        self, discount_in: DiscountIn, output_format: DiscountCodesFormat = None
+    ) -> Union[JSONResponse, StreamingResponse, List[DiscountOut]]:
         """Create discounts.
 
+        Single-use codes are generated without collisions, both within the batch and against the existing codes
+        of the event, and are stored with batched writes.
+
         :param discount_in: DiscountIn object containing the new discount data.
         :type discount_in: DiscountIn
 
-        :return: List of DiscountOut objects or JSONResponse in case of error.
-        :rtype: Union[JSONResponse, List[DiscountOut]]
+        :param output_format: If set, the discounts are streamed back as a CSV or JSON download.
+        :type output_format: DiscountCodesFormat
+
+        :return: List of DiscountOut objects, the streamed download, or JSONResponse in case of error.
+        :rtype: Union[JSONResponse, StreamingResponse, List[DiscountOut]]
 
         """
         status, *_ = self.__events_repository.query_events(discount_in.eventId)
         if status != HTTPStatus.OK:
             return JSONResponse(status_code=status, content={'message': 'Event does not exist'})
 
-        discount_list = []
         organization_id = Utils.convert_to_slug(discount_in.organizationName)
 
         if discount_in.isReusable:
@@ -222,30 +274,119 @@ class DiscountUsecase:
             if status != HTTPStatus.OK:
                 return JSONResponse(status_code=status, content={'message': message})
 
-            discount_data = self.__convert_data_entry_to_dict(discount)
-            discount_out = DiscountOut(**discount_data)
-            discount_list.append(discount_out)
+            discounts = [discount]
 
         else:
-            for _ in range(discount_in.quantity):
-                discount_db_in = DiscountDBIn(
+            if not discount_in.quantity or discount_in.quantity < 1:
+                return JSONResponse(
+                    status_code=HTTPStatus.BAD_REQUEST,
+                    content={'message': 'Quantity is required for single-use discounts'},
+                )
+
+            discount_codes = self.__generate_unique_discount_codes(
+                event_id=discount_in.eventId, quantity=discount_in.quantity
+            )
+            if isinstance(discount_codes, JSONResponse):
+                return discount_codes
+
+            discounts_db_in = [
+                DiscountDBIn(
                     organizationId=organization_id,
                     eventId=discount_in.eventId,
                     claimed=False,
                     registrationId=None,
                     discountPercentage=discount_in.discountPercentage,
-                    entryId=self.__generate_discount_code(),
+                    entryId=discount_code,
                     isReusable=False,
                 )
-                status, discount, message = self.__discounts_repository.store_discount(discount_in=discount_db_in)
-                if status != HTTPStatus.OK:
-                    return JSONResponse(status_code=status, content={'message': message})
+                for discount_code in discount_codes
+            ]
+            status, discounts, message = self.__discounts_repository.store_discounts(discounts_in=discounts_db_in)
+            if status != HTTPStatus.OK:
+                return JSONResponse(status_code=status, content={'message': message})
+
+        if output_format:
+            file_name = f'discounts-{discount_in.eventId}-{organization_id}.{output_format.value}'
+            return self.__stream_discounts(discounts=discounts, output_format=output_format, file_name=file_name)
+
+        return [DiscountOut(**self.__convert_data_entry_to_dict(discount)) for discount in discounts]
+
+    def __generate_unique_discount_codes(self, event_id: str, quantity: int) -> Union[List[str], JSONResponse]:
+        """Generate discount codes that are unique within the batch and not yet used by the event.
+
+        Only newly generated codes are checked against the existing codes, and codes that are taken are replaced
+        until there are enough or DISCOUNT_CODE_GENERATION_ATTEMPTS rounds have passed.
+
+        :param event_id: The event ID.
+        :type event_id: str
 
-                discount_data = self.__convert_data_entry_to_dict(discount)
-                discount_out = DiscountOut(**discount_data)
-                discount_list.append(discount_out)
+        :param quantity: The number of codes to generate.
+        :type quantity: int
+
+        :return: The discount codes, or JSONResponse in case of error.
+        :rtype: Union[List[str], JSONResponse]
+
+        """
+        discount_codes = set()
+        for _ in range(self.DISCOUNT_CODE_GENERATION_ATTEMPTS):
+            new_codes = set()
+            while len(discount_codes) + len(new_codes) < quantity:
+                discount_code = self.__generate_discount_code()
+                if discount_code not in discount_codes:
+                    new_codes.add(discount_code)
+
+            status, existing_codes, message = self.__discounts_repository.query_existing_discount_ids(
+                event_id=event_id, discount_ids=new_codes
+            )
+            if status != HTTPStatus.OK:
+                return JSONResponse(status_code=status, content={'message': message})
+
+            discount_codes |= new_codes - existing_codes
+            if len(discount_codes) == quantity:
+                return sorted(discount_codes)
+
+        return JSONResponse(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            content={'message': 'Failed to generate unique discount codes'},
+        )
+
+    def __stream_discounts(
+        self, discounts: List[Discount], output_format: DiscountCodesFormat, file_name: str
+    ) -> StreamingResponse:
+        """Stream discounts back as a CSV or JSON download.
+
+        :param discounts: The discounts to stream.
+        :type discounts: List[Discount]
+
+        :param output_format: The format of the download.
+        :type output_format: DiscountCodesFormat
+
+        :param file_name: The file name of the download.
+        :type file_name: str
+
+        :return: The streamed download.
+        :rtype: StreamingResponse
+
+        """
+        if output_format == DiscountCodesFormat.CSV:
+            chunks = self.__csv_export_usecase.generate_csv(entries=discounts, fieldnames=self.DISCOUNT_CODES_FIELDS)
+            media_type = 'text/csv'
+        else:
+            chunks = self.__generate_json(discounts)
+            media_type = 'application/json'
+
+        return StreamingResponse(
+            chunks,
+            media_type=media_type,
+            headers={'Content-Disposition': f'attachment; filename="{file_name}"'},
+        )
 
-        return discount_list
+    def __generate_json(self, discounts: List[Discount]) -> Iterator[bytes]:
+        yield b'['
+        for index, discount in enumerate(discounts):
+            discount_out = DiscountOut(**self.__convert_data_entry_to_dict(discount))
+            yield (',' if index else '').encode('utf-8') + discount_out.json().encode('utf-8')
+        yield b']'
 
     def __generate_discount_code(self, length=8):
         """Generate a discount code.
@@ -1,24 +1,44 @@
+import hashlib
 import json
 import os
+import time
 from datetime import datetime, timezone
 from http import HTTPStatus
-from typing import List, Tuple
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
 
 import ulid
-from boto3 import client as boto3_client
-from constants.common_constants import EmailType, SpecialEmails, SpecialSenders
-from model.email.email import EmailIn
+from aws.aws_clients import AWSClients
+from botocore.client import BaseClient
+from botocore.exceptions import BotoCoreError, ClientError
+from constants.common_constants import (
+    CommonConstants,
+    EmailType,
+    SpecialEmails,
+    SpecialSenders,
+)
+from model.email.email import EmailIn, EmailRecipient, EmailTemplateIn
 from model.events.event import Event
 from model.preregistrations.preregistration import PreRegistration, PreRegistrationPatch
 from model.preregistrations.preregistrations_constants import AcceptanceStatus
 from model.registrations.registration import Registration
 from repository.preregistrations_repository import PreRegistrationsRepository
 from utils.logger import logger
+from utils.tracing import TRACE_ATTRIBUTE_MAX_BYTES, message_attributes, traced
 
 
+@traced
 class EmailUsecase:
-    def __init__(self) -> None:
-        self.__sqs_client = boto3_client('sqs', region_name=os.getenv('REGION', 'ap-southeast-1'))
+    # SQS limits a single message, and the sum of the messages of one send_message_batch call, to 256 KiB,
+    # message attributes included, so a message body leaves room for the trace context
+    MAX_MESSAGE_BYTES = 256 * 1024 - TRACE_ATTRIBUTE_MAX_BYTES
+    MAX_BATCH_BYTES = 256 * 1024
+    MAX_BATCH_ENTRIES = 10
+    MAX_SEND_ATTEMPTS = 3
+    RETRY_BACKOFF_SECONDS = 0.2
+
+    def __init__(self, sqs_client: BaseClient = None) -> None:
+        self.__sqs_client = sqs_client or AWSClients.get_client('sqs')
         self.__sqs_url = os.getenv('EMAIL_QUEUE')
         self.__preregistration_repository = PreRegistrationsRepository()
         self.__sender_name_map = {
@@ -27,40 +47,254 @@ class EmailUsecase:
             SpecialEmails.GDG_DAVAO.value: SpecialSenders.GDG_DAVAO.value,
         }
         self.__event_email = None
+        self.__use_template_messages = os.getenv('EMAIL_TEMPLATE_MESSAGES', 'false').lower() == 'true'
 
-    def __send_email_handler(self, email_in_list: List[EmailIn], event: Event) -> Tuple[HTTPStatus, str]:
-        """Send an email to the queue
+    def __send_email_handler(
+        self, email_in_list: List[EmailIn], event: Event, deduplication_keys: Dict[str, str] = None
+    ) -> Dict[str, bool]:
+        """Send emails to the queue
+
+        The emails are packed into messages of at most MAX_MESSAGE_BYTES, each holding a JSON list of emails.
 
         :param email_in_list: The email list to be sent
-        :type Event: EmailIn
+        :type email_in_list: List[EmailIn]
 
         :param event: The event to be sent
         :type event: Event
 
-        :return: The status and message
-        :rtype: Tuple[HTTPStatus, str]
+        :param deduplication_keys: The key of each recipient that the deduplication ID of its message is built from
+        :type deduplication_keys: Dict[str, str]
+
+        :return: Whether the email of each recipient was enqueued
+        :rtype: Dict[str, bool]
+
+        """
+        if not email_in_list:
+            return {}
+
+        payloads = [(email_in.to or [], json.dumps(email_in.dict())) for email_in in email_in_list]
+        messages = self.__pack_payloads(payloads=payloads, prefix='[', suffix=']')
+        return self.__enqueue_messages(
+            messages=messages,
+            event_id=email_in_list[0].eventId,
+            event=event,
+            deduplication_keys=deduplication_keys,
+        )
+
+    def __send_template_handler(
+        self, email_template_in: EmailTemplateIn, event: Event, deduplication_keys: Dict[str, str] = None
+    ) -> Dict[str, bool]:
+        """Send a template email to the queue
+
+        The shared content is sent once per message, followed by as many recipients as fit in MAX_MESSAGE_BYTES.
+        Until the email consumer reads this format, EMAIL_TEMPLATE_MESSAGES is left off and the template is
+        expanded into the JSON list format instead.
+
+        :param email_template_in: The template email to be sent
+        :type email_template_in: EmailTemplateIn
+
+        :param event: The event to be sent
+        :type event: Event
+
+        :param deduplication_keys: The key of each recipient that the deduplication ID of its message is built from
+        :type deduplication_keys: Dict[str, str]
+
+        :return: Whether the email of each recipient was enqueued
+        :rtype: Dict[str, bool]
+
+        """
+        if not self.__use_template_messages:
+            return self.__send_email_handler(
+                email_in_list=email_template_in.to_email_in_list(), event=event, deduplication_keys=deduplication_keys
+            )
+
+        if not email_template_in.recipients:
+            return {}
+
+        empty_message = json.dumps({'template': email_template_in.dict(exclude={'recipients'}), 'recipients': []})
+        payloads = [(recipient.to, json.dumps(recipient.dict())) for recipient in email_template_in.recipients]
+        messages = self.__pack_payloads(payloads=payloads, prefix=empty_message[:-2], suffix=empty_message[-2:])
+        return self.__enqueue_messages(
+            messages=messages,
+            event_id=email_template_in.eventId,
+            event=event,
+            deduplication_keys=deduplication_keys,
+        )
+
+    def __pack_payloads(
+        self, payloads: List[Tuple[List[str], str]], prefix: str, suffix: str
+    ) -> Iterator[Tuple[List[str], str]]:
+        """Pack serialized payloads into a JSON list of at most MAX_MESSAGE_BYTES per message
+
+        :param payloads: The recipients and the serialized JSON of each payload
+        :type payloads: List[Tuple[List[str], str]]
+
+        :param prefix: The message content before the list items, ending with the opening bracket
+        :type prefix: str
+
+        :param suffix: The message content after the list items, starting with the closing bracket
+        :type suffix: str
+
+        :return: The recipients of each message and its body, the body is None if a single payload is over the limit
+        :rtype: Iterator[Tuple[List[str], str]]
+
+        """
+        separator = ', '
+        base_size = len(prefix.encode('utf-8')) + len(suffix.encode('utf-8'))
+        recipients, items, message_size = [], [], base_size
+        for payload_recipients, payload in payloads:
+            payload_size = len(payload.encode('utf-8'))
+            if base_size + payload_size > self.MAX_MESSAGE_BYTES:
+                yield payload_recipients, None
+                continue
+
+            added_size = payload_size + (len(separator) if items else 0)
+            if items and message_size + added_size > self.MAX_MESSAGE_BYTES:
+                yield recipients, f'{prefix}{separator.join(items)}{suffix}'
+                recipients, items, message_size = [], [], base_size
+                added_size = payload_size
+
+            recipients.extend(payload_recipients)
+            items.append(payload)
+            message_size += added_size
+
+        if items:
+            yield recipients, f'{prefix}{separator.join(items)}{suffix}'
+
+    def __enqueue_messages(
+        self,
+        messages: Iterable[Tuple[List[str], str]],
+        event_id: str,
+        event: Event,
+        deduplication_keys: Dict[str, str] = None,
+    ) -> Dict[str, bool]:
+        """Send message bodies to the queue with send_message_batch
+
+        With deduplication keys, e.g. the pre-registration IDs of the recipients, the deduplication ID of a message
+        is built from the keys of its recipients, so the queue drops a message sent again for the same recipients
+        within its deduplication interval. Otherwise every message gets a unique deduplication ID.
+
+        :param messages: The recipients of each message and its body
+        :type messages: Iterable[Tuple[List[str], str]]
+
+        :param event_id: The ID of the event the emails belong to
+        :type event_id: str
+
+        :param event: The event to be sent
+        :type event: Event
+
+        :param deduplication_keys: The key of each recipient, by lowercase email address
+        :type deduplication_keys: Dict[str, str]
+
+        :return: Whether the email of each recipient was enqueued
+        :rtype: Dict[str, bool]
 
         """
 
         # Check if event has konfhub and exclude it from the Email Service
         if self.__event_email and event.konfhubId and event.konfhubApiKey:
             logger.info(f'Skipping sending email to {self.__event_email} because it is a special email')
-            return
+            return {}
 
         timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
-        payload = [email_in.dict() for email_in in email_in_list]
-        event_id = email_in_list[0].eventId
-        message_id = ulid.ulid()
-
-        response = self.__sqs_client.send_message(
-            QueueUrl=self.__sqs_url,
-            MessageBody=json.dumps(payload),
-            MessageDeduplicationId=f'durianpy-event-{event_id}-{timestamp}-{message_id}',
-            MessageGroupId=f'durianpy-event-{event_id}',
-        )
-        message_id = response.get('MessageId')
-        message = f'Queue message success: {message_id}'
-        logger.info(message)
+        enqueue_status = {}
+        entries = []
+        trace_attributes = message_attributes()
+
+        for recipients, message_body in messages:
+            if message_body is None:
+                logger.error(f'Email to {recipients} exceeds the SQS message size limit and was not queued')
+                enqueue_status.update({recipient: False for recipient in recipients})
+                continue
+
+            if deduplication_keys:
+                keys = sorted(deduplication_keys.get(recipient.lower(), recipient.lower()) for recipient in recipients)
+                # a message can hold many recipients, and the ID is limited to 128 characters
+                digest = hashlib.sha256('|'.join([event_id, *keys]).encode('utf-8')).hexdigest()
+                deduplication_id = f'durianpy-event-{digest}'
+            else:
+                deduplication_id = f'durianpy-event-{event_id}-{timestamp}-{ulid.ulid()}'
+
+            entries.append(
+                {
+                    'Id': str(len(entries)),
+                    'MessageBody': message_body,
+                    'MessageDeduplicationId': deduplication_id,
+                    'MessageGroupId': f'durianpy-event-{event_id}',
+                    'MessageAttributes': trace_attributes,
+                    'recipients': recipients,
+                }
+            )
+
+        for batch in self.__batch_entries(entries):
+            failed_entry_ids = self.__send_message_batch(batch)
+            for entry in batch:
+                is_enqueued = entry['Id'] not in failed_entry_ids
+                enqueue_status.update({recipient: is_enqueued for recipient in entry['recipients']})
+
+        return enqueue_status
+
+    def __batch_entries(self, entries: List[dict]) -> Iterator[List[dict]]:
+        """Group message entries into send_message_batch calls
+
+        :param entries: The message entries to be grouped
+        :type entries: List[dict]
+
+        :return: Batches of at most MAX_BATCH_ENTRIES entries and MAX_BATCH_BYTES bytes
+        :rtype: Iterator[List[dict]]
+
+        """
+        batch, batch_size = [], 0
+        for entry in entries:
+            entry_size = len(entry['MessageBody'].encode('utf-8')) + TRACE_ATTRIBUTE_MAX_BYTES
+            if batch and (len(batch) == self.MAX_BATCH_ENTRIES or batch_size + entry_size > self.MAX_BATCH_BYTES):
+                yield batch
+                batch, batch_size = [], 0
+
+            batch.append(entry)
+            batch_size += entry_size
+
+        if batch:
+            yield batch
+
+    def __send_message_batch(self, batch: List[dict]) -> set:
+        """Send a batch of messages to the queue, retrying the entries that failed
+
+        :param batch: The message entries to be sent
+        :type batch: List[dict]
+
+        :return: The IDs of the entries that could not be sent
+        :rtype: set
+
+        """
+        pending = {entry['Id']: entry for entry in batch}
+        for attempt in range(self.MAX_SEND_ATTEMPTS):
+            if attempt:
+                time.sleep(self.RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+            request_entries = [
+                {key: value for key, value in entry.items() if key != 'recipients'} for entry in pending.values()
+            ]
+            try:
+                response = self.__sqs_client.send_message_batch(QueueUrl=self.__sqs_url, Entries=request_entries)
+            except (BotoCoreError, ClientError) as e:
+                logger.error(f'Failed to send email message batch (attempt {attempt + 1}): {str(e)}')
+                continue
+
+            for successful in response.get('Successful', []):
+                logger.info(f'Queue message success: {successful.get("MessageId")}')
+                pending.pop(successful['Id'], None)
+
+            sender_faults = []
+            for failed in response.get('Failed', []):
+                logger.error(f'Failed to queue email message {failed["Id"]}: {failed.get("Message")}')
+                if failed.get('SenderFault'):
+                    sender_faults.append(failed['Id'])
+
+            if not pending or len(sender_faults) == len(pending):
+                break
+
+        return set(pending)
 
     def send_batch_email(self, email_in_list: List[EmailIn], event: Event) -> Tuple[HTTPStatus, str]:
         """Send an email to the queue
@@ -75,17 +309,91 @@ class EmailUsecase:
         :rtype: Tuple[HTTPStatus, str]
 
         """
-        message = None
+        status, _, message = self.enqueue_emails(email_in_list=email_in_list, event=event)
+        return status, message
+
+    def send_template_email(self, email_template_in: EmailTemplateIn, event: Event) -> Tuple[HTTPStatus, str]:
+        """Send a template email to the queue
+
+        :param email_template_in: The template email to be sent
+        :type email_template_in: EmailTemplateIn
+
+        :param event: The event to be sent
+        :type event: Event
+
+        :return: The status and message
+        :rtype: Tuple[HTTPStatus, str]
+
+        """
+        status, _, message = self.enqueue_template_email(email_template_in=email_template_in, event=event)
+        return status, message
+
+    def enqueue_emails(self, email_in_list: List[EmailIn], event: Event) -> Tuple[HTTPStatus, Dict[str, bool], str]:
+        """Send emails to the queue and report which recipients were enqueued
+
+        :param email_in_list: The email list to be sent
+        :type email_in_list: List[EmailIn]
+
+        :param event: The event to be sent
+        :type event: Event
+
+        :return: The status, whether the email of each recipient was enqueued, and a message
+        :rtype: Tuple[HTTPStatus, Dict[str, bool], str]
+
+        """
+        return self.__report_enqueue_status(self.__send_email_handler, email_in_list=email_in_list, event=event)
+
+    def enqueue_template_email(
+        self, email_template_in: EmailTemplateIn, event: Event, deduplication_keys: Dict[str, str] = None
+    ) -> Tuple[HTTPStatus, Dict[str, bool], str]:
+        """Send a template email to the queue and report which recipients were enqueued
+
+        :param email_template_in: The template email to be sent
+        :type email_template_in: EmailTemplateIn
+
+        :param event: The event to be sent
+        :type event: Event
+
+        :param deduplication_keys: The key of each recipient, by lowercase email address, that the deduplication
+            ID of its message is built from, so that sending it again does not email the recipient twice
+        :type deduplication_keys: Dict[str, str]
+
+        :return: The status, whether the email of each recipient was enqueued, and a message
+        :rtype: Tuple[HTTPStatus, Dict[str, bool], str]
+
+        """
+        return self.__report_enqueue_status(
+            self.__send_template_handler,
+            email_template_in=email_template_in,
+            event=event,
+            deduplication_keys=deduplication_keys,
+        )
+
+    def __report_enqueue_status(self, send_handler: Callable, **kwargs) -> Tuple[HTTPStatus, Dict[str, bool], str]:
+        """Run a send handler and turn the enqueue status of its recipients into a response
+
+        :param send_handler: The handler that sends the emails
+        :type send_handler: Callable
+
+        :return: The status, whether the email of each recipient was enqueued, and a message
+        :rtype: Tuple[HTTPStatus, Dict[str, bool], str]
+
+        """
         try:
-            self.__send_email_handler(email_in_list=email_in_list, event=event)
+            enqueue_status = send_handler(**kwargs)
 
         except Exception as e:
             message = f'Failed to send email: {str(e)}'
             logger.error(message)
-            return HTTPStatus.INTERNAL_SERVER_ERROR, message
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {}, message
+
+        failed_recipients = [recipient for recipient, is_enqueued in enqueue_status.items() if not is_enqueued]
+        if failed_recipients:
+            message = f'Failed to send email to {len(failed_recipients)} recipient(s): {", ".join(failed_recipients)}'
+            logger.error(message)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, enqueue_status, message
 
-        else:
-            return HTTPStatus.OK, message
+        return HTTPStatus.OK, enqueue_status, None
 
     def send_email(self, email_in: EmailIn, event: Event) -> Tuple[HTTPStatus, str]:
         """Send an email to the queue
@@ -181,40 +489,163 @@ class EmailUsecase:
         return self.send_email(email_in=email_in, event=event)
 
     def send_accept_reject_status_email(
-        self, preregistrations: List[PreRegistration], event: Event
+        self,
+        preregistrations: Iterable[PreRegistration],
+        event: Event,
+        checkpoint_ids: List[str] = None,
+        save_checkpoint: Callable[[List[str]], Tuple[HTTPStatus, str]] = None,
     ) -> Tuple[HTTPStatus, str]:
         """Send an email to the queue. If the preregistration is accepted, send an acceptance email. If the preregistration is rejected, send a rejection email.
 
+        Preregistrations are handled in batches. Each batch is first marked as sent with a conditional bulk update,
+        which acts as the checkpoint, and only the preregistrations this call marked are emailed. Recipients that
+        could not be enqueued are unmarked so that a retry picks them up, and nobody is emailed twice.
+
+        A run can stop between marking a batch and queueing it, so the IDs of each batch are passed to
+        save_checkpoint before it is marked, and cleared once it is queued. The checkpoint IDs of a stopped run
+        that are marked as sent are queued again first, with deduplication IDs built from the preregistration IDs
+        so that the queue drops the emails the stopped run did queue.
+
         :param preregistrations: The preregistrations to be sent
-        :type preregistrations: List[PreRegistration]
+        :type preregistrations: Iterable[PreRegistration]
 
         :param event: The event to be sent
         :type event: Event
 
+        :param checkpoint_ids: The preregistration IDs saved by a previous run that may not have been queued
+        :type checkpoint_ids: List[str]
+
+        :param save_checkpoint: Saves the IDs of the preregistrations that may be marked but not queued
+        :type save_checkpoint: Callable[[List[str]], Tuple[HTTPStatus, str]]
+
+        :return: The status and message
+        :rtype: Tuple[HTTPStatus, str]
+
         """
-        emails = []
         self.__event_email = event.email
-        for preregistration in preregistrations:
-            if preregistration.acceptanceEmailSent:
-                continue
+        status, message = HTTPStatus.OK, None
+        save_checkpoint = save_checkpoint or (lambda preregistration_ids: (HTTPStatus.OK, None))
+        # marked as sent but neither queued nor unmarked
+        stranded_ids = []
+        if checkpoint_ids:
+            query_status, unconfirmed, query_message = self.__preregistration_repository.query_preregistrations_by_ids(
+                event_id=event.eventId, preregistration_ids=checkpoint_ids
+            )
+            if query_status != HTTPStatus.OK:
+                return query_status, query_message
+
+            unconfirmed = [preregistration for preregistration in unconfirmed if preregistration.acceptanceEmailSent]
+            if unconfirmed:
+                logger.info(f'Queueing accept/reject emails again for {len(unconfirmed)} preregistrations')
+                status, stranded_ids, message = self.__enqueue_accept_reject_batch(claimed=unconfirmed, event=event)
 
+            checkpoint_status, checkpoint_message = save_checkpoint(stranded_ids)
+            if checkpoint_status != HTTPStatus.OK:
+                return checkpoint_status, checkpoint_message
+
+        pending_preregistrations = (
+            preregistration for preregistration in preregistrations if not preregistration.acceptanceEmailSent
+        )
+        while batch := list(islice(pending_preregistrations, CommonConstants.TRANSACT_WRITE_MAX_ITEMS)):
+            checkpoint_status, checkpoint_message = save_checkpoint(
+                stranded_ids + [preregistration.preRegistrationId for preregistration in batch]
+            )
+            if checkpoint_status != HTTPStatus.OK:
+                return checkpoint_status, checkpoint_message
+
+            batch_status, claimed, batch_message = self.__preregistration_repository.update_acceptance_email_sent(
+                preregistration_entries=batch, acceptance_email_sent=True
+            )
+            if batch_status != HTTPStatus.OK:
+                status, message = batch_status, batch_message
+
+            if claimed:
+                batch_status, batch_stranded_ids, batch_message = self.__enqueue_accept_reject_batch(
+                    claimed=claimed, event=event
+                )
+                if batch_status != HTTPStatus.OK:
+                    status, message = batch_status, batch_message
+
+                stranded_ids.extend(batch_stranded_ids)
+
+            checkpoint_status, checkpoint_message = save_checkpoint(stranded_ids)
+            if checkpoint_status != HTTPStatus.OK:
+                return checkpoint_status, checkpoint_message
+
+        return status, message
+
+    def __enqueue_accept_reject_batch(
+        self, claimed: List[PreRegistration], event: Event
+    ) -> Tuple[HTTPStatus, List[str], str]:
+        """Queue the accept/reject emails of preregistrations marked as sent, and unmark the ones not queued
+
+        :param claimed: The preregistrations marked as sent
+        :type claimed: List[PreRegistration]
+
+        :param event: The event to be sent
+        :type event: Event
+
+        :return: The status, the IDs of the preregistrations neither queued nor unmarked, and the message
+        :rtype: Tuple[HTTPStatus, List[str], str]
+
+        """
+        status, message = HTTPStatus.OK, None
+        acceptance_template = self.__build_preregistration_acceptance_template(event=event)
+        rejection_template = self.__build_preregistration_rejection_template(event=event)
+        deduplication_keys = {}
+        for preregistration in claimed:
             should_send_acceptance = (
                 preregistration.acceptanceStatus and preregistration.acceptanceStatus == AcceptanceStatus.ACCEPTED.value
             )
+            recipient = self.__build_preregistration_recipient(preregistration=preregistration)
             if should_send_acceptance:
-                email = self.send_preregistration_acceptance_email(preregistration=preregistration, event=event)
-                logger.info(f'Acceptance email sent to {preregistration.email} for event {event.eventId}')
+                acceptance_template.recipients.append(recipient)
             else:
-                email = self.send_preregistration_rejection_email(preregistration=preregistration, event=event)
-                logger.info(f'Rejection email sent to {preregistration.email} for event {event.eventId}')
+                rejection_template.recipients.append(recipient)
 
-            emails.append(email)
+            deduplication_keys[preregistration.email.lower()] = preregistration.preRegistrationId
 
-            self.__preregistration_repository.update_preregistration(
-                preregistration_entry=preregistration, preregistration_in=PreRegistrationPatch(acceptanceEmailSent=True)
+        failed_recipients = set()
+        for email_template_in in (acceptance_template, rejection_template):
+            template_status, enqueue_status, template_message = self.enqueue_template_email(
+                email_template_in=email_template_in, event=event, deduplication_keys=deduplication_keys
+            )
+            if template_status != HTTPStatus.OK:
+                status, message = template_status, template_message
+
+            if template_status != HTTPStatus.OK and not enqueue_status:
+                failed_recipients.update(
+                    recipient.lower() for email in email_template_in.recipients for recipient in email.to
+                )
+            failed_recipients.update(
+                recipient.lower() for recipient, is_enqueued in enqueue_status.items() if not is_enqueued
             )
 
-        return self.send_batch_email(email_in_list=emails, event=event)
+        stranded_ids = []
+        failed = [preregistration for preregistration in claimed if preregistration.email.lower() in failed_recipients]
+        if failed:
+            status = HTTPStatus.INTERNAL_SERVER_ERROR if status == HTTPStatus.OK else status
+            message = message or f'Failed to queue accept/reject emails for {len(failed)} preregistrations'
+            revert_status, reverted, revert_message = self.__preregistration_repository.update_acceptance_email_sent(
+                preregistration_entries=failed, acceptance_email_sent=False
+            )
+            if revert_status != HTTPStatus.OK:
+                # these stay marked as sent and a retry skips them, unless it is given their IDs as checkpoint_ids
+                reverted_ids = {preregistration.preRegistrationId for preregistration in reverted}
+                stranded_ids = [
+                    preregistration.preRegistrationId
+                    for preregistration in failed
+                    if preregistration.preRegistrationId not in reverted_ids
+                ]
+                logger.error(
+                    f'Preregistrations of event {event.eventId} marked as emailed but not emailed: {stranded_ids}'
+                )
+                status, message = revert_status, revert_message
+
+        logger.info(
+            f'Accept/reject emails queued for {len(claimed) - len(failed)} preregistrations of event {event.eventId}'
+        )
+        return status, stranded_ids, message
 
     def send_preregistration_creation_email(
         self, preregistration: PreRegistration, event: Event
@@ -271,11 +702,51 @@ class EmailUsecase:
 
         :return: EmailIn
         """
+        email_template_in = self.__build_preregistration_acceptance_template(event=event)
+        email_in = email_template_in.render(self.__build_preregistration_recipient(preregistration=preregistration))
+        logger.info(f'Sending pre-registration acceptance email to {preregistration.email}')
+        return email_in
+
+    def send_preregistration_rejection_email(self, preregistration: PreRegistration, event: Event) -> EmailIn:
+        """Send a rejection email to the queue.
+
+        :param preregistration: The preregistration to be sent
+        :type preregistration: PreRegistration
+
+        :param event: The event to be sent
+        :type event: Event
+
+        :return: EmailIn
+
+        """
+        email_template_in = self.__build_preregistration_rejection_template(event=event)
+        email_in = email_template_in.render(self.__build_preregistration_recipient(preregistration=preregistration))
+        logger.info(f'Sending pre-registration rejection email to {preregistration.email}')
+        return email_in
+
+    @staticmethod
+    def __build_preregistration_recipient(preregistration: PreRegistration) -> EmailRecipient:
+        """Build the template recipient of a preregistration
+
+        :param preregistration: The preregistration to be sent
+        :type preregistration: PreRegistration
+
+        :return: EmailRecipient
+        """
+        return EmailRecipient(to=[preregistration.email], substitutions={'firstName': preregistration.firstName or ''})
+
+    def __build_preregistration_acceptance_template(self, event: Event) -> EmailTemplateIn:
+        """Build the acceptance email template of an event, without recipients.
+
+        :param event: The event to be sent
+        :type event: Event
+
+        :return: EmailTemplateIn
+        """
         self.__event_email = event.email
         is_special_email = event.email in [email.value for email in SpecialEmails]
         is_durianpy = not is_special_email
         subject = f'You’re In! {event.name} Pre-Registration Accepted 🌟'
-        salutation = f'Good day {preregistration.firstName},'
         body = [
             f'Congratulations! We are over the moon to let you know that your pre-registration for {event.name} has been accepted! This is going to be an extraordinary experience, and we can’t wait to share it with you.',
             f'To complete your registration and secure your spot, please follow this link: https://techtix.app/{event.eventId}/register',
@@ -287,30 +758,24 @@ class EmailUsecase:
         if special_sender := self.__sender_name_map.get(event.email):
             regards.append(special_sender)
 
-        email_in = EmailIn(
-            to=[preregistration.email],
+        return EmailTemplateIn(
+            recipients=[],
             subject=subject,
             body=body,
-            salutation=salutation,
+            salutation='Good day {firstName},',
             regards=regards,
             emailType=EmailType.PREREGISTRATION_EMAIL.value,
             eventId=event.eventId,
             isDurianPy=is_durianpy,
         )
-        logger.info(f'Sending pre-registration acceptance email to {preregistration.email}')
-        return email_in
-
-    def send_preregistration_rejection_email(self, preregistration: PreRegistration, event: Event) -> EmailIn:
-        """Send a rejection email to the queue.
 
-        :param preregistration: The preregistration to be sent
-        :type preregistration: PreRegistration
+    def __build_preregistration_rejection_template(self, event: Event) -> EmailTemplateIn:
+        """Build the rejection email template of an event, without recipients.
 
         :param event: The event to be sent
         :type event: Event
 
-        :return: EmailIn
-
+        :return: EmailTemplateIn
         """
         self.__event_email = event.email
         is_special_email = event.email in [email.value for email in SpecialEmails]
@@ -323,25 +788,22 @@ class EmailUsecase:
             f'We value your support and understanding, and we genuinely hope to welcome you to our future events. Should you have any questions or require further assistance, please do not hesitate to reach out to us at {event.email}.',
             'Thank you for your understanding.',
         ]
-        salutation = f'Good day {preregistration.firstName},'
         regards = ['Best,']
 
         # Check if email is a special sender to add to the regards message
         if special_sender := self.__sender_name_map.get(event.email):
             regards.append(special_sender)
 
-        email_in = EmailIn(
-            to=[preregistration.email],
+        return EmailTemplateIn(
+            recipients=[],
             subject=subject,
             body=body,
-            salutation=salutation,
+            salutation='Good day {firstName},',
             regards=regards,
             emailType=EmailType.PREREGISTRATION_EMAIL.value,
             eventId=event.eventId,
             isDurianPy=is_durianpy,
         )
-        logger.info(f'Sending pre-registration rejection email to {preregistration.email}')
-        return email_in
 
     def send_event_completion_email(
         self,
@@ -360,6 +822,37 @@ class EmailUsecase:
         :param participants: The participants to be sent
         :type participants: list
 
+        """
+        status, _, message = self.enqueue_event_completion_email(
+            event=event, claim_certificate_url=claim_certificate_url, participants=participants
+        )
+        return status, message
+
+    def enqueue_event_completion_email(
+        self,
+        event: Event,
+        claim_certificate_url: str,
+        participants: list,
+        deduplication_keys: Dict[str, str] = None,
+    ) -> Tuple[HTTPStatus, Dict[str, bool], str]:
+        """Send the event completion email to the queue and report which participants were enqueued
+
+        :param event: Event entry
+        :type event: Event
+
+        :param claim_certificate_url: The url to claim the certificate
+        :type claim_certificate_url: str
+
+        :param participants: The participants to be sent
+        :type participants: list
+
+        :param deduplication_keys: The key of each participant, by lowercase email address, that the deduplication
+            ID of its message is built from
+        :type deduplication_keys: Dict[str, str]
+
+        :return: The status, whether the email of each participant was enqueued, and a message
+        :rtype: Tuple[HTTPStatus, Dict[str, bool], str]
+
         """
         self.__event_email = event.email
         event_name = event.name
@@ -381,18 +874,17 @@ class EmailUsecase:
         if special_sender := self.__sender_name_map.get(event.email):
             regards.append(special_sender)
 
-        emails = [
-            EmailIn(
-                to=[participant],
-                subject=subject,
-                body=body,
-                salutation=salutation,
-                regards=regards,
-                emailType=EmailType.EVALUATION_EMAIL.value,
-                eventId=event_id,
-                isDurianPy=is_durianpy,
-            )
-            for participant in participants
-        ]
+        email_template_in = EmailTemplateIn(
+            recipients=[EmailRecipient(to=[participant]) for participant in participants],
+            subject=subject,
+            body=body,
+            salutation=salutation,
+            regards=regards,
+            emailType=EmailType.EVALUATION_EMAIL.value,
+            eventId=event_id,
+            isDurianPy=is_durianpy,
+        )
 
-        return self.send_batch_email(email_in_list=emails, event=event)
+        return self.enqueue_template_email(
+            email_template_in=email_template_in, event=event, deduplication_keys=deduplication_keys
+        )
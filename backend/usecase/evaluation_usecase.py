@@ -7,16 +7,26 @@ from model.evaluations.evaluation import (
     EvaluationOut,
     EvaluationPatch,
 )
+from model.evaluations.evaluation_summary import (
+    EvaluationAnswerCount,
+    EvaluationQuestionSummaryOut,
+    EvaluationSummary,
+    EvaluationSummaryOut,
+)
 from model.registrations.registration import RegistrationPatch, RegistrationPreviewOut
+from repository.evaluation_summaries_repository import EvaluationSummariesRepository
 from repository.evaluations_repository import EvaluationRepository
 from repository.events_repository import EventsRepository
 from repository.registrations_repository import RegistrationsRepository
 from starlette.responses import JSONResponse
+from utils.tracing import traced
 
 
+@traced
 class EvaluationUsecase:
     def __init__(self):
         self.__evaluations_repository = EvaluationRepository()
+        self.__evaluation_summaries_repository = EvaluationSummariesRepository()
         self.__registrations_repository = RegistrationsRepository()
         self.__events_repository = EventsRepository()
 
@@ -173,19 +183,28 @@ class EvaluationUsecase:
 
         evaluation_out_dict = {}
         for evaluation in evaluations:
-            registration_id = evaluation.registrationId
+            registration_key = (evaluation.eventId, evaluation.registrationId)
             evealuation_dict = self.__convert_data_entry_to_dict(evaluation)
             evaluation_out = EvaluationOut(**evealuation_dict)
 
-            evaluation_out_dict.setdefault(registration_id, []).append(evaluation_out)
+            evaluation_out_dict.setdefault(registration_key, []).append(evaluation_out)
+
+        # the registrations are joined with one batched read instead of a query per registrant
+        status, registrations, message = self.__registrations_repository.query_registrations_by_ids(
+            registration_keys=evaluation_out_dict.keys()
+        )
+        if status != HTTPStatus.OK:
+            return JSONResponse(status_code=status, content={'message': message})
+
+        registration_dict = {
+            (registration.hashKey, registration.rangeKey): registration for registration in registrations
+        }
 
         evaluations_return = []
-        for registration_id, evaluation_out_list in evaluation_out_dict.items():
+        for registration_key, evaluation_out_list in evaluation_out_dict.items():
             evaluations_return_entry = EvaluationListOut(evaluationList=evaluation_out_list)
 
-            _, registration, _ = self.__registrations_repository.query_registration_with_registration_id(
-                event_id=event_id, registration_id=registration_id
-            )
+            registration = registration_dict.get(registration_key)
             if registration:
                 registration_data = self.__convert_data_entry_to_dict(registration)
                 registration_out = RegistrationPreviewOut(**registration_data)
@@ -228,6 +247,48 @@ class EvaluationUsecase:
 
         return evaluation_out_list
 
+    def get_evaluation_summary(self, event_id: str) -> Union[JSONResponse, EvaluationSummaryOut]:
+        """Get the summary of the evaluations of an event, per question
+
+        :param event_id: The id of the event
+        :type event_id: str
+
+        :return: The response count, answer scale average and count per answer of each question
+        :rtype: Union[JSONResponse, EvaluationSummaryOut]
+
+        """
+        status, _, message = self.__events_repository.query_events(event_id=event_id)
+        if status != HTTPStatus.OK:
+            return JSONResponse(status_code=status, content={'message': message})
+
+        status, summary_entries, message = self.__evaluation_summaries_repository.query_evaluation_summaries(
+            event_id=event_id
+        )
+        if status != HTTPStatus.OK:
+            return JSONResponse(status_code=status, content={'message': message})
+
+        question_summaries = {}
+        for summary_entry in summary_entries:
+            if isinstance(summary_entry, EvaluationSummary):
+                question_summary = question_summaries.setdefault(summary_entry.question, {})
+                question_summary.update(self.__convert_data_entry_to_dict(summary_entry))
+            elif isinstance(summary_entry, EvaluationAnswerCount) and summary_entry.count:
+                question_summary = question_summaries.setdefault(summary_entry.question, {})
+                question_summary.setdefault('answerCounts', {})[summary_entry.answer] = int(summary_entry.count)
+
+        questions = []
+        for question_summary in question_summaries.values():
+            if not question_summary.get('responseCount'):
+                continue
+
+            scale_count = question_summary.get('answerScaleCount')
+            if scale_count:
+                question_summary['answerScaleAverage'] = question_summary['answerScaleSum'] / scale_count
+
+            questions.append(EvaluationQuestionSummaryOut(**question_summary))
+
+        return EvaluationSummaryOut(eventId=event_id, questions=questions)
+
     @staticmethod
     def __convert_data_entry_to_dict(data_entry):
         """Convert a data entry to a dictionary
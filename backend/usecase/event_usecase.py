@@ -8,27 +8,31 @@ from urllib.parse import unquote_plus
 from constants.common_constants import CommonConstants
 from model.events.event import EventAdminOut, EventIn, EventOut
 from model.events.events_constants import EventStatus
-from model.ticket_types.ticket_types import TicketTypeOut
+from model.jobs.jobs_constants import JobType
+from model.ticket_types.ticket_types import TicketType, TicketTypeOut
+from repository.counter_shards_repository import CounterShardsRepository
 from repository.events_repository import EventsRepository
 from repository.faqs_repository import FAQsRepository
-from repository.preregistrations_repository import PreRegistrationsRepository
-from repository.registrations_repository import RegistrationsRepository
 from repository.ticket_type_repository import TicketTypeRepository
 from starlette.responses import JSONResponse
 from usecase.email_usecase import EmailUsecase
 from usecase.file_s3_usecase import FileS3Usecase
+from usecase.job_usecase import JobUsecase
+from utils.logger import logger
+from utils.tracing import traced
 from utils.utils import Utils
 
 
+@traced
 class EventUsecase:
     def __init__(self):
         self.__events_repository = EventsRepository()
+        self.__counter_shards_repository = CounterShardsRepository()
         self.__email_usecase = EmailUsecase()
         self.__file_s3_usecase = FileS3Usecase()
-        self.__registration_repository = RegistrationsRepository()
-        self.__preregistration_repository = PreRegistrationsRepository()
         self.__faqs_repository = FAQsRepository()
         self.__ticket_type_repository = TicketTypeRepository()
+        self.__job_usecase = JobUsecase()
 
     def create_event(self, event_in: EventIn) -> Union[JSONResponse, EventOut]:
         """Create a new event
@@ -88,7 +92,8 @@ class EventUsecase:
         :rtype: Union[JSONResponse, EventOut]
 
         """
-        status, event, message = self.__events_repository.query_events(event_id)
+        # a cached entry may be EVENT_CACHE_TTL_SECONDS old, and the new version is derived from this one
+        status, event, message = self.__events_repository.query_events(event_id, use_cache=False)
         if status != HTTPStatus.OK:
             return JSONResponse(status_code=status, content={'message': message})
 
@@ -133,36 +138,34 @@ class EventUsecase:
             and original_status != EventStatus.OPEN.value
             and update_event.status == EventStatus.OPEN.value
         )
+        job_types = []
         if should_send_accept_reject_emails:
-            _, preregistrations, _ = self.__preregistration_repository.query_preregistrations(event_id=event_id)
-            if preregistrations:
-                self.__email_usecase.send_accept_reject_status_email(preregistrations=preregistrations, event=event)
+            # Sent by the job handler, a large approval-flow event would not fit in the request timeout
+            job_types.append(JobType.ACCEPT_REJECT_EMAILS)
 
         if original_status != EventStatus.COMPLETED.value and update_event.status == EventStatus.COMPLETED.value:
-            event_id = update_event.eventId
-            claim_certificate_url = f'{os.getenv("FRONTEND_URL")}/{event_id}/evaluate'
-            (
-                status,
-                registrations,
-                message,
-            ) = self.__registration_repository.query_registrations(event_id=event_id)
-            participants = [entry.email for entry in registrations if not entry.evaluationEmailSent]
-            self.__email_usecase.send_event_completion_email(
-                event=event,
-                claim_certificate_url=claim_certificate_url,
-                participants=participants,
-            )
+            # Evaluation emails are sent by the job handler, progress is polled from the job status endpoint
+            job_types.append(JobType.EVENT_COMPLETION_EMAILS)
+
+        for job_type in job_types:
+            status, message = self.__job_usecase.enqueue_job(job_type=job_type, event_id=event_id)
+            if status != HTTPStatus.OK:
+                # the status transition is already saved, so saving the event again would not start the job
+                message = (
+                    f'Event updated, but its {job_type.value} job could not be started, start it again with '
+                    f'POST /events/{event_id}/jobs/{job_type.value}: {message}'
+                )
+                logger.error(f'[{event_id}] {message}')
+                return JSONResponse(status_code=status, content={'message': message})
 
         event_data = self.__convert_data_entry_to_dict(update_event)
         event_out = EventOut(**event_data)
+        event_out.registrationCount = self.__counter_shards_repository.get_event_registration_count(update_event)
 
         if update_event.hasMultipleTicketTypes:
             _, ticket_types, _ = self.__ticket_type_repository.query_ticket_types(event_id=event_id)
             if ticket_types:
-                ticket_types_out = [
-                    TicketTypeOut(**self.__convert_data_entry_to_dict(ticket_type)) for ticket_type in ticket_types
-                ]
-                event_out.ticketTypes = ticket_types_out
+                event_out.ticketTypes = self.__ticket_types_out(ticket_types)
 
         return self.collect_pre_signed_url(event_out)
 
@@ -184,14 +187,12 @@ class EventUsecase:
         event_data = self.__convert_data_entry_to_dict(event)
         event_model = EventAdminOut if current_user else EventOut
         event_out = event_model(**event_data)
+        event_out.registrationCount = self.__counter_shards_repository.get_event_registration_count(event)
 
         if event.hasMultipleTicketTypes:
             _, ticket_types, _ = self.__ticket_type_repository.query_ticket_types(event_id=event_id)
             if ticket_types:
-                ticket_types_out = [
-                    TicketTypeOut(**self.__convert_data_entry_to_dict(ticket_type)) for ticket_type in ticket_types
-                ]
-                event_out.ticketTypes = ticket_types_out
+                event_out.ticketTypes = self.__ticket_types_out(ticket_types)
 
         return self.collect_pre_signed_url(event_out)
 
@@ -215,9 +216,14 @@ class EventUsecase:
         if status != HTTPStatus.OK:
             return JSONResponse(status_code=status, content={'message': message})
 
-        events_data = [self.__convert_data_entry_to_dict(event) for event in events]
         event_model = EventAdminOut if current_user else EventOut
-        return [self.collect_pre_signed_url(event_model(**event_data)) for event_data in events_data]
+        events_out = []
+        for event in events:
+            event_out = event_model(**self.__convert_data_entry_to_dict(event))
+            event_out.registrationCount = self.__counter_shards_repository.get_event_registration_count(event)
+            events_out.append(event_out)
+
+        return self.collect_pre_signed_urls(events_out)
 
     def delete_event(self, event_id: str) -> Union[None, JSONResponse]:
         """Delete an event by its ID
@@ -229,7 +235,7 @@ class EventUsecase:
         :rtype: Union[None, JSONResponse]
 
         """
-        status, event, message = self.__events_repository.query_events(event_id)
+        status, event, message = self.__events_repository.query_events(event_id, use_cache=False)
         if status != HTTPStatus.OK:
             return JSONResponse(status_code=status, content={'message': message})
 
@@ -258,7 +264,7 @@ class EventUsecase:
         decoded_object_key = unquote_plus(object_key)
         event_id, upload_type = self.__file_s3_usecase.get_values_from_object_key(decoded_object_key)
 
-        status, event, message = self.__events_repository.query_events(event_id)
+        status, event, message = self.__events_repository.query_events(event_id, use_cache=False)
         if status != HTTPStatus.OK:
             return JSONResponse(status_code=status, content={'message': message})
 
@@ -274,8 +280,17 @@ class EventUsecase:
 
         event_data = self.__convert_data_entry_to_dict(update_event)
         event_out = EventOut(**event_data)
+        event_out.registrationCount = self.__counter_shards_repository.get_event_registration_count(update_event)
         return self.collect_pre_signed_url(event_out)
 
+    def __ticket_types_out(self, ticket_types: List[TicketType]) -> List[TicketTypeOut]:
+        ticket_types_out = []
+        for ticket_type in ticket_types:
+            ticket_type_out = TicketTypeOut(**self.__convert_data_entry_to_dict(ticket_type))
+            ticket_type_out.currentSales = self.__counter_shards_repository.get_ticket_type_sales(ticket_type)
+            ticket_types_out.append(ticket_type_out)
+        return ticket_types_out
+
     def collect_pre_signed_url(self, event: EventOut):
         """Collect pre-signed URLs for an event.
 
@@ -286,19 +301,39 @@ class EventUsecase:
         :rtype: EventOut
 
         """
-        if event.bannerLink:
-            banner_link = self.__file_s3_usecase.create_download_url(event.bannerLink)
-            event.bannerUrl = banner_link.downloadLink
+        return self.collect_pre_signed_urls([event], cached=False)[0]
+
+    def collect_pre_signed_urls(self, events: List[EventOut], cached: bool = True) -> List[EventOut]:
+        """Collect pre-signed URLs for a list of events, signing every object key in one call.
+
+        :param events: The events to collect pre-signed URLs for.
+        :type events: List[EventOut]
+
+        :param cached: Whether the links may be the long-lived cached ones of list responses
+        :type cached: bool
+
+        :return: The events with pre-signed URLs.
+        :rtype: List[EventOut]
+
+        """
+        object_keys = [
+            object_key
+            for event in events
+            for object_key in (event.bannerLink, event.logoLink, event.certificateTemplate)
+        ]
+        download_urls = self.__file_s3_usecase.create_download_urls(object_keys, cached=cached)
+
+        for event in events:
+            if event.bannerLink:
+                event.bannerUrl = download_urls.get(event.bannerLink)
 
-        if event.logoLink:
-            logo_link = self.__file_s3_usecase.create_download_url(event.logoLink)
-            event.logoUrl = logo_link.downloadLink
+            if event.logoLink:
+                event.logoUrl = download_urls.get(event.logoLink)
 
-        if event.certificateTemplate:
-            certificate_template = self.__file_s3_usecase.create_download_url(event.certificateTemplate)
-            event.certificateTemplateUrl = certificate_template.downloadLink
+            if event.certificateTemplate:
+                event.certificateTemplateUrl = download_urls.get(event.certificateTemplate)
 
-        return event
+        return events
 
     @staticmethod
     def __convert_data_entry_to_dict(data_entry):
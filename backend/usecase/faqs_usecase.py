@@ -5,8 +5,10 @@ from model.faqs.faqs import FAQsIn, FAQsOut
 from repository.events_repository import EventsRepository
 from repository.faqs_repository import FAQsRepository
 from starlette.responses import JSONResponse
+from utils.tracing import traced
 
 
+@traced
 class FAQsUsecase:
     def __init__(self):
         self.__faqs_repository = FAQsRepository()
@@ -1,24 +1,37 @@
 import os
+import time
 from http import HTTPStatus
-from typing import Tuple
+from typing import Dict, Iterable, Tuple
 
-from boto3 import client as boto3_client
-from botocore.config import Config
+from aws.aws_clients import AWSClients
+from botocore.client import BaseClient
 from botocore.exceptions import ClientError
 from model.events.events_constants import EventUploadField, EventUploadType
 from model.file_uploads.file_upload import FileDownloadOut, FileUploadOut
 from model.file_uploads.file_upload_constants import ClientMethods
 from starlette.responses import JSONResponse
+from utils.cache import TTLCache
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class FileS3Usecase:
-    def __init__(self):
-        self.__s3_client = boto3_client(
-            's3',
-            region_name=os.getenv('REGION', 'ap-southeast-1'),
-            config=Config(signature_version='s3v4'),
-        )
+    # S3 rejects multipart parts smaller than 5 MiB, except for the last one
+    MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+    # Download links of list responses are valid for this long, and are reused while at least half of it remains
+    DOWNLOAD_URL_EXPIRATION_SECONDS = int(os.getenv('DOWNLOAD_URL_EXPIRATION_SECONDS', '900'))
+    DOWNLOAD_URL_REUSE_SECONDS = max(DOWNLOAD_URL_EXPIRATION_SECONDS // 2, 1)
+
+    # Shared by every instance so that warm invocations reuse the signed download links
+    download_url_cache = TTLCache(
+        maxsize=int(os.getenv('DOWNLOAD_URL_CACHE_MAX_SIZE', '2048')),
+        ttl=DOWNLOAD_URL_REUSE_SECONDS,
+    )
+
+    def __init__(self, s3_client: BaseClient = None):
+        self.__s3_client = s3_client or AWSClients.get_client('s3')
         self.__bucket = os.getenv('S3_BUCKET')
         self.__presigned_url_expiration_time = 30
 
@@ -46,7 +59,7 @@ class FileS3Usecase:
             return JSONResponse(status_code=500, content={'message': 'Error creating presigned url'})
 
     def create_download_url(self, object_key) -> FileDownloadOut:
-        """Create a presigned url for downloading files from s3
+        """Create a short-lived presigned url for downloading a file from s3, e.g. a CSV export
 
         :param object_key: The key of the object to be downloaded
         :type object_key: str
@@ -54,22 +67,59 @@ class FileS3Usecase:
         :return: The presigned url and the object key
         :rtype: FileDownloadOut
         """
-        try:
-            presigned_url = self.__s3_client.generate_presigned_url(
-                ClientMethod=ClientMethods.GET_OBJECT,
-                Params={'Bucket': self.__bucket, 'Key': object_key},
-                ExpiresIn=self.__presigned_url_expiration_time,
-            )
-
-            url_data = {'downloadLink': presigned_url, 'objectKey': object_key}
-
-            return FileDownloadOut(**url_data)
-        except ClientError as e:
-            logger.error('Error creating presigned url: %s', e)
+        download_urls = self.create_download_urls([object_key], cached=False)
+        if object_key not in download_urls:
             return JSONResponse(
                 status_code=HTTPStatus.INTERNAL_SERVER_ERROR, content={'message': 'Error fetching download url'}
             )
 
+        return FileDownloadOut(downloadLink=download_urls[object_key], objectKey=object_key)
+
+    def create_download_urls(self, object_keys: Iterable[str], cached: bool = True) -> Dict[str, str]:
+        """Create presigned urls for downloading a list of files from s3
+
+        Cached links are valid for DOWNLOAD_URL_EXPIRATION_SECONDS and are shared per object key and reuse window,
+        so a link is signed at most once per window and is always returned with at least
+        DOWNLOAD_URL_REUSE_SECONDS of validity left. Other links are signed on every call and expire as quickly as
+        upload links.
+
+        :param object_keys: The keys of the objects to be downloaded, empty keys are ignored
+        :type object_keys: Iterable[str]
+
+        :param cached: Whether the links may be long-lived and shared, only for list responses
+        :type cached: bool
+
+        :return: The presigned url of each object key, keys that failed to be signed are left out
+        :rtype: Dict[str, str]
+        """
+        reuse_window = int(time.time() // self.DOWNLOAD_URL_REUSE_SECONDS)
+        download_urls = {}
+        for object_key in filter(None, object_keys):
+            if object_key in download_urls:
+                continue
+
+            cache_key = (self.__bucket, object_key, reuse_window)
+            presigned_url = self.download_url_cache.get(cache_key) if cached else None
+            if presigned_url is None:
+                try:
+                    presigned_url = self.__s3_client.generate_presigned_url(
+                        ClientMethod=ClientMethods.GET_OBJECT,
+                        Params={'Bucket': self.__bucket, 'Key': object_key},
+                        ExpiresIn=(
+                            self.DOWNLOAD_URL_EXPIRATION_SECONDS if cached else self.__presigned_url_expiration_time
+                        ),
+                    )
+                except ClientError as e:
+                    logger.error('Error creating presigned url for %s: %s', object_key, e)
+                    continue
+
+                if cached:
+                    self.download_url_cache.set(cache_key, presigned_url)
+
+            download_urls[object_key] = presigned_url
+
+        return download_urls
+
     def upload_file(self, file_name: str, object_name: str = None, verbose: bool = True) -> bool:
         # If S3 object_name was not specified, use file_name
         if object_name is None:
@@ -83,6 +133,97 @@ class FileS3Usecase:
             message = f'Failed to upload file ({file_name}) to S3, Reason: {type(e).__name__} - {str(e)}'
             logger.error(message)
 
+    def upload_stream(self, chunks: Iterable[bytes], object_name: str, content_type: str = None) -> bool:
+        """Upload a stream of bytes to S3 without buffering the whole object.
+
+        Chunks are collected into parts of at least MULTIPART_PART_SIZE bytes and sent with a multipart
+        upload. Streams that never fill a single part are sent with a plain put_object instead.
+
+        :param chunks: The chunks of the object to be uploaded
+        :type chunks: Iterable[bytes]
+
+        :param object_name: The key of the object
+        :type object_name: str
+
+        :param content_type: The content type of the object
+        :type content_type: str
+
+        :return: True if the upload succeeded, otherwise False
+        :rtype: bool
+        """
+        extra_args = {'ContentType': content_type} if content_type else {}
+        upload_id = None
+        parts = []
+        buffer = bytearray()
+
+        try:
+            for chunk in chunks:
+                buffer.extend(chunk)
+                if len(buffer) < self.MULTIPART_PART_SIZE:
+                    continue
+
+                if upload_id is None:
+                    upload_id = self.__s3_client.create_multipart_upload(
+                        Bucket=self.__bucket, Key=object_name, **extra_args
+                    )['UploadId']
+
+                parts.append(self.__upload_part(object_name, upload_id, len(parts) + 1, bytes(buffer)))
+                buffer.clear()
+
+            if upload_id is None:
+                self.__s3_client.put_object(Bucket=self.__bucket, Key=object_name, Body=bytes(buffer), **extra_args)
+            else:
+                if buffer:
+                    parts.append(self.__upload_part(object_name, upload_id, len(parts) + 1, bytes(buffer)))
+
+                self.__s3_client.complete_multipart_upload(
+                    Bucket=self.__bucket,
+                    Key=object_name,
+                    UploadId=upload_id,
+                    MultipartUpload={'Parts': parts},
+                )
+
+            logger.info(f'Stored file in S3: {self.__bucket}/{object_name}')
+            return True
+
+        except Exception as e:
+            message = f'Failed to stream file to S3 ({object_name}), Reason: {type(e).__name__} - {str(e)}'
+            logger.error(message)
+            if upload_id is not None:
+                try:
+                    self.__s3_client.abort_multipart_upload(Bucket=self.__bucket, Key=object_name, UploadId=upload_id)
+                except ClientError as abort_error:
+                    logger.error(f'Failed to abort multipart upload ({object_name}): {abort_error}')
+
+            return False
+
+    def __upload_part(self, object_name: str, upload_id: str, part_number: int, body: bytes) -> dict:
+        """Upload a single part of a multipart upload
+
+        :param object_name: The key of the object
+        :type object_name: str
+
+        :param upload_id: The ID of the multipart upload
+        :type upload_id: str
+
+        :param part_number: The 1-based number of the part
+        :type part_number: int
+
+        :param body: The content of the part
+        :type body: bytes
+
+        :return: The part entry expected by complete_multipart_upload
+        :rtype: dict
+        """
+        response = self.__s3_client.upload_part(
+            Bucket=self.__bucket,
+            Key=object_name,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        return {'ETag': response['ETag'], 'PartNumber': part_number}
+
     def get_values_from_object_key(self, object_key) -> Tuple[str, str]:
         """Get the entry id and upload type from the object key
 
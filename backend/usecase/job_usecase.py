@@ -0,0 +1,380 @@
+import json
+import os
+from http import HTTPStatus
+from typing import Dict, List, Tuple, Union
+
+from aws.aws_clients import AWSClients
+from botocore.client import BaseClient
+from botocore.exceptions import BotoCoreError, ClientError
+from constants.common_constants import CommonConstants
+from model.events.event import Event
+from model.jobs.job import Job, JobMessage, JobOut
+from model.jobs.jobs_constants import JobStatus, JobType
+from model.registrations.registration import Registration
+from pydantic import ValidationError
+from repository.events_repository import EventsRepository
+from repository.jobs_repository import JobsRepository
+from repository.preregistrations_repository import PreRegistrationsRepository
+from repository.registrations_repository import RegistrationsRepository
+from starlette.responses import JSONResponse
+from usecase.email_usecase import EmailUsecase
+from utils.logger import logger
+from utils.tracing import message_attributes, record_parent, start_span, traced
+
+
+@traced
+class JobUsecase:
+    """
+    Runs long event jobs, such as bulk emails, off the request path.
+
+    Jobs are enqueued to the job queue by the API and processed by the job handler Lambda. Each run has a
+    status record that the admin UI polls, and which also holds the checkpoint a redelivered run resumes from.
+    """
+
+    def __init__(self, sqs_client: BaseClient = None):
+        self.__sqs_client = sqs_client or AWSClients.get_client('sqs')
+        self.__sqs_url = os.getenv('JOB_QUEUE')
+        self.__jobs_repository = JobsRepository()
+        self.__events_repository = EventsRepository()
+        self.__preregistration_repository = PreRegistrationsRepository()
+        self.__registration_repository = RegistrationsRepository()
+        self.__email_usecase = EmailUsecase()
+        self.__job_handlers = {
+            JobType.ACCEPT_REJECT_EMAILS: self.__run_accept_reject_emails_job,
+            JobType.EVENT_COMPLETION_EMAILS: self.__run_event_completion_emails_job,
+        }
+
+    def enqueue_job(self, job_type: JobType, event_id: str) -> Tuple[HTTPStatus, str]:
+        """Start a new run of a job and send it to the job queue
+
+        The items claimed but not confirmed by the previous run are carried over, so the new run finishes them.
+
+        :param job_type: The type of the job
+        :type job_type: JobType
+
+        :param event_id: The ID of the event the job runs for
+        :type event_id: str
+
+        :return: The status and message
+        :rtype: Tuple[HTTPStatus, str]
+
+        """
+        status, previous_job, message = self.__jobs_repository.query_job(event_id=event_id, job_type=job_type)
+        if status not in (HTTPStatus.OK, HTTPStatus.NOT_FOUND):
+            return status, message
+
+        claimed_ids = previous_job.claimedIds if previous_job else None
+        status, job, message = self.__jobs_repository.store_job(
+            event_id=event_id, job_type=job_type, claimed_ids=claimed_ids
+        )
+        if status != HTTPStatus.OK:
+            return status, message
+
+        job_message = JobMessage(jobType=job_type, eventId=event_id, jobId=job.entryId)
+        try:
+            response = self.__sqs_client.send_message(
+                QueueUrl=self.__sqs_url, MessageBody=job_message.json(), MessageAttributes=message_attributes()
+            )
+        except (BotoCoreError, ClientError) as e:
+            message = f'Failed to enqueue {job_type.value} job for event {event_id}: {str(e)}'
+            logger.error(message)
+            self.__jobs_repository.update_job(job, jobStatus=JobStatus.FAILED.value, message=message)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, message
+
+        logger.info(f'Enqueued {job_type.value} job for event {event_id}: {response.get("MessageId")}')
+        return HTTPStatus.OK, None
+
+    def rerun_job(self, event_id: str, job_type: JobType) -> Union[JSONResponse, JobOut]:
+        """Enqueue a new run of a job, e.g. after its run failed, or the job could not be enqueued when the event
+        status was changed
+
+        :param event_id: The ID of the event the job runs for
+        :type event_id: str
+
+        :param job_type: The type of the job
+        :type job_type: JobType
+
+        :return: The status of the new run or an error message
+        :rtype: Union[JSONResponse, JobOut]
+
+        """
+        status, _, message = self.__events_repository.query_events(event_id=event_id)
+        if status != HTTPStatus.OK:
+            return JSONResponse(status_code=status, content={'message': message})
+
+        status, message = self.enqueue_job(job_type=job_type, event_id=event_id)
+        if status != HTTPStatus.OK:
+            return JSONResponse(status_code=status, content={'message': message})
+
+        return self.get_job(event_id=event_id, job_type=job_type)
+
+    def get_job(self, event_id: str, job_type: JobType) -> Union[JSONResponse, JobOut]:
+        """Get the status of the latest run of a job
+
+        :param event_id: The ID of the event the job runs for
+        :type event_id: str
+
+        :param job_type: The type of the job
+        :type job_type: JobType
+
+        :return: The status of the job or an error message
+        :rtype: Union[JSONResponse, JobOut]
+
+        """
+        status, job, message = self.__jobs_repository.query_job(event_id=event_id, job_type=job_type)
+        if status != HTTPStatus.OK:
+            return JSONResponse(status_code=status, content={'message': message})
+
+        return JobOut(**job.to_simple_dict(), jobId=job.entryId)
+
+    def process_job_messages(self, event: dict) -> Dict[str, List[Dict[str, str]]]:
+        """Run the jobs received from an AWS SQS event
+
+        :param event: The AWS SQS event containing message records.
+        :type event: dict
+
+        :return: The partial batch response listing the message IDs that should be redelivered.
+        :rtype: Dict[str, List[Dict[str, str]]]
+
+        """
+        failed_message_ids = []
+        for record in event.get('Records', []):
+            message_id = record.get('messageId')
+            # the job continues the trace of the request that enqueued it
+            with start_span('JobUsecase.process_job_message', parent=record_parent(record), messageId=message_id):
+                try:
+                    job_message = JobMessage(**json.loads(record['body']))
+                except (ValueError, ValidationError) as e:
+                    # a malformed job never succeeds, so it is dropped instead of redelivered
+                    logger.error(f'Discarding malformed job message {message_id}: {e}')
+                    continue
+
+                if not self.__run_job(job_message):
+                    failed_message_ids.append(message_id)
+
+        return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]}
+
+    def __run_job(self, job_message: JobMessage) -> bool:
+        """Run a single job and record its status
+
+        :param job_message: The job to be run
+        :type job_message: JobMessage
+
+        :return: False if the job failed and should be redelivered, otherwise True
+        :rtype: bool
+
+        """
+        job_label = f'[{job_message.eventId}] {job_message.jobType.value} job'
+        status, job, message = self.__jobs_repository.query_job(
+            event_id=job_message.eventId, job_type=job_message.jobType
+        )
+        if status == HTTPStatus.NOT_FOUND or (status == HTTPStatus.OK and job.entryId != job_message.jobId):
+            logger.info(f'{job_label} {job_message.jobId} was replaced by a newer run, skipping')
+            return True
+        if status != HTTPStatus.OK:
+            logger.error(f'{job_label} could not be loaded: {message}')
+            return False
+        if job.jobStatus == JobStatus.COMPLETED.value:
+            logger.info(f'{job_label} {job.entryId} already completed, skipping')
+            return True
+
+        self.__jobs_repository.update_job(job, jobStatus=JobStatus.RUNNING.value)
+        try:
+            status, message = self.__job_handlers[job_message.jobType](job=job)
+        except Exception as e:
+            status, message = HTTPStatus.INTERNAL_SERVER_ERROR, str(e)
+
+        if status != HTTPStatus.OK:
+            logger.error(f'{job_label} failed: {message}')
+            self.__jobs_repository.update_job(job, jobStatus=JobStatus.FAILED.value, message=message)
+            return False
+
+        self.__jobs_repository.update_job(job, jobStatus=JobStatus.COMPLETED.value, message=None)
+        logger.info(f'{job_label} finished')
+        return True
+
+    def __run_accept_reject_emails_job(self, job: Job) -> Tuple[HTTPStatus, str]:
+        """Send the acceptance and rejection emails of every pre-registration that has not received one
+
+        The acceptanceEmailSent flag of each pre-registration is the checkpoint of this job, and the IDs of the
+        batch being queued are saved as the claimedIds of the job, so a redelivered run queues them again.
+
+        :param job: The job being run
+        :type job: Job
+
+        :return: The status and message
+        :rtype: Tuple[HTTPStatus, str]
+
+        """
+        status, event, message = self.__events_repository.query_events(event_id=job.eventId)
+        if status != HTTPStatus.OK:
+            return status, message
+
+        preregistrations = self.__preregistration_repository.iter_preregistrations(
+            event_id=job.eventId, pending_acceptance_email=True
+        )
+        return self.__email_usecase.send_accept_reject_status_email(
+            preregistrations=preregistrations,
+            event=event,
+            checkpoint_ids=job.claimedIds,
+            save_checkpoint=lambda claimed_ids: self.__save_claimed_ids(job=job, claimed_ids=claimed_ids),
+        )
+
+    def __save_claimed_ids(self, job: Job, claimed_ids: List[str]) -> Tuple[HTTPStatus, str]:
+        """Save the IDs of the items a run claimed but has not confirmed as queued
+
+        :param job: The job being run
+        :type job: Job
+
+        :param claimed_ids: The claimed IDs, an empty list clears them
+        :type claimed_ids: List[str]
+
+        :return: The status and message
+        :rtype: Tuple[HTTPStatus, str]
+
+        """
+        if not claimed_ids and not job.claimedIds:
+            return HTTPStatus.OK, None
+
+        status, _, message = self.__jobs_repository.update_job(job, claimedIds=claimed_ids or None)
+        if status == HTTPStatus.OK:
+            job.claimedIds = claimed_ids or None
+
+        return status, message
+
+    def __run_event_completion_emails_job(self, job: Job) -> Tuple[HTTPStatus, str]:
+        """Send the evaluation email to every participant of a completed event
+
+        Registrations are read one page at a time. The participants of a page not emailed yet are saved as the
+        claimedIds of the job, then marked as emailed with a conditional bulk update, and only the ones this run
+        marked are emailed. Participants that could not be enqueued are unmarked, and the cursor of the next page
+        is saved once the emails of a page are queued, so a redelivered run resumes from the first page not yet
+        sent, after queueing again the claimed participants that are marked as emailed.
+
+        :param job: The job being run
+        :type job: Job
+
+        :return: The status and message
+        :rtype: Tuple[HTTPStatus, str]
+
+        """
+        status, event, message = self.__events_repository.query_events(event_id=job.eventId)
+        if status != HTTPStatus.OK:
+            return status, message
+
+        claim_certificate_url = f'{os.getenv("FRONTEND_URL")}/{job.eventId}/evaluate'
+        if job.claimedIds:
+            status, unconfirmed, message = self.__registration_repository.query_registrations_by_ids(
+                registration_keys=[(job.eventId, registration_id) for registration_id in job.claimedIds]
+            )
+            if status != HTTPStatus.OK:
+                return status, message
+
+            unconfirmed = [registration for registration in unconfirmed if registration.evaluationEmailSent]
+            enqueue_status, stranded_ids, enqueue_message = self.__enqueue_evaluation_emails(
+                event=event, claim_certificate_url=claim_certificate_url, claimed=unconfirmed
+            )
+            status, message = self.__save_claimed_ids(job=job, claimed_ids=stranded_ids)
+            if enqueue_status != HTTPStatus.OK:
+                return enqueue_status, enqueue_message
+            if status != HTTPStatus.OK:
+                return status, message
+
+        cursor = job.cursor
+        while True:
+            status, registrations, next_cursor, message = self.__registration_repository.query_registrations_page(
+                event_id=job.eventId, limit=CommonConstants.JOB_PAGE_SIZE, cursor=cursor
+            )
+            if status == HTTPStatus.NOT_FOUND:
+                return HTTPStatus.OK, None
+            if status != HTTPStatus.OK:
+                return status, message
+
+            claimed = []
+            pending = [entry for entry in registrations if not entry.evaluationEmailSent]
+            if pending:
+                status, message = self.__save_claimed_ids(
+                    job=job, claimed_ids=[entry.registrationId for entry in pending]
+                )
+                if status != HTTPStatus.OK:
+                    return status, message
+
+                claim_status, claimed, claim_message = self.__registration_repository.update_evaluation_email_sent(
+                    registration_entries=pending, evaluation_email_sent=True
+                )
+                enqueue_status, stranded_ids, enqueue_message = self.__enqueue_evaluation_emails(
+                    event=event, claim_certificate_url=claim_certificate_url, claimed=claimed
+                )
+                if claim_status != HTTPStatus.OK or enqueue_status != HTTPStatus.OK:
+                    status, message = self.__save_claimed_ids(job=job, claimed_ids=stranded_ids)
+                    if claim_status != HTTPStatus.OK:
+                        return claim_status, claim_message
+
+                    return enqueue_status, enqueue_message
+
+            status, _, message = self.__jobs_repository.update_job(
+                job,
+                cursor=next_cursor,
+                processedCount=(job.processedCount or 0) + len(claimed),
+                claimedIds=None,
+            )
+            if status != HTTPStatus.OK:
+                return status, message
+
+            if not next_cursor:
+                return HTTPStatus.OK, None
+
+            cursor = next_cursor
+
+    def __enqueue_evaluation_emails(
+        self, event: Event, claim_certificate_url: str, claimed: List[Registration]
+    ) -> Tuple[HTTPStatus, List[str], str]:
+        """Queue the evaluation emails of registrations marked as emailed, and unmark the ones not queued
+
+        :param event: The completed event
+        :type event: Event
+
+        :param claim_certificate_url: The url to claim the certificate
+        :type claim_certificate_url: str
+
+        :param claimed: The registrations marked as emailed
+        :type claimed: List[Registration]
+
+        :return: The status, the IDs of the registrations neither queued nor unmarked, and the message
+        :rtype: Tuple[HTTPStatus, List[str], str]
+
+        """
+        if not claimed:
+            return HTTPStatus.OK, [], None
+
+        status, enqueue_status, message = self.__email_usecase.enqueue_event_completion_email(
+            event=event,
+            claim_certificate_url=claim_certificate_url,
+            participants=[registration.email for registration in claimed],
+            deduplication_keys={registration.email.lower(): registration.registrationId for registration in claimed},
+        )
+        if status != HTTPStatus.OK and not enqueue_status:
+            failed = claimed
+        else:
+            failed_recipients = {
+                recipient.lower() for recipient, is_enqueued in enqueue_status.items() if not is_enqueued
+            }
+            failed = [registration for registration in claimed if registration.email.lower() in failed_recipients]
+
+        if not failed:
+            return HTTPStatus.OK, [], None
+
+        message = message or f'Failed to queue evaluation emails for {len(failed)} registrations'
+        revert_status, reverted, revert_message = self.__registration_repository.update_evaluation_email_sent(
+            registration_entries=failed, evaluation_email_sent=False
+        )
+        if revert_status == HTTPStatus.OK:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, [], message
+
+        # these stay marked as emailed, the next run queues them again from the claimedIds of the job
+        reverted_ids = {registration.registrationId for registration in reverted}
+        stranded_ids = [
+            registration.registrationId for registration in failed if registration.registrationId not in reverted_ids
+        ]
+        logger.error(f'Registrations of event {event.eventId} marked as emailed but not emailed: {stranded_ids}')
+        return revert_status, stranded_ids, revert_message
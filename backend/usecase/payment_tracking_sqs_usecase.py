@@ -1,33 +1,80 @@
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Dict, List
 
-import boto3
 from usecase.payment_tracking_usecase import PaymentTrackingUsecase
 from utils.logger import logger
+from utils.tracing import record_parent, start_span, traced
 
 
+@traced
 class PaymentTrackingSQSUsecase:
     def __init__(self):
-        self.SQS_CLIENT = boto3.client('sqs')
-        self.PAYMENT_QUEUE = os.environ.get('PAYMENT_QUEUE')
         self.payment_tracking_usecase = PaymentTrackingUsecase()
+        self.max_workers = int(os.getenv('PAYMENT_CONSUMER_CONCURRENCY', '4'))
 
-    def process_payment_message(self, event: dict) -> None:
+    def process_payment_message(self, event: dict) -> Dict[str, List[Dict[str, str]]]:
         """
         Processes payment messages received from an AWS SQS event and updates the transactionStatus of a payment_transaction.
 
+        Records are grouped by their FIFO MessageGroupId. Groups are processed concurrently, while the records of
+        a group are processed in order. Once a record fails, the rest of its group is reported as failed without
+        being processed, so that SQS redelivers them in their original order.
+
+        Successful records are not deleted here, Lambda deletes every record that is not reported as failed.
+
         :param event: The AWS SQS event containing message records.
-        :return: None
+        :type event: dict
+
+        :return: The partial batch response listing the message IDs that should be redelivered.
+        :rtype: Dict[str, List[Dict[str, str]]]
 
-        Logs errors encountered during message processing and successful deletion of SQS messages.
         """
+        record_groups = {}
         for record in event.get('Records', []):
-            receipt_handle = record.get('receiptHandle')
-            message_body = json.loads(record['body'])
+            message_group_id = record.get('attributes', {}).get('MessageGroupId', record.get('messageId'))
+            record_groups.setdefault(message_group_id, []).append(record)
+
+        failed_message_ids = []
+        if record_groups:
+            max_workers = max(1, min(self.max_workers, len(record_groups)))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # each group runs in a copy of the current context, so its AWS calls count towards the invocation
+                futures = [
+                    executor.submit(copy_context().run, self.__process_record_group, records)
+                    for records in record_groups.values()
+                ]
+                for future in futures:
+                    failed_message_ids.extend(future.result())
+
+        if failed_message_ids:
+            logger.error(f'{len(failed_message_ids)} payment message(s) will be redelivered: {failed_message_ids}')
 
-            self.payment_tracking_usecase.process_payment_event(message_body)
+        return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]}
+
+    def __process_record_group(self, records: List[dict]) -> List[str]:
+        """Process the records of one message group in order
+
+        :param records: The records that share a MessageGroupId, in the order they were received.
+        :type records: List[dict]
+
+        :return: The message IDs of the failed record and of every record after it.
+        :rtype: List[str]
+
+        """
+        for index, record in enumerate(records):
+            message_id = record.get('messageId')
+            # a message sent with a trace context continues the trace of its producer
+            with start_span(
+                'PaymentTrackingSQSUsecase.process_payment_record', parent=record_parent(record), messageId=message_id
+            ):
+                try:
+                    message_body = json.loads(record['body'])
+                    self.payment_tracking_usecase.process_payment_event(message_body)
+                except Exception as e:
+                    logger.error(f'Failed to process payment message {message_id}: {e}')
+                    return [remaining_record.get('messageId') for remaining_record in records[index:]]
 
-            # finally:
-            if receipt_handle:
-                self.SQS_CLIENT.delete_message(QueueUrl=self.PAYMENT_QUEUE, ReceiptHandle=receipt_handle)
-                logger.info(f'SQS message with receipt handle {receipt_handle} deleted.')
+        return []
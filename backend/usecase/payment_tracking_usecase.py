@@ -13,8 +13,10 @@ from repository.payment_transaction_repository import PaymentTransactionReposito
 from repository.registrations_repository import RegistrationsRepository
 from usecase.email_usecase import EmailUsecase
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class PaymentTrackingUsecase:
     def __init__(self):
         self.registration_repository = RegistrationsRepository()
@@ -56,6 +58,9 @@ class PaymentTrackingUsecase:
 
             if status != HTTPStatus.OK:
                 logger.error(f'Failed to update payment transaction status for entryId {entry_id}: {msg}')
+                if status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                    # let SQS redeliver the message instead of dropping the payment update
+                    raise RuntimeError(msg)
                 return
 
             logger.info(f'Payment transaction status updated to {transaction_status} for entryId {entry_id}')
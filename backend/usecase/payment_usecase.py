@@ -1,10 +1,12 @@
 import os
 from http import HTTPStatus
+from typing import Union
 
 from model.email.email import EmailIn, EmailType
 from model.payments.payments import (
     PaymentTransactionIn,
     PaymentTransactionOut,
+    PaymentTransactionPageOut,
     TransactionStatus,
 )
 from model.pycon_registrations.pycon_registration import (
@@ -21,8 +23,10 @@ from starlette.responses import JSONResponse
 from usecase.email_usecase import EmailUsecase
 from usecase.pycon_registration_usecase import PyconRegistrationUsecase
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class PaymentUsecase:
     def __init__(self):
         self.payment_repo = PaymentTransactionRepository()
@@ -84,14 +88,25 @@ class PaymentUsecase:
         payment_transaction_dict = self.__convert_data_entry_to_dict(updated_payment_transaction)
         return PaymentTransactionOut(**payment_transaction_dict)
 
-    def query_pending_payment_transactions(self) -> list[PaymentTransactionOut]:
+    def query_pending_payment_transactions(
+        self, older_than_minutes: int = None, limit: int = None, cursor: str = None
+    ) -> Union[list[PaymentTransactionOut], PaymentTransactionPageOut]:
         """
-        Query all pending payment transactions
+        Query pending payment transactions, oldest first
+
+        Arguments:
+            older_than_minutes -- Only include transactions created at least this many minutes ago
+            limit -- The maximum number of transactions in the page
+            cursor -- The cursor returned with the previous page
 
         Returns:
-            list[PaymentTransactionOut] -- The list of payment transactions
+            list[PaymentTransactionOut] -- The list of payment transactions, when neither limit nor cursor is given
+            PaymentTransactionPageOut -- The page of payment transactions and the cursor of the next page
         """
-        status, payment_transactions, message = self.payment_repo.query_pending_payment_transactions()
+        paginated = limit is not None or cursor is not None
+        status, payment_transactions, next_cursor, message = self.payment_repo.query_pending_payment_transactions(
+            older_than_minutes=older_than_minutes, limit=limit, cursor=cursor
+        )
         if status != HTTPStatus.OK:
             logger.error(f'[{message}]')
             return JSONResponse(status_code=status, content={'message': message})
@@ -112,6 +127,9 @@ class PaymentUsecase:
 
             payment_transaction_list.append(payment_transaction_out)
 
+        if paginated:
+            return PaymentTransactionPageOut(paymentTransactions=payment_transaction_list, nextCursor=next_cursor)
+
         return payment_transaction_list
 
     def payment_callback(self, payment_transaction_id: str, event_id: str):
@@ -1,6 +1,3 @@
-import csv
-import os
-import tempfile
 from http import HTTPStatus
 from typing import List, Union
 
@@ -8,6 +5,7 @@ import ulid
 from model.events.events_constants import EventStatus
 from model.file_uploads.file_upload import FileDownloadOut
 from model.preregistrations.preregistration import (
+    PreRegistration,
     PreRegistrationIn,
     PreRegistrationOut,
     PreRegistrationPatch,
@@ -15,11 +13,12 @@ from model.preregistrations.preregistration import (
 from repository.events_repository import EventsRepository
 from repository.preregistrations_repository import PreRegistrationsRepository
 from starlette.responses import JSONResponse
+from usecase.csv_export_usecase import CsvExportUsecase
 from usecase.email_usecase import EmailUsecase
-from usecase.file_s3_usecase import FileS3Usecase
-from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class PreRegistrationUsecase:
     """
     Handles the business logic for managing pre-registration entries.
@@ -34,7 +33,7 @@ class PreRegistrationUsecase:
         self.__preregistrations_repository = PreRegistrationsRepository()
         self.__events_repository = EventsRepository()
         self.__email_usecase = EmailUsecase()
-        self.__file_s3_usecase = FileS3Usecase()
+        self.__csv_export_usecase = CsvExportUsecase()
 
     def create_preregistration(self, preregistration_in: PreRegistrationIn) -> Union[JSONResponse, PreRegistrationOut]:
         """Creates a new pre-registration entry.
@@ -257,46 +256,26 @@ class PreRegistrationUsecase:
 
         return None
 
-    def get_preregistration_csv(self, event_id: str) -> FileDownloadOut:
+    def get_preregistration_csv(self, event_id: str, stream: bool = False) -> Union[JSONResponse, FileDownloadOut]:
         """Returns the FileDownloadOut of the CSV for the specified event
 
+        Pre-registrations are read page by page and encoded as they are uploaded, so memory use
+        does not grow with the size of the event.
+
         :param event_id: The event pre-registrations to be queried
         :type event_id: str
 
-        :return: FileDownloadOut for the CSV
-        :rtype: FileDownloadOut
-        """
-        # Get preregistrations for an event
-        status, preregistrations, message = self.__preregistrations_repository.query_preregistrations(event_id=event_id)
-
-        if status != HTTPStatus.OK:
-            return JSONResponse(status_code=status, content={'message': message})
-
-        try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                csv_path = os.path.join(tmpdir, 'preregistrations.csv')
-
-                with open(csv_path, 'w') as temp:
-                    writer = csv.writer(temp)
+        :param stream: If True, returns the CSV as a StreamingResponse instead of uploading it to S3
+        :type stream: bool
 
-                    # make the first row csv for the keys using the dict keys of the first entry
-                    first_entry = self.__convert_data_entry_to_dict(preregistrations[0])
-                    writer.writerow(first_entry.keys())
-
-                    # the remaining rows consist of the values of the attributes
-                    for entry in preregistrations:
-                        entry_dict = self.__convert_data_entry_to_dict(entry)
-                        writer.writerow(entry_dict.values())
-
-                # upload the file to s3
-                csv_object_key = f'csv/preregistrations/{event_id}.csv'
-                self.__file_s3_usecase.upload_file(file_name=csv_path, object_name=csv_object_key)
-
-                return self.__file_s3_usecase.create_download_url(csv_object_key)
-
-        except Exception as e:
-            logger.error(f'Error generating the CSV for {event_id}: {e}')
-            return
+        :return: FileDownloadOut for the CSV, or a StreamingResponse of the CSV if stream is set
+        :rtype: Union[JSONResponse, FileDownloadOut]
+        """
+        preregistrations = self.__preregistrations_repository.iter_preregistrations(event_id=event_id)
+        csv_object_key = f'csv/preregistrations/{event_id}.csv'
+        return self.__csv_export_usecase.export_csv(
+            entries=preregistrations, model=PreRegistration, object_key=csv_object_key, stream=stream
+        )
 
     @staticmethod
     def __convert_data_entry_to_dict(data_entry):
@@ -9,8 +9,10 @@ from repository.events_repository import EventsRepository
 from repository.registrations_repository import RegistrationsRepository
 from usecase.email_usecase import EmailUsecase
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class PyConRegistrationEmailNotification:
     def __init__(self):
         self.__email_usecase = EmailUsecase()
@@ -1,6 +1,3 @@
-import csv
-import os
-import tempfile
 from http import HTTPStatus
 from typing import List, Union
 
@@ -12,17 +9,22 @@ from model.pycon_registrations.pycon_registration import (
     PyconRegistrationOut,
     PyconRegistrationPatch,
 )
+from model.registrations.registration import Registration
+from repository.counter_shards_repository import CounterShardsRepository
 from repository.events_repository import EventsRepository
 from repository.payment_transaction_repository import PaymentTransactionRepository
 from repository.registrations_repository import RegistrationsRepository
 from repository.ticket_type_repository import TicketTypeRepository
 from starlette.responses import JSONResponse
+from usecase.csv_export_usecase import CsvExportUsecase
 from usecase.discount_usecase import DiscountUsecase
 from usecase.email_usecase import EmailUsecase
 from usecase.file_s3_usecase import FileS3Usecase
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class PyconRegistrationUsecase:
     """
     Handles the business logic for managing PyCon-specific registration entries.
@@ -36,10 +38,12 @@ class PyconRegistrationUsecase:
 
     def __init__(self):
         self.__registrations_repository = RegistrationsRepository()
+        self.__counter_shards_repository = CounterShardsRepository()
         self.__events_repository = EventsRepository()
         self.__email_usecase = EmailUsecase()
         self.__discount_usecase = DiscountUsecase()
         self.__file_s3_usecase = FileS3Usecase()
+        self.__csv_export_usecase = CsvExportUsecase()
         self.__ticket_type_repository = TicketTypeRepository()
         self.__payment_transaction_repository = PaymentTransactionRepository()
 
@@ -126,7 +130,7 @@ class PyconRegistrationUsecase:
             return self.collect_pre_signed_url_pycon(registration_out)
 
         # check if ticket types in event exists
-        future_registrations = event.registrationCount
+        future_registrations = self.__counter_shards_repository.get_event_registration_count(event)
         if event.isLimitedSlot and future_registrations >= event.maximumSlots:
             # check if registration count in event is full
             return JSONResponse(
@@ -149,44 +153,39 @@ class PyconRegistrationUsecase:
             if status != HTTPStatus.OK:
                 return JSONResponse(status_code=status, content={'message': message})
 
-            if ticket_type_entry.currentSales >= ticket_type_entry.maximumQuantity:
+            current_sales = self.__counter_shards_repository.get_ticket_type_sales(ticket_type_entry)
+            if current_sales >= ticket_type_entry.maximumQuantity:
                 return JSONResponse(
                     status_code=HTTPStatus.BAD_REQUEST,
                     content={'message': f'Ticket type {ticket_type_entry.name} is sold out'},
                 )
 
         registration_id = ulid.ulid()
+        discount_entry = None
         discount_code = registration_in.discountCode
         if discount_code:
-            claimed_discount = self.__discount_usecase.claim_discount(
-                entry_id=discount_code,
-                registration_id=registration_id,
-                event_id=event_id,
+            discount_entry = self.__discount_usecase.get_claimable_discount(
+                event_id=event_id, entry_id=discount_code, registration_id=registration_id
             )
-            if isinstance(claimed_discount, JSONResponse):
-                return claimed_discount
+            if isinstance(discount_entry, JSONResponse):
+                return discount_entry
 
+        # registration, event and ticket type counters, and the discount claim are written in one transaction
         (
             status,
             registration,
             message,
-        ) = self.__registrations_repository.store_registration(
-            registration_in=registration_in, registration_id=registration_id
+        ) = self.__registrations_repository.commit_registration(
+            registration_in=registration_in,
+            registration_id=registration_id,
+            event_entry=event,
+            ticket_type_entry=ticket_type_entry,
+            discount_entry=discount_entry,
         )
+        self.__events_repository.invalidate_cached_event(event_id=event_id)
         if status != HTTPStatus.OK:
             return JSONResponse(status_code=status, content={'message': message})
 
-        status, __, message = self.__events_repository.append_event_registration_count(event_entry=event)
-        if status != HTTPStatus.OK:
-            return JSONResponse(status_code=status, content={'message': message})
-
-        if ticket_type_entry:
-            status, __, message = self.__ticket_type_repository.append_ticket_type_sales(
-                ticket_type_entry=ticket_type_entry
-            )
-            if status != HTTPStatus.OK:
-                return JSONResponse(status_code=status, content={'message': message})
-
         registration_data = self.__convert_data_entry_to_dict(registration)
 
         if not registration.registrationEmailSent:
@@ -324,51 +323,27 @@ class PyconRegistrationUsecase:
         if status != HTTPStatus.OK:
             return JSONResponse(status_code=status, content={'message': message})
 
-        return [
-            self.collect_pre_signed_url_pycon(PyconRegistrationOut(**self.__convert_data_entry_to_dict(registration)))
-            for registration in registrations
-        ]
+        return self.collect_pre_signed_urls_pycon(
+            [PyconRegistrationOut(**self.__convert_data_entry_to_dict(registration)) for registration in registrations]
+        )
 
-    def get_pycon_registration_csv(self, event_id: str) -> FileDownloadOut:
+    def get_pycon_registration_csv(self, event_id: str, stream: bool = False) -> Union[JSONResponse, FileDownloadOut]:
         """Returns the FileDownloadOut of the CSV for the specified PyCon event
 
         :param event_id: The event registrations to be queried
         :type event_id: str
 
-        :return: FileDownloadOut for the CSV
-        :rtype: FileDownloadOut
-        """
-        # Get registrations for a PyCon event
-        status, registrations, message = self.__registrations_repository.query_registrations(event_id=event_id)
-
-        if status != HTTPStatus.OK:
-            return JSONResponse(status_code=status, content={'message': message})
-
-        try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                csv_path = os.path.join(tmpdir, 'pycon_registrations.csv')
-
-                with open(csv_path, 'w') as temp:
-                    writer = csv.writer(temp)
+        :param stream: If True, returns the CSV as a StreamingResponse instead of uploading it to S3
+        :type stream: bool
 
-                    # make the first row csv for the keys using the dict keys of the first entry
-                    first_entry = self.__convert_data_entry_to_dict(registrations[0])
-                    writer.writerow(first_entry.keys())
-
-                    # the remaining rows consist of the values of the attributes
-                    for entry in registrations:
-                        entry_dict = self.__convert_data_entry_to_dict(entry)
-                        writer.writerow(entry_dict.values())
-
-                # upload the file to s3
-                csv_object_key = f'csv/pycon_registrations/{event_id}.csv'
-                self.__file_s3_usecase.upload_file(file_name=csv_path, object_name=csv_object_key)
-
-                return self.__file_s3_usecase.create_download_url(csv_object_key)
-
-        except Exception as e:
-            logger.error(f'Error generating the PyCon CSV for {event_id}: {e}')
-            return
+        :return: FileDownloadOut for the CSV, or a StreamingResponse of the CSV if stream is set
+        :rtype: Union[JSONResponse, FileDownloadOut]
+        """
+        registrations = self.__registrations_repository.iter_registrations(event_id=event_id)
+        csv_object_key = f'csv/pycon_registrations/{event_id}.csv'
+        return self.__csv_export_usecase.export_csv(
+            entries=registrations, model=Registration, object_key=csv_object_key, stream=stream
+        )
 
     def delete_pycon_registration(self, event_id: str, registration_id: str) -> Union[None, JSONResponse]:
         """Deletes a specific PyCon registration entry by its ID.
@@ -413,11 +388,31 @@ class PyconRegistrationUsecase:
         :rtype: PyconRegistrationOut
 
         """
-        if registration.validIdObjectKey:
-            image_id_url = self.__file_s3_usecase.create_download_url(registration.validIdObjectKey)
-            registration.imageIdUrl = image_id_url.downloadLink
+        return self.collect_pre_signed_urls_pycon([registration], cached=False)[0]
+
+    def collect_pre_signed_urls_pycon(
+        self, registrations: List[PyconRegistrationOut], cached: bool = True
+    ) -> List[PyconRegistrationOut]:
+        """Collects the pre-signed URLs for the valid ID images of a list of PyCon registrations in one call.
+
+        :param registrations: The PyCon registration entries to be updated.
+        :type registrations: List[PyconRegistrationOut]
+
+        :param cached: Whether the links may be the long-lived cached ones of list responses
+        :type cached: bool
+
+        :return: The updated registration entries with the pre-signed URLs for the valid ID images.
+        :rtype: List[PyconRegistrationOut]
+
+        """
+        download_urls = self.__file_s3_usecase.create_download_urls(
+            (registration.validIdObjectKey for registration in registrations), cached=cached
+        )
+        for registration in registrations:
+            if registration.validIdObjectKey:
+                registration.imageIdUrl = download_urls.get(registration.validIdObjectKey)
 
-        return registration
+        return registrations
 
     def resend_confirmation_email(self, event_id: str, email: str):
         """Resends the registration confirmation email for a specific PyCon registration entry.
@@ -1,6 +1,3 @@
-import csv
-import os
-import tempfile
 from http import HTTPStatus
 from typing import List, Union
 
@@ -13,21 +10,27 @@ from model.file_uploads.file_upload import FileDownloadOut
 from model.konfhub.konfhub import KonfHubCaptureRegistrationIn, RegistrationDetail
 from model.registrations.registration import (
     PreRegistrationToRegistrationIn,
+    Registration,
     RegistrationIn,
     RegistrationOut,
+    RegistrationPageOut,
 )
+from repository.counter_shards_repository import CounterShardsRepository
 from repository.events_repository import EventsRepository
 from repository.payment_transaction_repository import PaymentTransactionRepository
 from repository.registrations_repository import RegistrationsRepository
 from repository.ticket_type_repository import TicketTypeRepository
 from starlette.responses import JSONResponse
+from usecase.csv_export_usecase import CsvExportUsecase
 from usecase.discount_usecase import DiscountUsecase
 from usecase.email_usecase import EmailUsecase
 from usecase.file_s3_usecase import FileS3Usecase
 from usecase.preregistration_usecase import PreRegistrationUsecase
 from utils.logger import logger
+from utils.tracing import traced
 
 
+@traced
 class RegistrationUsecase:
     """
     Handles the business logic for managing registration entries.
@@ -40,10 +43,12 @@ class RegistrationUsecase:
 
     def __init__(self):
         self.__registrations_repository = RegistrationsRepository()
+        self.__counter_shards_repository = CounterShardsRepository()
         self.__events_repository = EventsRepository()
         self.__email_usecase = EmailUsecase()
         self.__discount_usecase = DiscountUsecase()
         self.__file_s3_usecase = FileS3Usecase()
+        self.__csv_export_usecase = CsvExportUsecase()
         self.__preregistration_usecase = PreRegistrationUsecase()
         self.__ticket_type_repository = TicketTypeRepository()
         self.__konfhub_gateway = KonfHubGateway()
@@ -108,7 +113,7 @@ class RegistrationUsecase:
             return self.collect_pre_signed_url(registration_out)
 
         # check if ticket types in event exists
-        future_registrations = event.registrationCount
+        future_registrations = self.__counter_shards_repository.get_event_registration_count(event)
         if event.isLimitedSlot and future_registrations >= event.maximumSlots:
             # check if registration count in event is full
             return JSONResponse(
@@ -131,44 +136,39 @@ class RegistrationUsecase:
             if status != HTTPStatus.OK:
                 return JSONResponse(status_code=status, content={'message': message})
 
-            if ticket_type_entry.currentSales >= ticket_type_entry.maximumQuantity:
+            current_sales = self.__counter_shards_repository.get_ticket_type_sales(ticket_type_entry)
+            if current_sales >= ticket_type_entry.maximumQuantity:
                 return JSONResponse(
                     status_code=HTTPStatus.BAD_REQUEST,
                     content={'message': f'Ticket type {ticket_type_entry.name} is sold out'},
                 )
 
         registration_id = ulid.ulid()
+        discount_entry = None
         discount_code = registration_in.discountCode
         if discount_code:
-            claimed_discount = self.__discount_usecase.claim_discount(
-                entry_id=discount_code,
-                registration_id=registration_id,
-                event_id=event_id,
+            discount_entry = self.__discount_usecase.get_claimable_discount(
+                event_id=event_id, entry_id=discount_code, registration_id=registration_id
             )
-            if isinstance(claimed_discount, JSONResponse):
-                return claimed_discount
+            if isinstance(discount_entry, JSONResponse):
+                return discount_entry
 
+        # registration, event and ticket type counters, and the discount claim are written in one transaction
         (
             status,
             registration,
             message,
-        ) = self.__registrations_repository.store_registration(
-            registration_in=registration_in, registration_id=registration_id
+        ) = self.__registrations_repository.commit_registration(
+            registration_in=registration_in,
+            registration_id=registration_id,
+            event_entry=event,
+            ticket_type_entry=ticket_type_entry,
+            discount_entry=discount_entry,
         )
+        self.__events_repository.invalidate_cached_event(event_id=event_id)
         if status != HTTPStatus.OK:
             return JSONResponse(status_code=status, content={'message': message})
 
-        status, __, message = self.__events_repository.append_event_registration_count(event_entry=event)
-        if status != HTTPStatus.OK:
-            return JSONResponse(status_code=status, content={'message': message})
-
-        if ticket_type_entry:
-            status, __, message = self.__ticket_type_repository.append_ticket_type_sales(
-                ticket_type_entry=ticket_type_entry
-            )
-            if status != HTTPStatus.OK:
-                return JSONResponse(status_code=status, content={'message': message})
-
         # Capture registration to KonfHub
         if event.konfhubId:
             konfhub_response = self.register_konfhub(registration_in=registration_in, event_id=event_id, event=event)
@@ -367,51 +367,68 @@ class RegistrationUsecase:
         if status != HTTPStatus.OK:
             return JSONResponse(status_code=status, content={'message': message})
 
-        return [
-            self.collect_pre_signed_url(RegistrationOut(**self.__convert_data_entry_to_dict(registration)))
-            for registration in registrations
-        ]
+        return self.collect_pre_signed_urls(
+            [RegistrationOut(**self.__convert_data_entry_to_dict(registration)) for registration in registrations]
+        )
 
-    def get_registration_csv(self, event_id: str) -> FileDownloadOut:
-        """Returns the FileDownloadOut of the CSV for the specified event
+    def get_registrations_page(
+        self, event_id: str = None, is_deleted: bool = False, limit: int = None, cursor: str = None
+    ) -> Union[JSONResponse, RegistrationPageOut]:
+        """Retrieves a single page of registration entries.
 
-        :param event_id: The event registrations to be queried
-        :type event_id: str
+        :param event_id: If provided, only retrieves registration entries for the specified event. If not provided, retrieves all registration entries.
+        :type event_id: str, optional
 
-        :return: FileDownloadOut for the CSV
-        :rtype: FileDownloadOut
-        """
-        # Get preregistrations for an event
-        status, registrations, message = self.__registrations_repository.query_registrations(event_id=event_id)
+        :param limit: The maximum number of registration entries in the page.
+        :type limit: int, optional
+
+        :param cursor: The cursor returned with the previous page. If not provided, retrieves the first page.
+        :type cursor: str, optional
+
+        :return: If successful, returns the page of registration entries and the cursor of the next page. If unsuccessful, returns a JSONResponse with an error message.
+        :rtype: Union[JSONResponse, RegistrationPageOut]
 
+        """
+        status, _, message = self.__events_repository.query_events(event_id=event_id)
         if status != HTTPStatus.OK:
             return JSONResponse(status_code=status, content={'message': message})
 
-        try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                csv_path = os.path.join(tmpdir, 'registrations.csv')
+        (
+            status,
+            registrations,
+            next_cursor,
+            message,
+        ) = self.__registrations_repository.query_registrations_page(
+            event_id=event_id, is_deleted=is_deleted, limit=limit, cursor=cursor
+        )
+        if status != HTTPStatus.OK:
+            return JSONResponse(status_code=status, content={'message': message})
 
-                with open(csv_path, 'w') as temp:
-                    writer = csv.writer(temp)
+        registrations_out = self.collect_pre_signed_urls(
+            [RegistrationOut(**self.__convert_data_entry_to_dict(registration)) for registration in registrations]
+        )
+        return RegistrationPageOut(registrations=registrations_out, nextCursor=next_cursor)
 
-                    # make the first row csv for the keys using the dict keys of the first entry
-                    first_entry = self.__convert_data_entry_to_dict(registrations[0])
-                    writer.writerow(first_entry.keys())
+    def get_registration_csv(self, event_id: str, stream: bool = False) -> Union[JSONResponse, FileDownloadOut]:
+        """Returns the FileDownloadOut of the CSV for the specified event
 
-                    # the remaining rows consist of the values of the attributes
-                    for entry in registrations:
-                        entry_dict = self.__convert_data_entry_to_dict(entry)
-                        writer.writerow(entry_dict.values())
+        Registrations are read page by page and encoded as they are uploaded, so memory use
+        does not grow with the size of the event.
 
-                # upload the file to s3
-                csv_object_key = f'csv/registrations/{event_id}.csv'
-                self.__file_s3_usecase.upload_file(file_name=csv_path, object_name=csv_object_key)
+        :param event_id: The event registrations to be queried
+        :type event_id: str
 
-                return self.__file_s3_usecase.create_download_url(csv_object_key)
+        :param stream: If True, returns the CSV as a StreamingResponse instead of uploading it to S3
+        :type stream: bool
 
-        except Exception as e:
-            logger.error(f'Error generating the CSV for {event_id}: {e}')
-            return
+        :return: FileDownloadOut for the CSV, or a StreamingResponse of the CSV if stream is set
+        :rtype: Union[JSONResponse, FileDownloadOut]
+        """
+        registrations = self.__registrations_repository.iter_registrations(event_id=event_id)
+        csv_object_key = f'csv/registrations/{event_id}.csv'
+        return self.__csv_export_usecase.export_csv(
+            entries=registrations, model=Registration, object_key=csv_object_key, stream=stream
+        )
 
     def delete_registration(self, event_id: str, registration_id: str) -> Union[None, JSONResponse]:
         """Deletes a specific registration entry by its ID.
@@ -456,11 +473,31 @@ class RegistrationUsecase:
         :rtype: RegistrationOut
 
         """
-        if registration.gcashPaymentId:
-            image_id_url = self.__file_s3_usecase.create_download_url(registration.gcashPaymentId)
-            registration.gcashPaymentUrl = image_id_url.downloadLink
+        return self.collect_pre_signed_urls([registration], cached=False)[0]
 
-        return registration
+    def collect_pre_signed_urls(
+        self, registrations: List[RegistrationOut], cached: bool = True
+    ) -> List[RegistrationOut]:
+        """Collects the pre-signed URLs for the GCash payment images of a list of registrations in one call.
+
+        :param registrations: The registration entries to be updated.
+        :type registrations: List[RegistrationOut]
+
+        :param cached: Whether the links may be the long-lived cached ones of list responses
+        :type cached: bool
+
+        :return: The updated registration entries with the pre-signed URLs for the GCash payment images.
+        :rtype: List[RegistrationOut]
+
+        """
+        download_urls = self.__file_s3_usecase.create_download_urls(
+            (registration.gcashPayment for registration in registrations), cached=cached
+        )
+        for registration in registrations:
+            if registration.gcashPayment:
+                registration.gcashPaymentUrl = download_urls.get(registration.gcashPayment)
+
+        return registrations
 
     def collect_pre_signed_url_pycon(self, registration: RegistrationOut) -> RegistrationOut:
         """Collects the pre-signed URL for the valid ID image.
@@ -473,8 +510,8 @@ class RegistrationUsecase:
 
         """
         if registration.validIdObjectKey:
-            image_id_url = self.__file_s3_usecase.create_download_url(registration.validIdObjectKey)
-            registration.imageIdUrl = image_id_url.downloadLink
+            download_urls = self.__file_s3_usecase.create_download_urls([registration.validIdObjectKey], cached=False)
+            registration.imageIdUrl = download_urls.get(registration.validIdObjectKey)
 
         return registration
 
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    A small in-process LRU cache whose entries also expire after a fixed time-to-live.
+
+    Instances are meant to be created at module or class level so that they survive across
+    warm Lambda invocations of the same container.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept before the least recently used is evicted.
+        ttl (float): The number of seconds an entry stays valid after it is set.
+        hits (int): The number of lookups served from the cache.
+        misses (int): The number of lookups that were absent or expired.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 60) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a value from the cache.
+
+        :param key: The key of the entry.
+        :type key: Hashable
+
+        :return: The cached value, or None if it is absent or expired.
+        :rtype: Optional[Any]
+
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self.__entries[key]
+                self.misses += 1
+                return None
+
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Set a value in the cache, evicting the least recently used entry if full.
+
+        :param key: The key of the entry.
+        :type key: Hashable
+
+        :param value: The value to be cached.
+        :type value: Any
+
+        """
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+
+        with self.__lock:
+            self.__entries[key] = (time.monotonic() + self.ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove an entry from the cache.
+
+        :param key: The key of the entry.
+        :type key: Hashable
+
+        """
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache and reset the counters."""
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache counters.
+
+        :return: The hit and miss counts and the current number of entries.
+        :rtype: Dict[str, int]
+
+        """
+        with self.__lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.__entries)}
@@ -0,0 +1,349 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+from botocore.handlers import BUILTIN_HANDLERS
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_ENABLED = os.getenv('PERFORMANCE_METRICS', 'true').lower() == 'true'
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'DurianPyEvents')
+FUNCTION_NAME = os.getenv('AWS_LAMBDA_FUNCTION_NAME', 'local')
+
+# the services with their own metrics, every other AWS call still counts towards AWSCalls
+SERVICE_LABELS = {'dynamodb': 'DynamoDB', 's3': 'S3', 'sqs': 'SQS'}
+
+# the packages whose methods make the AWS calls, the innermost one on the stack is the caller of a call
+CALLER_PACKAGES = ('repository.', 'usecase.', 'external_gateway.')
+
+# the botocore request context key of the call being timed
+CALL_CONTEXT_KEY = 'performance_metrics_call'
+
+# the metrics of the request or invocation being served
+current_metrics: ContextVar[Optional['RequestMetrics']] = ContextVar('current_metrics', default=None)
+
+__cold_start = True
+__cold_start_lock = threading.Lock()
+__route_paths: Dict[Callable, str] = {}
+
+
+class RequestMetrics:
+    """
+    The wall time of one API request or Lambda invocation, and the count and latency of its AWS calls.
+
+    Every AWS call is attributed to the repository or usecase method that made it. emit writes the request and
+    each of those methods as CloudWatch Embedded Metric Format documents on stdout, so that CloudWatch derives
+    the metrics from the log stream without a PutMetricData call.
+
+    Attributes:
+        route (str): The route template of the request, or the module of the Lambda handler.
+        cold_start (bool): Whether this is the first request or invocation of the container.
+        properties (dict): Values that are logged with the metrics but are not metrics themselves.
+    """
+
+    # the documents of concurrent requests are written whole, one after the other
+    __emit_lock = threading.Lock()
+
+    def __init__(self, route: str = None, cold_start: bool = False) -> None:
+        self.route = route
+        self.cold_start = cold_start
+        self.properties = {}
+        self.__start = time.perf_counter()
+        self.__calls = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'errors': 0})
+        self.__lock = threading.Lock()
+
+    def add_call(self, caller: str, service: str, operation: str, seconds: float, failed: bool = False) -> None:
+        """Add an AWS call, from any thread that serves the request.
+
+        :param caller: The qualified name of the method that made the call, e.g. RegistrationsRepository.query.
+        :type caller: str
+
+        :param service: The botocore service name, e.g. dynamodb.
+        :type service: str
+
+        :param operation: The operation name, e.g. Query.
+        :type operation: str
+
+        :param seconds: The latency of the call, retries included.
+        :type seconds: float
+
+        :param failed: Whether the call failed, with an error response or without a response.
+        :type failed: bool
+
+        """
+        with self.__lock:
+            call = self.__calls[caller, service, operation]
+            call['count'] += 1
+            call['seconds'] += seconds
+            call['errors'] += int(failed)
+
+    def to_documents(self) -> List[dict]:
+        """Build the EMF documents of the request and of each method that made AWS calls.
+
+        :return: The EMF documents, the one of the request first.
+        :rtype: List[dict]
+
+        """
+        duration_ms = (time.perf_counter() - self.__start) * 1000
+        with self.__lock:
+            calls = sorted(self.__calls.items())
+
+        metrics = {'Duration': (duration_ms, 'Milliseconds'), 'ColdStart': (int(self.cold_start), 'Count')}
+        for label in SERVICE_LABELS.values():
+            metrics[f'{label}Calls'] = (0, 'Count')
+            metrics[f'{label}Time'] = (0.0, 'Milliseconds')
+        metrics['AWSCalls'] = (sum(call['count'] for _, call in calls), 'Count')
+        metrics['AWSCallErrors'] = (sum(call['errors'] for _, call in calls), 'Count')
+
+        caller_calls = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'operations': []})
+        breakdown = []
+        for (caller, service, operation), call in calls:
+            label = SERVICE_LABELS.get(service)
+            if label:
+                metrics[f'{label}Calls'] = (metrics[f'{label}Calls'][0] + call['count'], 'Count')
+                metrics[f'{label}Time'] = (metrics[f'{label}Time'][0] + call['seconds'] * 1000, 'Milliseconds')
+
+            caller_calls[caller]['count'] += call['count']
+            caller_calls[caller]['seconds'] += call['seconds']
+            caller_calls[caller]['operations'].append(f'{service}:{operation}')
+            breakdown.append(
+                {
+                    'caller': caller,
+                    'service': service,
+                    'operation': operation,
+                    'count': call['count'],
+                    'timeMs': round(call['seconds'] * 1000, 3),
+                    'errors': call['errors'],
+                }
+            )
+
+        dimensions = {'Function': FUNCTION_NAME, 'Route': self.route or 'unknown'}
+        documents = [
+            emf_document(
+                dimension_sets=[['Function'], ['Function', 'Route']],
+                metrics=metrics,
+                properties={**dimensions, **self.properties, 'awsCalls': breakdown},
+            )
+        ]
+        for caller, caller_call in caller_calls.items():
+            documents.append(
+                emf_document(
+                    dimension_sets=[['Function', 'Caller']],
+                    metrics={
+                        'CallerAWSCalls': (caller_call['count'], 'Count'),
+                        'CallerAWSTime': (caller_call['seconds'] * 1000, 'Milliseconds'),
+                    },
+                    properties={**dimensions, 'Caller': caller, 'operations': caller_call['operations']},
+                )
+            )
+
+        return documents
+
+    def emit(self) -> None:
+        """Write the EMF documents of the request on stdout, one JSON document per line."""
+        lines = [json.dumps(document, separators=(',', ':'), default=str) for document in self.to_documents()]
+        with self.__emit_lock:
+            sys.stdout.write('\n'.join(lines) + '\n')
+            sys.stdout.flush()
+
+
+def emf_document(dimension_sets: List[List[str]], metrics: Dict[str, tuple], properties: dict) -> dict:
+    """Build an Embedded Metric Format document
+
+    :param dimension_sets: The dimension sets of the metrics, each a list of property names
+    :type dimension_sets: List[List[str]]
+
+    :param metrics: The value and unit of each metric, by name
+    :type metrics: Dict[str, tuple]
+
+    :param properties: The dimension values and any other value to be logged with the metrics
+    :type properties: dict
+
+    :return: The EMF document
+    :rtype: dict
+
+    """
+    return {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [
+                {
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': dimension_sets,
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()],
+                }
+            ],
+        },
+        **properties,
+        **{name: round(value, 3) for name, (value, _) in metrics.items()},
+    }
+
+
+def consume_cold_start() -> bool:
+    """Get whether the container has not served a request or invocation yet, and mark it as warm.
+
+    :return: True only on the first call of the container.
+    :rtype: bool
+
+    """
+    global __cold_start
+    with __cold_start_lock:
+        cold_start, __cold_start = __cold_start, False
+        return cold_start
+
+
+def find_caller() -> str:
+    """Get the qualified name of the innermost repository, usecase or gateway method on the stack
+
+    :return: The qualified name of the method, e.g. RegistrationsRepository.query_registrations
+    :rtype: str
+
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_globals.get('__name__', '').startswith(CALLER_PACKAGES):
+            return frame.f_code.co_qualname
+        frame = frame.f_back
+
+    return 'unknown'
+
+
+def __before_aws_call(model, context, **kwargs) -> None:
+    if current_metrics.get() is not None:
+        context[CALL_CONTEXT_KEY] = (find_caller(), model.service_model.service_name, model.name, time.perf_counter())
+
+
+def __record_aws_call(context: dict, failed: bool) -> None:
+    metrics = current_metrics.get()
+    call = context.pop(CALL_CONTEXT_KEY, None)
+    if metrics is None or call is None:
+        return
+
+    caller, service, operation, start = call
+    metrics.add_call(caller, service, operation, time.perf_counter() - start, failed=failed)
+
+
+def __after_aws_call(http_response, context, **kwargs) -> None:
+    __record_aws_call(context, failed=http_response.status_code >= 300)
+
+
+def __after_aws_call_error(context, **kwargs) -> None:
+    __record_aws_call(context, failed=True)
+
+
+def route_template(scope: Scope) -> str:
+    """Get the path template of the route that served a request, e.g. /registrations/{eventId}/csv_download
+
+    :param scope: The ASGI scope of the request, after it was routed
+    :type scope: Scope
+
+    :return: The path template, or unmatched if no route served the request
+    :rtype: str
+
+    """
+    endpoint = scope.get('endpoint')
+    if endpoint is None:
+        return 'unmatched'
+
+    path = __route_paths.get(endpoint)
+    if path is None:
+        routes = getattr(getattr(scope.get('app'), 'router', None), 'routes', [])
+        # an endpoint is usually served with and without a trailing slash, the shorter path names them both
+        paths = [route.path for route in routes if getattr(route, 'endpoint', None) is endpoint]
+        path = min(paths, key=len) if paths else 'unmatched'
+        __route_paths[endpoint] = path
+
+    return path
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware that emits the RequestMetrics of every HTTP request once it is served."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(cold_start=consume_cold_start())
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+
+            await send(message)
+
+        token = current_metrics.set(metrics)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_metrics.reset(token)
+            metrics.route = f'{scope["method"]} {route_template(scope)}'
+            metrics.properties['statusCode'] = status_code
+            lambda_context = scope.get('aws.context')
+            if lambda_context is not None:
+                metrics.properties['requestId'] = lambda_context.aws_request_id
+
+            metrics.emit()
+
+
+def track_invocation(handler: Callable) -> Callable:
+    """Emit the RequestMetrics of every invocation of a Lambda handler, with its SQS record counts
+
+    :param handler: The Lambda handler
+    :type handler: Callable
+
+    :return: The wrapped handler
+    :rtype: Callable
+
+    """
+
+    @wraps(handler)
+    def wrapped_handler(event, context):
+        if not METRICS_ENABLED:
+            return handler(event, context)
+
+        metrics = RequestMetrics(route=handler.__module__, cold_start=consume_cold_start())
+        records = event.get('Records') if isinstance(event, dict) else None
+        if records is not None:
+            metrics.properties['recordCount'] = len(records)
+
+        token = current_metrics.set(metrics)
+        try:
+            response = handler(event, context)
+            if isinstance(response, dict) and 'batchItemFailures' in response:
+                metrics.properties['failedRecordCount'] = len(response['batchItemFailures'])
+
+            return response
+        except Exception:
+            metrics.properties['failed'] = True
+            raise
+        finally:
+            current_metrics.reset(token)
+            request_id = getattr(context, 'aws_request_id', None)
+            if request_id:
+                metrics.properties['requestId'] = request_id
+
+            metrics.emit()
+
+    return wrapped_handler
+
+
+# every botocore session created from now on, including the ones of PynamoDB, times its calls
+if METRICS_ENABLED:
+    BUILTIN_HANDLERS.extend(
+        [
+            ('before-call', __before_aws_call),
+            ('after-call', __after_aws_call),
+            ('after-call-error', __after_aws_call_error),
+        ]
+    )
@@ -0,0 +1,441 @@
+import inspect
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from http import HTTPStatus
+from typing import Callable, Dict, Iterator, Optional
+
+from botocore.handlers import BUILTIN_HANDLERS
+from starlette.types import ASGIApp, Receive, Scope, Send
+from utils.metrics import route_template
+
+TRACEPARENT = 'traceparent'
+
+# the parameters of a traced method that are recorded as span attributes, by parameter name
+TRACED_PARAMETERS = {
+    'event_id': 'eventId',
+    'registration_id': 'registrationId',
+    'payment_transaction_id': 'paymentTransactionId',
+    'entry_id': 'entryId',
+    'job_id': 'jobId',
+}
+
+# the botocore request context key of the span of the AWS call being made
+SPAN_CONTEXT_KEY = 'tracing_span'
+
+# the botocore request context key of the DynamoDB attributes of the call, read from its API parameters
+DYNAMODB_CONTEXT_KEY = 'tracing_dynamodb_attributes'
+
+# the size reserved in an SQS message for the trace context attribute
+TRACE_ATTRIBUTE_MAX_BYTES = 128
+
+
+class SpanContext:
+    """The IDs that a span passes on to its children, in this process or through a message."""
+
+    def __init__(self, trace_id: str, span_id: str) -> None:
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    def to_traceparent(self) -> str:
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    @classmethod
+    def from_traceparent(cls, traceparent: Optional[str]) -> Optional['SpanContext']:
+        """Parse a W3C traceparent value, e.g. 00-<32 hex trace ID>-<16 hex span ID>-01
+
+        :param traceparent: The traceparent value
+        :type traceparent: Optional[str]
+
+        :return: The span context, or None if the value is missing or malformed
+        :rtype: Optional[SpanContext]
+
+        """
+        parts = (traceparent or '').split('-')
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+
+        return cls(trace_id=parts[1], span_id=parts[2])
+
+
+class Span:
+    """
+    A timed step of a trace, e.g. a usecase method, a repository method or an AWS call.
+
+    Attributes:
+        name (str): The name of the step, e.g. RegistrationsRepository.query_registrations.
+        context (SpanContext): The trace ID and the ID of this span.
+        parent_id (str): The span ID of the parent, None for the root of a trace.
+        attributes (dict): The attributes of the step, e.g. eventId, table or itemCount.
+    """
+
+    def __init__(self, name: str, parent: Optional[SpanContext] = None, attributes: dict = None) -> None:
+        self.name = name
+        self.context = SpanContext(
+            trace_id=parent.trace_id if parent else secrets.token_hex(16), span_id=secrets.token_hex(8)
+        )
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = {name: value for name, value in (attributes or {}).items() if value is not None}
+        self.error = None
+        self.__start_time = time.time()
+        self.__start = time.perf_counter()
+
+    def set_attribute(self, name: str, value) -> None:
+        if value is not None:
+            self.attributes[name] = value
+
+    def record_result(self, result) -> None:
+        """Record the status and the item count of a repository or usecase result
+
+        :param result: The returned value, e.g. a (HTTPStatus, data, message) tuple of a repository
+        :type result: Any
+
+        """
+        data = result
+        if isinstance(result, tuple) and result and isinstance(result[0], HTTPStatus):
+            self.set_attribute('status', result[0].value)
+            data = result[1] if len(result) > 2 else None
+        elif hasattr(result, 'status_code'):
+            self.set_attribute('status', result.status_code)
+
+        if isinstance(data, (list, tuple, set, dict)):
+            self.set_attribute('itemCount', len(data))
+
+    def end(self) -> None:
+        """Export the span, once its step is done"""
+        exporter = get_exporter()
+        if exporter is None:
+            return
+
+        exporter.export(
+            {
+                'traceId': self.context.trace_id,
+                'spanId': self.context.span_id,
+                'parentSpanId': self.parent_id,
+                'name': self.name,
+                'startTime': round(self.__start_time * 1000, 3),
+                'durationMs': round((time.perf_counter() - self.__start) * 1000, 3),
+                'status': 'error' if self.error else 'ok',
+                'error': self.error,
+                'attributes': self.attributes,
+            }
+        )
+
+
+class StdoutSpanExporter:
+    """Writes every span as a JSON line on stdout, where Lambda sends it to CloudWatch Logs."""
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+
+    def export(self, span_data: dict) -> None:
+        line = json.dumps(span_data, separators=(',', ':'), default=str)
+        with self.__lock:
+            sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+
+
+class FileSpanExporter:
+    """Appends every span as a JSON line to a file, so that a test or a local run can read the traces back."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__lock = threading.Lock()
+
+    def export(self, span_data: dict) -> None:
+        line = json.dumps(span_data, separators=(',', ':'), default=str)
+        with self.__lock, open(self.path, mode='a') as trace_file:
+            trace_file.write(line + '\n')
+
+
+def build_exporter() -> Optional[object]:
+    """Build the exporter chosen by TRACING_EXPORTER: none, stdout, or file, which writes to TRACING_FILE
+
+    :return: The exporter, or None if tracing is off
+    :rtype: Optional[object]
+
+    """
+    exporter_name = os.getenv('TRACING_EXPORTER', 'none').lower()
+    if exporter_name == 'stdout':
+        return StdoutSpanExporter()
+    if exporter_name == 'file':
+        return FileSpanExporter(os.getenv('TRACING_FILE', 'traces.jsonl'))
+
+    return None
+
+
+# the span of the step being run
+current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+__exporter = build_exporter()
+
+
+def get_exporter() -> Optional[object]:
+    return __exporter
+
+
+def set_exporter(exporter: Optional[object]) -> None:
+    """Replace the exporter of every span from now on, e.g. with a FileSpanExporter in a test
+
+    :param exporter: The exporter, None turns tracing off
+    :type exporter: Optional[object]
+
+    """
+    global __exporter
+    __exporter = exporter
+
+
+@contextmanager
+def start_span(name: str, parent: Optional[SpanContext] = None, **attributes) -> Iterator[Optional[Span]]:
+    """Run a step in a span, the child of the current span unless a parent is given
+
+    :param name: The name of the span
+    :type name: str
+
+    :param parent: The context of the parent, e.g. from the traceparent of a message
+    :type parent: Optional[SpanContext]
+
+    :return: The span, or None if tracing is off
+    :rtype: Iterator[Optional[Span]]
+
+    """
+    if get_exporter() is None:
+        yield None
+        return
+
+    if parent is None:
+        parent_span = current_span.get()
+        parent = parent_span.context if parent_span else None
+
+    span = Span(name, parent=parent, attributes=attributes)
+    token = current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.error = f'{type(e).__name__}: {str(e)}'
+        raise
+    finally:
+        current_span.reset(token)
+        span.end()
+
+
+def traced(target):
+    """Run a function in a span, or every public method of a class in a span of its own
+
+    The event ID, registration ID and the other TRACED_PARAMETERS of the call are recorded as attributes, with the
+    status and item count of the result.
+
+    :param target: The function or the class
+    :type target: Union[Callable, type]
+
+    :return: The traced function or class
+    :rtype: Union[Callable, type]
+
+    """
+    if inspect.isclass(target):
+        for name, member in list(vars(target).items()):
+            if (
+                not name.startswith('_')
+                and inspect.isfunction(member)
+                and not inspect.isgeneratorfunction(member)
+                and not inspect.iscoroutinefunction(member)
+            ):
+                setattr(target, name, traced(member))
+
+        return target
+
+    parameter_positions = {
+        name: index for index, name in enumerate(inspect.signature(target).parameters) if name in TRACED_PARAMETERS
+    }
+
+    @wraps(target)
+    def traced_function(*args, **kwargs):
+        if get_exporter() is None:
+            return target(*args, **kwargs)
+
+        attributes = {}
+        for name, index in parameter_positions.items():
+            value = kwargs.get(name, args[index] if index < len(args) else None)
+            if value is not None:
+                attributes[TRACED_PARAMETERS[name]] = value
+
+        if 'eventId' not in attributes:
+            # e.g. the pydantic input or the entry of a repository method
+            event_id = next((getattr(value, 'eventId', None) for value in (*args[1:], *kwargs.values())), None)
+            if isinstance(event_id, str):
+                attributes['eventId'] = event_id
+
+        with start_span(target.__qualname__, **attributes) as span:
+            result = target(*args, **kwargs)
+            if span:
+                span.record_result(result)
+
+            return result
+
+    return traced_function
+
+
+def message_attributes() -> Dict[str, dict]:
+    """Get the SQS message attributes that carry the current trace to the consumer of a message
+
+    :return: The traceparent attribute, or no attributes outside of a trace
+    :rtype: Dict[str, dict]
+
+    """
+    span = current_span.get()
+    if span is None:
+        return {}
+
+    return {TRACEPARENT: {'DataType': 'String', 'StringValue': span.context.to_traceparent()}}
+
+
+def record_parent(record: dict) -> Optional[SpanContext]:
+    """Get the trace context that the producer of an SQS record sent with it
+
+    :param record: The SQS record of a Lambda event
+    :type record: dict
+
+    :return: The context of the span that sent the record, None if it was sent outside of a trace
+    :rtype: Optional[SpanContext]
+
+    """
+    attribute = (record.get('messageAttributes') or {}).get(TRACEPARENT) or {}
+    return SpanContext.from_traceparent(attribute.get('stringValue'))
+
+
+def trace_invocation(handler: Callable) -> Callable:
+    """Run every invocation of a Lambda handler in the root span of a new trace
+
+    :param handler: The Lambda handler
+    :type handler: Callable
+
+    :return: The wrapped handler
+    :rtype: Callable
+
+    """
+
+    @wraps(handler)
+    def wrapped_handler(event, context):
+        records = event.get('Records') if isinstance(event, dict) else None
+        with start_span(handler.__module__, recordCount=len(records) if records is not None else None) as span:
+            response = handler(event, context)
+            if span and isinstance(response, dict) and 'batchItemFailures' in response:
+                span.set_attribute('failedRecordCount', len(response['batchItemFailures']))
+
+            return response
+
+    return wrapped_handler
+
+
+class TracingMiddleware:
+    """ASGI middleware that runs every HTTP request in a root span, or in the trace of its traceparent header."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or get_exporter() is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get('headers') or [])
+        parent = SpanContext.from_traceparent(headers.get(TRACEPARENT.encode(), b'').decode())
+        status_code = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+
+            await send(message)
+
+        with start_span(scope['method'], parent=parent) as span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                span.name = f'{scope["method"]} {route_template(scope)}'
+                span.set_attribute('status', status_code)
+
+
+def aws_call_tables(params: dict) -> list:
+    """Get the DynamoDB tables of the parameters of a call, including the items of a transaction or a batch
+
+    :param params: The parameters of the call
+    :type params: dict
+
+    :return: The table names
+    :rtype: list
+
+    """
+    if params.get('TableName'):
+        return [params['TableName']]
+
+    tables = set(params.get('RequestItems') or {})
+    for item in params.get('TransactItems') or []:
+        for action in item.values():
+            if isinstance(action, dict) and action.get('TableName'):
+                tables.add(action['TableName'])
+
+    return sorted(tables)
+
+
+def __before_dynamodb_parameter_build(params, context, **kwargs) -> None:
+    # before-call only gets the serialized request, the tables are read from the API parameters instead
+    if current_span.get() is None or get_exporter() is None:
+        return
+
+    tables = aws_call_tables(params)
+    context[DYNAMODB_CONTEXT_KEY] = {
+        'table': tables[0] if len(tables) == 1 else tables or None,
+        'requestItemCount': len(params.get('TransactItems') or []) or None,
+    }
+
+
+def __before_aws_call(model, context, **kwargs) -> None:
+    parent_span = current_span.get()
+    if parent_span is None or get_exporter() is None:
+        return
+
+    service = model.service_model.service_name
+    attributes = {'service': service, **context.pop(DYNAMODB_CONTEXT_KEY, {})}
+    context[SPAN_CONTEXT_KEY] = Span(f'{service}.{model.name}', parent=parent_span.context, attributes=attributes)
+
+
+def __after_aws_call(http_response, parsed, context, **kwargs) -> None:
+    span = context.pop(SPAN_CONTEXT_KEY, None)
+    if span is None:
+        return
+
+    span.set_attribute('httpStatus', http_response.status_code)
+    if isinstance(parsed, dict):
+        span.set_attribute('itemCount', parsed.get('Count'))
+        if http_response.status_code >= 300:
+            span.error = parsed.get('Error', {}).get('Code')
+
+    span.end()
+
+
+def __after_aws_call_error(exception, context, **kwargs) -> None:
+    span = context.pop(SPAN_CONTEXT_KEY, None)
+    if span is None:
+        return
+
+    span.error = f'{type(exception).__name__}: {str(exception)}'
+    span.end()
+
+
+# every botocore session created from now on, including the ones of PynamoDB, adds a span for each of its calls
+BUILTIN_HANDLERS.extend(
+    [
+        ('before-parameter-build.dynamodb', __before_dynamodb_parameter_build),
+        ('before-call', __before_aws_call),
+        ('after-call', __after_aws_call),
+        ('after-call-error', __after_aws_call_error),
+    ]
+)